@@ -1,168 +1,338 @@
 from music21 import *
 import os
+import numpy as np
 import pandas as pd
 from grafice import *
+from note import incarca_note
+from randare import programeaza_grafic
+from instrumentare import jurnal, masoara, masurat, contor
 
-def analiza_distributie_pitch(note, instr, output_dir="analize"):
+log = jurnal("analizare_note")
+
+# Parametri
+densitate_bins = (1.0, 2.0, 4.0)  # Rezoluțiile densității în CSV-ul lat (timp, jumătate de măsură, măsură în 4/4)
+
+def numara_valori(tabel, coloana):
+    """
+    Numără aparițiile valorilor unei coloane pentru fiecare voce și pentru toate vocile, cu un singur groupby.
+    Ordinea rezultatelor este cea dată de value_counts (descrescător după număr, la egalitate în ordinea primei apariții).
+
+    Args:
+        tabel (pd.DataFrame): notele piesei, cu coloana categorială 'part'
+        coloana (str): coloana numărată ('pitch', 'duration')
+
+    Return:
+        dict: {voce: pd.DataFrame [coloana, 'count']}, cu cheia None pentru toate vocile
+    """
+    grupuri = pd.DataFrame({
+        'part': tabel['part'].values,
+        coloana: tabel[coloana].to_numpy(),
+        'pozitie': np.arange(len(tabel))
+    }).groupby(['part', coloana], sort=False, observed=True, dropna=False)['pozitie'].agg(['size', 'min'])
+
+    def ca_value_counts(valori, numar):
+        counts = pd.Series(np.asarray(numar, dtype=np.int64), index=pd.Index(valori, name=coloana), name='count')
+        return counts.sort_values(ascending=False).reset_index()
+
+    rezultate = {}
+    parti = grupuri.index.get_level_values(0)
+    for instr in tabel['part'].cat.categories:
+        voce = grupuri[parti == instr]
+        rezultate[instr] = ca_value_counts(voce.index.get_level_values(1), voce['size'])
+
+    # Toate vocile: sumele pe voci, în ordinea primei apariții în tot tabelul
+    toate = grupuri.groupby(level=1, sort=False, dropna=False).agg({'size': 'sum', 'min': 'min'}).sort_values('min')
+    rezultate[None] = ca_value_counts(toate.index, toate['size'])
+    return rezultate
+
+def sunet_cumulat(start, end, t):
+    """
+    Timpul total în care sună notele până la momentele t: suma lui clip(t - start, 0, durata).
+
+    Args:
+        start, end (np.ndarray): începutul și sfârșitul notelor
+        t (np.ndarray): momentele (crescătoare)
+
+    Return:
+        np.ndarray: timpul cumulat pentru fiecare moment
+    """
+    start, end = np.sort(start), np.sort(end)
+    suma_start = np.concatenate(([0.0], np.cumsum(start)))
+    suma_end = np.concatenate(([0.0], np.cumsum(end)))
+    n_start = np.searchsorted(start, t)
+    n_end = np.searchsorted(end, t)
+    return (n_start * t - suma_start[n_start]) - (n_end * t - suma_end[n_end])
+
+def densitate(offset, bin_size=1.0, durate=None):
+    """
+    Densitatea notelor pe intervale de timp de lungime bin_size, calculată cu np.bincount.
+    Intervalele încep la multipli de bin_size, de la primul până la ultimul interval cu note.
+
+    Args:
+        offset (np.ndarray): momentele de început ale notelor
+        bin_size (float): dimensiunea intervalului
+        durate (np.ndarray): duratele notelor; dacă sunt date, fiecare interval primește timpul
+            în care sună notele în el, în loc de numărul de note care încep în el
+
+    Return:
+        tuple: (time_bins, valori)
+    """
+    if len(offset) == 0:
+        return np.array([0]), np.array([0], dtype=np.int64)
+
+    k = np.floor_divide(offset, bin_size).astype(np.int64)
+    k0 = k.min()
+    if durate is None:
+        valori = np.bincount(k - k0)
+    else:
+        end = offset + durate
+        n_bins = max(int(np.ceil(end.max() / bin_size)) - k0, k.max() - k0 + 1)
+        margini = (k0 + np.arange(n_bins + 1)) * bin_size
+        valori = np.diff(sunet_cumulat(offset, end, margini))
+    return (k0 + np.arange(len(valori))) * bin_size, valori
+
+def densitate_multipla(offset, bin_sizes=densitate_bins, durate=None):
+    """
+    Densitatea la mai multe rezoluții, ca tabel lat: o coloană pentru fiecare dimensiune de bin,
+    completată la începutul fiecărui interval și goală în rest.
+
+    Args:
+        offset (np.ndarray): momentele de început ale notelor
+        bin_sizes (tuple): dimensiunile intervalelor
+        durate (np.ndarray): duratele notelor, pentru densitatea ponderată cu durata (opțional)
+
+    Return:
+        pd.DataFrame: coloana 'time_bin' și câte o coloană 'densitate_<bin>' pentru fiecare rezoluție
+    """
+    coloane = {}
+    for bin_size in bin_sizes:
+        time_bins, valori = densitate(offset, bin_size, durate)
+        # Int64 (cu valori lipsă) păstrează numerele de note întregi în coloanele cu goluri
+        valori = pd.array(valori, dtype='Int64') if durate is None else valori
+        coloane[f"densitate_{bin_size:g}"] = pd.Series(valori, index=np.round(time_bins, 9))
+    tabel = pd.DataFrame(coloane).sort_index()
+    tabel.index.name = 'time_bin'
+    return tabel.reset_index()
+
+def statistici_grup(durate, octave, offset, pitch_unice, octave_float, bin_size, bin_sizes, ponderat):
+    """
+    Statisticile unei voci (sau ale tuturor vocilor), calculate pe vectori numpy.
+
+    Args:
+        durate, octave, offset (np.ndarray): coloanele notelor vocii, în ordinea din partitură
+        pitch_unice (int): numărul de pitch-uri distincte
+        octave_float (bool): octavele sunt afișate ca float (coloana are valori lipsă)
+        bin_size (float): dimensiunea bin-ului pentru analiza densității
+        bin_sizes (tuple): rezoluțiile densității din tabelul lat
+        ponderat (bool): densitatea din tabelul lat este ponderată cu durata notelor
+
+    Return:
+        tuple: (statistici pitch, statistici ritm, densitate, densitate la mai multe rezoluții)
+    """
+    gol = len(durate) == 0
+    if gol:
+        octava_minima = octava_maxima = None
+    elif np.isnan(octave).all():
+        octava_minima = octava_maxima = np.nan
+    else:
+        octava_minima, octava_maxima = np.nanmin(octave), np.nanmax(octave)
+        if not octave_float:
+            octava_minima, octava_maxima = np.int64(octava_minima), np.int64(octava_maxima)
+
+    stats_pitch = {
+        'numar_note': len(durate),
+        'pitch_uri_unice': pitch_unice,
+        'octava_minima': octava_minima,
+        'octava_maxima': octava_maxima
+    }
+    stats_ritm = {
+        'durata_medie': durate.sum() / len(durate) if not gol else None,
+        'durata_minima': durate.min() if not gol else None,
+        'durata_maxima': durate.max() if not gol else None,
+        'durata_totala': durate.sum() if not gol else None
+    }
+
+    # Intervalele fără note rămân cu zero
+    time_bins, count = densitate(offset, bin_size)
+    density_full = pd.DataFrame({'time_bin': time_bins, 'count': count})
+    density_wide = densitate_multipla(offset, bin_sizes, durate if ponderat else None)
+    return stats_pitch, stats_ritm, density_full, density_wide
+
+def statistici_voci(note, bin_size=1.0, bin_sizes=densitate_bins, ponderat=False):
     """
-    Analizează distribuția înălțimilor și salvează rezultatele + grafice.
+    Calculează într-o singură trecere prin tabel distribuția pitch-urilor, distribuția duratelor,
+    statisticile și densitatea în timp pentru fiecare voce și pentru toate vocile.
 
     Args:
-        note (pd.DataFrame): notele piesei
+        note (pd.DataFrame): notele piesei, cu coloana categorială 'part' (vezi incarca_note)
+        bin_size (float): dimensiunea bin-ului pentru analiza densității
+        bin_sizes (tuple): rezoluțiile densității din tabelul lat
+        ponderat (bool): densitatea din tabelul lat este ponderată cu durata notelor
+
+    Return:
+        list: (voce, statistici) pentru "toate vocile" și apoi pentru fiecare voce
+    """
+    pitch_counts = numara_valori(note, 'pitch')
+    duration_counts = numara_valori(note, 'duration')
+
+    durate = note['duration'].to_numpy(dtype=np.float64)
+    octave = note['octave'].to_numpy(dtype=np.float64, na_value=np.nan)
+    offset = note['offset'].to_numpy(dtype=np.float64)
+
+    rezultate = []
+    stats_pitch, stats_ritm, density, density_wide = statistici_grup(
+        durate, octave, offset, len(pitch_counts[None]), True, bin_size, bin_sizes, ponderat)
+    rezultate.append(("toate vocile", {
+        'pitch_counts': pitch_counts[None], 'stats_pitch': stats_pitch,
+        'duration_counts': duration_counts[None], 'stats_ritm': stats_ritm,
+        'density': density, 'density_wide': density_wide
+    }))
+
+    # Vocile: rândurile grupate pe voce, păstrând ordinea din partitură în fiecare voce
+    coduri = note['part'].cat.codes.to_numpy()
+    ordine = np.argsort(coduri, kind='stable')
+    coduri_sortate = coduri[ordine]
+    durate, octave, offset = durate[ordine], octave[ordine], offset[ordine]
+    for cod, instr in enumerate(note['part'].cat.categories):
+        start, stop = np.searchsorted(coduri_sortate, [cod, cod + 1])
+        octave_voce = octave[start:stop]
+        stats_pitch, stats_ritm, density, density_wide = statistici_grup(
+            durate[start:stop], octave_voce, offset[start:stop], len(pitch_counts[instr]),
+            bool(np.isnan(octave_voce).any()), bin_size, bin_sizes, ponderat)
+        rezultate.append((instr, {
+            'pitch_counts': pitch_counts[instr], 'stats_pitch': stats_pitch,
+            'duration_counts': duration_counts[instr], 'stats_ritm': stats_ritm,
+            'density': density, 'density_wide': density_wide
+        }))
+    return rezultate
+
+def scrie_statistici(stats, stats_file):
+    """
+    Scrie statisticile ca linii 'cheie: valoare'.
+    """
+    with open(stats_file, 'w', encoding='utf-8') as f:
+        for key, value in stats.items():
+            f.write(f"{key}: {value}\n")
+
+def analiza_distributie_pitch(statistici, instr, output_dir="analize"):
+    """
+    Salvează distribuția înălțimilor, statisticile și graficul unei voci.
+
+    Args:
+        statistici (dict): statisticile vocii, calculate de statistici_voci
         instr (str): vocea curentă
         output_dir (str): directorul unde se salvează fișierele
     """
     # Distribuția pitch-urilor
-    pitch_counts = note['pitch'].value_counts().reset_index()
-    pitch_counts.columns = ['pitch', 'count']
+    pitch_counts = statistici['pitch_counts']
 
     instrument_dir = os.path.join(output_dir, instr)
     os.makedirs(instrument_dir, exist_ok=True)
     output_file = os.path.join(instrument_dir, f"distribuție_pitch_{instr}.csv")
     pitch_counts.to_csv(output_file, index=False)
-    print(f"Distribuția pitch-urilor ({instr}) salvată în: {instrument_dir}")
-    
+    log.debug(f"Distribuția pitch-urilor ({instr}) salvată în: {instrument_dir}")
+
     # Grafic
-    grafic_distributie(instr, pitch_counts,  instrument_dir)
-    
+    programeaza_grafic(grafic_distributie, instr, pitch_counts, instrument_dir)
+
     # Statistici generale
-    stats = {
-        'numar_note': len(note),
-        'pitch_uri_unice': len(note['pitch'].unique()),
-        'octava_minima': note['octave'].min() if not note.empty else None,
-        'octava_maxima': note['octave'].max() if not note.empty else None
-    }
     stats_file = os.path.join(instrument_dir, f"pitch_{instr}.txt")
-    with open(stats_file, 'w', encoding='utf-8') as f:
-        for key, value in stats.items():
-            f.write(f"{key}: {value}\n")
-    print(f"Statistici pitch-uri ({instr}) salvate în: {stats_file}")
+    scrie_statistici(statistici['stats_pitch'], stats_file)
+    log.debug(f"Statistici pitch-uri ({instr}) salvate în: {stats_file}")
 
 
-def analiza_ritm(note, instr, output_dir="analize"):
+def analiza_ritm(statistici, instr, output_dir="analize"):
     """
-    Analizează distribuția duratelor și salvează rezultatele + grafice.
+    Salvează distribuția duratelor, statisticile ritmice și graficul unei voci.
 
     Args:
-        note (pd.DataFrame): notele piesei
+        statistici (dict): statisticile vocii, calculate de statistici_voci
         instr (str): vocea curentă
         output_dir (str): directorul unde se salvează fișierele
     """
-    
+
     # Distribuția duratelor
-    duration_counts = note['duration'].value_counts().reset_index()
-    duration_counts.columns = ['duration', 'count']
+    duration_counts = statistici['duration_counts']
 
     instrument_dir = os.path.join(output_dir, instr)
     os.makedirs(instrument_dir, exist_ok=True)
     output_file = os.path.join(instrument_dir, f"distribuție_durată_{instr}.csv")
     duration_counts.to_csv(output_file, index=False)
-    print(f"Distribuția duratelor ({instr}) salvată în: {instrument_dir}")
-    
+    log.debug(f"Distribuția duratelor ({instr}) salvată în: {instrument_dir}")
+
     # Grafic toate vocile
-    grafic_distributie_ritm(instr, duration_counts, instrument_dir)
-    
+    programeaza_grafic(grafic_distributie_ritm, instr, duration_counts, instrument_dir)
+
     # Statistici ritmice
-    stats = {
-        'durata_medie': note['duration'].mean() if not note.empty else None,
-        'durata_minima': note['duration'].min() if not note.empty else None,
-        'durata_maxima': note['duration'].max() if not note.empty else None,
-        'durata_totala': note['duration'].sum() if not note.empty else None
-    }
     stats_file = os.path.join(instrument_dir, f"ritm_{instr}.txt")
-    with open(stats_file, 'w', encoding='utf-8') as f:
-        for key, value in stats.items():
-            f.write(f"{key}: {value}\n")
-    print(f"Statistici ritmice ({instr}) salvate în: {stats_file}")
+    scrie_statistici(statistici['stats_ritm'], stats_file)
+    log.debug(f"Statistici ritmice ({instr}) salvate în: {stats_file}")
 
 
-def analiza_densitate(note, instr, output_dir="analize", bin_size=1.0):
+def analiza_densitate(statistici, instr, output_dir="analize"):
     """
-    Analizează densitatea notelor în timp și salvează rezultatele + grafice.
+    Salvează densitatea notelor în timp și graficul unei voci.
 
     Args:
-        note (pd.DataFrame): notele piesei
+        statistici (dict): statisticile vocii, calculate de statistici_voci
         instr (str): vocea curentă
         output_dir (str): directorul unde se salvează fișierele
-        bin_size (float): dimensiunea bin-ului pentru analiza densității
     """
-    # Grupare pe intervale de timp
-    note = note.copy()
-    if 'offset' not in note.columns:
-        print(f"Coloana 'offset' lipsește în datele pentru {instr}. Se omite analiza densității.")
-        return
-
-    note['time_bin'] = (note['offset'] // bin_size) * bin_size
-    density = note.groupby('time_bin').size().reset_index()
-    density.columns = ['time_bin', 'count']
-
-    # Determină intervalul complet de timp
-    min_time = note['offset'].min() if not note.empty else 0
-    max_time = note['offset'].max() if not note.empty else 0
-    if min_time == max_time:  # Dacă nu există variație, creează un singur bin
-        time_bins = [min_time]
-    else:
-        time_bins = [min_time + i * bin_size for i in range(int((max_time - min_time) / bin_size) + 1)]
-
-    # Creează un DataFrame cu toate intervalele de timp posibile
-    all_bins = pd.DataFrame({'time_bin': time_bins})
-
-    # Îmbină cu densitatea existentă și completează cu zerouri
-    density_full = all_bins.merge(density, on='time_bin', how='left').fillna(0)
-    density_full['count'] = density_full['count'].astype(int)
+    density_full = statistici['density']
 
     instrument_dir = os.path.join(output_dir, instr)
     os.makedirs(instrument_dir, exist_ok=True)
     output_file = os.path.join(instrument_dir, f"densitate_{instr}.csv")
     density_full.to_csv(output_file, index=False)
-    print(f"Densitatea notelor ({instr}) salvată în: {output_file}")
-    
+    log.debug(f"Densitatea notelor ({instr}) salvată în: {output_file}")
+
+    # Densitatea la mai multe rezoluții, într-un singur CSV
+    output_file = os.path.join(instrument_dir, f"densitate_rezolutii_{instr}.csv")
+    statistici['density_wide'].to_csv(output_file, index=False)
+    log.debug(f"Densitatea pe rezoluții ({instr}) salvată în: {output_file}")
+
     # Grafic
-    grafic_densitate(instr, density_full, instrument_dir)
+    programeaza_grafic(grafic_densitate, instr, density_full, instrument_dir)
 
-def analiza_note(csv_file, output_dir, output_subdir = "analiza_note"):
+@masurat()
+def analiza_note(csv_file, output_dir, output_subdir = "analiza_note", bin_size=1.0, bin_sizes=densitate_bins,
+                 ponderat=False):
     """
     Functia principala pentru a analiza notele din partitura.
+    Notele tuturor vocilor sunt citite o singură dată (NPZ sau CSV-ul principal),
+    iar statisticile sunt calculate pentru toate vocile deodată.
 
     Args:
         csv_file (str): fisierul de intrare CSV
         output_dir (str): directorul de iesire pentru analize
         output_subdir (str): subdirectorul unde se salveaza analizele
+        bin_size (float): dimensiunea bin-ului pentru analiza densității
+        bin_sizes (tuple): rezoluțiile densității din CSV-ul lat (densitate_rezolutii_<voce>.csv)
+        ponderat (bool): în CSV-ul lat, fiecare notă contează cu timpul în care sună în fiecare interval
 
     Return:
         output_dir (str): directorul unde sunt salvate analizele
     """
-   # Setează directorul de intrare pentru instrumente
-    note_dir = os.path.join(os.path.dirname(csv_file))
-    print(f"Director de intrare (note): {note_dir}")
-    print(f"Director de ieșire (output): {os.path.join(output_dir, output_subdir)}")
+    log.info(f"Director de intrare (note): {os.path.dirname(csv_file)}")
+    log.info(f"Director de ieșire (output): {os.path.join(output_dir, output_subdir)}")
+
+    if not os.path.isfile(csv_file):
+        log.warning(f"Fișierul CSV '{csv_file}' nu există. Îl voi crea.")
+        return output_dir
 
     # Creează directorul de ieșire dacă nu există
     os.makedirs(os.path.join(output_dir, output_subdir), exist_ok=True)
 
-    # Analiza pentru toate vocile (folosind fișierul principal)
-    if not os.path.isfile(csv_file):
-        print(f"Fișierul CSV '{csv_file}' nu există. Îl voi crea.")
-        return output_dir
-    else:
-        file = pd.read_csv(csv_file)
-        note = file[file['type'] == 'Note']
-        analiza_distributie_pitch(note, "toate vocile", os.path.join(output_dir, output_subdir))
-        analiza_ritm(note, "toate vocile", os.path.join(output_dir, output_subdir))
-        analiza_densitate(note, "toate vocile", os.path.join(output_dir, output_subdir))
-
-        # Instrumente
-        instrumente = ['Soprano', 'Alto', 'Tenor', 'Bass']
-
-        for instr in instrumente:
-            file_instr = os.path.join(note_dir, instr, f"{instr}_note.csv")
-            print(file_instr)
-            if os.path.isfile(file_instr):
-                note_instr = pd.read_csv(file_instr)
-                analiza_distributie_pitch(note_instr, instr, os.path.join(output_dir, output_subdir))
-                analiza_ritm(note_instr, instr, os.path.join(output_dir, output_subdir))
-                analiza_densitate(note_instr, instr, os.path.join(output_dir, output_subdir))
-            else:
-                print(f"Fișierul '{file_instr}' nu există. Se omite analiza pentru {instr}.")
-
-    return os.path.join(output_dir, output_subdir)
\ No newline at end of file
+    with masoara('incarca_note'):
+        note = incarca_note(csv_file)
+    with masoara('statistici_voci'):
+        statistici_toate = statistici_voci(note, bin_size, bin_sizes, ponderat)
+        contor('notes', len(note))
+        contor('voices', len(statistici_toate) - 1)
+    with masoara('scrie_analize'):
+        for instr, statistici in statistici_toate:
+            analiza_distributie_pitch(statistici, instr, os.path.join(output_dir, output_subdir))
+            analiza_ritm(statistici, instr, os.path.join(output_dir, output_subdir))
+            analiza_densitate(statistici, instr, os.path.join(output_dir, output_subdir))
+
+    return os.path.join(output_dir, output_subdir)
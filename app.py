@@ -1,15 +1,14 @@
 import csv
 import os
 import json
-from music21 import converter, corpus
 import tkinter as tk
 from tkinter import filedialog, ttk, messagebox
 from PIL import Image, ImageTk
 import subprocess
-from analizare_note import analiza_note
-from pattern import pattern
-from segmentare import segmentare
-from note import extrage_note_muzicale
+import multiprocessing
+import queue
+from functools import partial
+from lucrari import ruleaza, lucrare_note, lucrare_segmentare, lucrare_analiza_note, lucrare_pattern
 
 class App:
     def __init__(self, root):
@@ -17,7 +16,6 @@ class App:
         self.root.title("Music Analysis Tool")
         self.root.geometry("1200x800")
 
-        self.part = None  # Partitura
         self.output_dir = "output"
         self.input_file = None
         self.files_by_folder = {}  # Dicționar pentru toate fișierele
@@ -39,7 +37,15 @@ class App:
             "segmentation": set()
         }
 
+        # Analizele rulează în procese separate ("spawn", fără starea Tk a procesului principal);
+        # progresul și rezultatele vin printr-o coadă citită periodic cu root.after
+        self.mp_context = multiprocessing.get_context('spawn')
+        self.job_queue = self.mp_context.Queue()
+        self.jobs = {}  # job_id -> (tip analiză, proces, funcție apelată la final)
+        self.job_counter = 0
+
         self.create_widgets()
+        self.root.after(100, self.poll_jobs)
 
     def create_widgets(self):
         """
@@ -59,6 +65,12 @@ class App:
         self.select_button = tk.Button(self.file_frame, text="Select MusicXML/MIDI File", command=self.select_file)
         self.select_button.pack(side=tk.LEFT, padx=5)
 
+        self.cancel_button = tk.Button(self.file_frame, text="Anulează analizele", command=self.cancel_jobs, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.LEFT, padx=5)
+
+        self.status_label = tk.Label(self.file_frame, text="", fg="gray")
+        self.status_label.pack(side=tk.LEFT, padx=5)
+
         # Frame pentru analiza
         self.action_frame = tk.Frame(self.main_frame)
         self.action_frame.grid(row=1, column=0, columnspan=2, pady=5, sticky="ew")
@@ -117,7 +129,9 @@ class App:
         file_path = filedialog.askopenfilename(filetypes=[("MusicXML/MIDI Files", "*.xml *.mid *.midi"), ("All Files", "*.*")])
         if file_path:
             self.file_label.config(text=os.path.basename(file_path))
+            self.cancel_jobs()
             self.input_file = file_path
+            self.output_dir = os.path.join("output", os.path.splitext(os.path.basename(file_path))[0])
             self.analyze_notes_button.config(state=tk.NORMAL)
             self.analyze_segmentation_button.config(state=tk.NORMAL)
             self.notes = False
@@ -131,6 +145,81 @@ class App:
                 "segmentation": set()
             }
 
+    def start_job(self, kind, functie, args, on_done):
+        """
+        Pornește o analiză într-un proces separat.
+
+        Args:
+            kind (str): tipul analizei (cheie din generated_files)
+            functie (callable): funcția din lucrari.py care rulează analiza
+            args (tuple): argumentele funcției
+            on_done (callable): apelată în interfață cu rezultatul, la final
+        """
+        self.job_counter += 1
+        job_id = f"{kind}-{self.job_counter}"
+        process = self.mp_context.Process(target=ruleaza, args=(self.job_queue, job_id, functie, args), daemon=True)
+        process.start()
+        self.jobs[job_id] = (kind, process, on_done)
+        self.cancel_button.config(state=tk.NORMAL)
+        self.status_label.config(text=f"{kind}: pornit")
+
+    def job_running(self, kind):
+        """
+        Verifică dacă o analiză de tipul dat rulează deja.
+        """
+        return any(job_kind == kind for job_kind, _, _ in self.jobs.values())
+
+    def poll_jobs(self):
+        """
+        Citește mesajele proceselor de lucru (progres, rezultat, eroare) fără a bloca interfața.
+        """
+        while True:
+            try:
+                tip, job_id, continut = self.job_queue.get_nowait()
+            except queue.Empty:
+                break
+            if job_id not in self.jobs:
+                continue  # Mesaj de la o analiză anulată
+            kind, process, on_done = self.jobs[job_id]
+            if tip == 'progres':
+                self.status_label.config(text=f"{kind}: {continut[:100]}")
+            else:
+                del self.jobs[job_id]
+                process.join(timeout=1)
+                self.status_label.config(text=f"{kind}: {'finalizat' if tip == 'gata' else 'eroare'}")
+                on_done(continut if tip == 'gata' else None, continut if tip == 'eroare' else None)
+
+        # Procese oprite fără rezultat (de ex. terminate de sistem)
+        for job_id, (kind, process, on_done) in list(self.jobs.items()):
+            if not process.is_alive() and process.exitcode not in (0, None):
+                del self.jobs[job_id]
+                on_done(None, f"procesul s-a oprit cu codul {process.exitcode}")
+
+        if not self.jobs:
+            self.cancel_button.config(state=tk.DISABLED)
+        self.root.after(100, self.poll_jobs)
+
+    def cancel_jobs(self):
+        """
+        Anulează toate analizele în curs.
+        """
+        for kind, process, _ in self.jobs.values():
+            process.terminate()
+            process.join(timeout=1)
+        if self.jobs:
+            self.status_label.config(text="Analize anulate")
+        self.jobs = {}
+        self.cancel_button.config(state=tk.DISABLED)
+
+    def register_files(self, directory, analysis_type, extensions=(".csv", ".png", ".json", ".txt")):
+        """
+        Adaugă toate fișierele generate de o analiză (din director și subdirectoare) în generated_files.
+        """
+        for root, _, files in os.walk(directory):
+            for file in files:
+                if file.endswith(extensions):
+                    self.generated_files[analysis_type].add(os.path.relpath(os.path.join(root, file), self.output_dir))
+
     def analyze_notes(self):
         """
         Rulează analiza notelor muzicale din fișierul selectat.
@@ -140,54 +229,44 @@ class App:
             messagebox.showerror("Error", "Niciun fișier selectat!")
             return
 
-        if not self.notes:
-            try:
-                # Încarcă fișierul
-                if not self.input_file.endswith(('.xml', '.mid', '.midi')):
-                    messagebox.showerror("Error", "Fișierul trebuie să fie în format MusicXML (.xml) sau MIDI (.mid, .midi)!")
-                    return
-
-                try:
-                    self.part = converter.parse(self.input_file)
-                except Exception as e:
-                    try:
-                        self.part = corpus.parse(self.input_file)
-                    except Exception as e:
-                        messagebox.showerror("Error", f"Eroare încărcare fișier '{self.input_file}': {e}")
-                        return
-
-                name = os.path.splitext(os.path.basename(self.input_file))[0]
-                self.output_dir = os.path.join("output", name)
-                os.makedirs(self.output_dir, exist_ok=True)
-
-                # Salvează partitura ca MusicXML temporar
-                musicxml_path = os.path.join(self.output_dir, "partitura_temp.xml")
-                self.part.write('musicxml', fp=musicxml_path)
-
-                # Rulează extragerea notelor
-                self.csv_file_notes, self.output_dir_notes = extrage_note_muzicale(self.part, name, self.output_dir)
-                self.notes = True
-                # Adaugă toate fișierele din output_dir_notes și subdirectoare
-                for root, _, files in os.walk(self.output_dir_notes):
-                    for file in files:
-                        if file.endswith((".csv", ".png", ".json", ".txt")):
-                            self.generated_files["notes"].add(os.path.relpath(os.path.join(root, file), self.output_dir))
-
-                # Adaugă butoane suplimentare
-                self.add_analysis_buttons()
-
-                # Scanează fișierele și creează butoane doar pentru extragerea notelor
-                self.scan_files(self.output_dir_notes, "notes")
-                self.create_buttons()
-
-                messagebox.showinfo("Success", "Extragere note completă. Folosește butoanele pentru a vizualiza rezultatele.")
-            except Exception as e:
-                messagebox.showerror("Error", f"Eroare extragere note: {e}")
+        if self.job_running("notes"):
+            messagebox.showinfo("Info", "Extragerea notelor rulează deja.")
+        elif not self.notes:
+            # Încarcă fișierul
+            if not self.input_file.endswith(('.xml', '.mid', '.midi')):
+                messagebox.showerror("Error", "Fișierul trebuie să fie în format MusicXML (.xml) sau MIDI (.mid, .midi)!")
+                return
+
+            name = os.path.splitext(os.path.basename(self.input_file))[0]
+            self.start_job("notes", lucrare_note, (self.input_file, self.output_dir, name), self.notes_done)
         else:
             messagebox.showinfo("Info", "Extragerea notelor a fost deja finalizată. Afișăm rezultatele existente.")
             self.scan_files(self.output_dir_notes, "notes")
             self.create_buttons()
 
+    def notes_done(self, result, error):
+        """
+        Înregistrează rezultatele extragerii notelor.
+        """
+        try:
+            if error:
+                raise RuntimeError(error)
+            self.csv_file_notes, self.output_dir_notes = result
+            self.notes = True
+            # Adaugă toate fișierele din output_dir_notes și subdirectoare
+            self.register_files(self.output_dir_notes, "notes")
+
+            # Adaugă butoane suplimentare
+            self.add_analysis_buttons()
+
+            # Scanează fișierele și creează butoane doar pentru extragerea notelor
+            self.scan_files(self.output_dir_notes, "notes")
+            self.create_buttons()
+
+            messagebox.showinfo("Success", "Extragere note completă. Folosește butoanele pentru a vizualiza rezultatele.")
+        except Exception as e:
+            messagebox.showerror("Error", f"Eroare extragere note: {e}")
+
     def analyze_segmentation(self):
         """
         Rulează analiza segmentării partiturii.
@@ -197,51 +276,43 @@ class App:
             messagebox.showerror("Error", "No file selected!")
             return
 
-        if not self.segmentation_done:
-            try:
-                # Încarcă fișierul
-                if not self.input_file.endswith(('.xml', '.mid', '.midi')):
-                    messagebox.showerror("Error", "Fișierul trebuie să fie în format MusicXML (.xml) sau MIDI (.mid, .midi)!")
-                    return
-
-                try:
-                    self.part = converter.parse(self.input_file)
-                except Exception as e:
-                    try:
-                        self.part = corpus.parse(self.input_file)
-                    except Exception as e:
-                        messagebox.showerror("Error", f"Eroare încărcare fișier '{self.input_file}': {e}")
-                        return
-
-                name = os.path.splitext(os.path.basename(self.input_file))[0]
-                self.output_dir = os.path.join("output", name)
-                os.makedirs(self.output_dir, exist_ok=True)
-
-                # Salvează partitura ca MusicXML temporar
-                musicxml_path = os.path.join(self.output_dir, "partitura_temp.xml")
-                self.part.write('musicxml', fp=musicxml_path)
-
-                # Rulează analiza segmentării
-                self.output_dir_seg = segmentare(self.part, self.output_dir)
-                self.segmentation_done = True
-                # Adaugă toate fișierele din output_dir_seg și subdirectoare
-                for root, _, files in os.walk(self.output_dir_seg):
-                    for file in files:
-                        if file.endswith((".csv", ".png", ".json", ".txt")):
-                            self.generated_files["segmentation"].add(os.path.relpath(os.path.join(root, file), self.output_dir))
-
-                # Scanează fișierele și creează butoane
-                self.scan_files(self.output_dir_seg, "segmentation")
-                self.create_buttons()
-
-                messagebox.showinfo("Success", "Segmentare completă. Folosește butoanele pentru a vizualiza rezultatele.")
-            except Exception as e:
-                messagebox.showerror("Error", f"Eroare analiză segmentare: {e}")
+        if self.job_running("segmentation"):
+            messagebox.showinfo("Info", "Segmentarea rulează deja.")
+        elif not self.segmentation_done:
+            # Încarcă fișierul
+            if not self.input_file.endswith(('.xml', '.mid', '.midi')):
+                messagebox.showerror("Error", "Fișierul trebuie să fie în format MusicXML (.xml) sau MIDI (.mid, .midi)!")
+                return
+
+            # Cache-ul de acorduri din output/ este comun tuturor partiturilor analizate
+            cache_acorduri = os.path.join(os.path.dirname(self.output_dir), "cache_acorduri.json")
+            self.start_job("segmentation", partial(lucrare_segmentare, fisier_cache_acorduri=cache_acorduri),
+                           (self.input_file, self.output_dir), self.segmentation_finished)
         else:
             messagebox.showinfo("Info", "Extragerea segmentării a fost deja finalizată. Afișăm rezultatele existente.")
             self.scan_files(self.output_dir_seg, "segmentation")
             self.create_buttons()
 
+    def segmentation_finished(self, result, error):
+        """
+        Înregistrează rezultatele segmentării.
+        """
+        try:
+            if error:
+                raise RuntimeError(error)
+            self.output_dir_seg = result
+            self.segmentation_done = True
+            # Adaugă toate fișierele din output_dir_seg și subdirectoare
+            self.register_files(self.output_dir_seg, "segmentation")
+
+            # Scanează fișierele și creează butoane
+            self.scan_files(self.output_dir_seg, "segmentation")
+            self.create_buttons()
+
+            messagebox.showinfo("Success", "Segmentare completă. Folosește butoanele pentru a vizualiza rezultatele.")
+        except Exception as e:
+            messagebox.showerror("Error", f"Eroare analiză segmentare: {e}")
+
     def add_analysis_buttons(self):
         """
         Adaugă butoanele pentru analize suplimentare după analiza inițială a notelor.
@@ -263,26 +334,36 @@ class App:
         Rulează analiza detaliată a notelor muzicale din fișierul selectat.
         """
 
-        if not self.input_file or not self.part:
+        if not self.input_file or not self.notes:
             messagebox.showerror("Error", "Nicio partitură încărcată!")
             return
 
-        if not self.notes_analyzed:
-            try:
-                name = os.path.splitext(os.path.basename(self.input_file))[0]
-                self.output_dir_analyze_notes = analiza_note(self.csv_file_notes, self.output_dir_notes)
-                self.notes_analyzed = True
-                # Adaugă toate fișierele din output_dir_analyze_notes și subdirectoare
-                for root, _, files in os.walk(self.output_dir_analyze_notes):
-                    for file in files:
-                        if file.endswith((".csv", ".png", ".json", ".txt")):
-                            self.generated_files["notes_detail"].add(os.path.relpath(os.path.join(root, file), self.output_dir))
-                messagebox.showinfo("Success", "Analiza notelor completă. Folosește butoanele pentru a vizualiza rezultatele.")
-            except Exception as e:
-                messagebox.showerror("Error", f"Eroare analiză note: {e}")
+        if self.job_running("notes_detail"):
+            messagebox.showinfo("Info", "Analiza notelor rulează deja.")
+        elif not self.notes_analyzed:
+            self.start_job("notes_detail", lucrare_analiza_note, (self.csv_file_notes, self.output_dir_notes, self.output_dir), self.notes_detail_done)
         else:
             messagebox.showinfo("Info", "Analiză note detaliată deja completată. Afișare rezultate existente.")
 
+            # Actualizează butoanele cu fișierele existente pentru analiza detaliată
+            self.scan_files(self.output_dir_analyze_notes, "notes_detail")
+            self.create_buttons()
+
+    def notes_detail_done(self, result, error):
+        """
+        Înregistrează rezultatele analizei detaliate a notelor.
+        """
+        try:
+            if error:
+                raise RuntimeError(error)
+            self.output_dir_analyze_notes = result
+            self.notes_analyzed = True
+            # Adaugă toate fișierele din output_dir_analyze_notes și subdirectoare
+            self.register_files(self.output_dir_analyze_notes, "notes_detail")
+            messagebox.showinfo("Success", "Analiza notelor completă. Folosește butoanele pentru a vizualiza rezultatele.")
+        except Exception as e:
+            messagebox.showerror("Error", f"Eroare analiză note: {e}")
+
         # Actualizează butoanele cu fișierele existente pentru analiza detaliată
         self.scan_files(self.output_dir_analyze_notes, "notes_detail")
         self.create_buttons()
@@ -291,30 +372,36 @@ class App:
         """
         Rulează analiza pattern-urilor din partitura încărcată.
         """
-        if not self.input_file or not self.part:
+        if not self.input_file or not self.notes:
             messagebox.showerror("Error", "Niciun fișier sau partitură încărcată!")
             return
 
-        if not self.pattern_analyzed:
-            try:
-                # Implementare simplă a analizei pattern-urilor
-                name = os.path.splitext(os.path.basename(self.input_file))[0]
-                from vizualizare_pattern import generate_all_graphics  # Ajustează calea dacă este necesar
-                total_duration = int(self.part.flat.quarterLength)
-                output_json = os.path.join(self.output_dir, "patterns.json")
-                self.output_dir_pattern = pattern(self.csv_file_notes, self.output_dir, self.part)
-                self.pattern_analyzed = True
-                # Adaugă toate fișierele din output_dir_pattern și subdirectoare
-                for root, _, files in os.walk(self.output_dir_pattern):
-                    for file in files:
-                        if file.endswith((".json", ".png")):
-                            self.generated_files["pattern"].add(os.path.relpath(os.path.join(root, file), self.output_dir))
-                messagebox.showinfo("Success", "Analiza pattern-urilor a fost finalizată.")
-            except Exception as e:
-                messagebox.showerror("Error", f"Eroare analiză pattern-uri: {e}")
+        if self.job_running("pattern"):
+            messagebox.showinfo("Info", "Analiza pattern-urilor rulează deja.")
+        elif not self.pattern_analyzed:
+            self.start_job("pattern", lucrare_pattern, (self.input_file, self.csv_file_notes, self.output_dir), self.pattern_done)
         else:
             messagebox.showinfo("Info", "Analiza pattern-urilor a fost deja finalizată. Afișăm rezultatele existente.")
 
+            # Actualizează butoanele cu fișierele existente pentru analiza pattern-urilor
+            self.scan_files(self.output_dir_pattern, "pattern")
+            self.create_buttons()
+
+    def pattern_done(self, result, error):
+        """
+        Înregistrează rezultatele analizei pattern-urilor.
+        """
+        try:
+            if error:
+                raise RuntimeError(error)
+            self.output_dir_pattern = result
+            self.pattern_analyzed = True
+            # Adaugă toate fișierele din output_dir_pattern și subdirectoare
+            self.register_files(self.output_dir_pattern, "pattern", (".json", ".png"))
+            messagebox.showinfo("Success", "Analiza pattern-urilor a fost finalizată.")
+        except Exception as e:
+            messagebox.showerror("Error", f"Eroare analiză pattern-uri: {e}")
+
         # Actualizează butoanele cu fișierele existente pentru analiza pattern-urilor
         self.scan_files(self.output_dir_pattern, "pattern")
         self.create_buttons()
@@ -371,8 +458,8 @@ class App:
         for widget in self.button_scrollable_frame.winfo_children():
             widget.destroy()
 
-        # Adaugă buton pentru partitură
-        if self.part:
+        # Adaugă buton pentru partitură (MusicXML-ul temporar este scris de procesele de analiză)
+        if os.path.isfile(os.path.join(self.output_dir, "partitura_temp.xml")):
             part_button = tk.Button(self.button_scrollable_frame, text="Show Partitura", command=self.show_partitura)
             part_button.pack(anchor="w", pady=5)
 
@@ -439,15 +526,12 @@ class App:
         """
         Afișează partitura în MuseScore.
         """
-        if self.part:
+        musicxml_path = os.path.join(self.output_dir, "partitura_temp.xml")
+        if os.path.isfile(musicxml_path):
             try:
-                # Salvează partitura ca MusicXML temporar
-                musicxml_path = os.path.join(self.output_dir, "partitura_temp.xml")
-                self.part.write('musicxml', fp=musicxml_path)
-
-                # Deschide MuseScore cu fișierul MusicXML
+                # Deschide MuseScore cu fișierul MusicXML, fără a aștepta închiderea lui
                 musescore_path = "/usr/bin/musescore"
-                subprocess.run([musescore_path, musicxml_path])
+                subprocess.Popen([musescore_path, musicxml_path])
             except Exception as e:
                 messagebox.showerror("Error", f"Eroare afișare partitură: {e}. Asigură-te că MuseScore este instalat și accesibil la {musescore_path}.")
 
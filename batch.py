@@ -0,0 +1,293 @@
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import time
+from collections import Counter
+from contextlib import redirect_stdout
+from datetime import datetime
+from pattern import min_length, max_length
+from analizare_note import densitate_bins
+from cache_partitura import cache_comun
+
+# Extensiile fișierelor acceptate, ca în aplicație
+extensii = ('.xml', '.mid', '.midi')
+
+def gaseste_fisiere(intrari):
+    """
+    Găsește partiturile de procesat din directoare și/sau șabloane glob.
+
+    Args:
+        intrari (list): directoare, fișiere sau șabloane glob (ex. 'input/bach/', 'input/**/*.xml')
+
+    Return:
+        list: căile fișierelor, sortate și fără duplicate (directoarele de ieșire: vezi `nume_iesire`)
+    """
+    fisiere = set()
+    for intrare in intrari:
+        if os.path.isdir(intrare):
+            for root, _, files in os.walk(intrare):
+                fisiere.update(os.path.join(root, f) for f in files if f.lower().endswith(extensii))
+        else:
+            fisiere.update(f for f in glob.glob(intrare, recursive=True) if f.lower().endswith(extensii))
+    return sorted(fisiere)
+
+def nume_iesire(fisiere):
+    """
+    Numele directorului de ieșire al fiecărei partituri: numele fișierului, fără extensie.
+    Partiturile cu același nume din directoare diferite (ex. a/bwv1.6.xml și b/bwv1.6.xml) primesc
+    calea relativă față de directorul lor comun (a_bwv1.6, b_bwv1.6), ca să nu-și suprascrie rezultatele.
+
+    Args:
+        fisiere (list): căile partiturilor
+
+    Return:
+        dict: {fișier: numele directorului din output_root}
+    """
+    grupuri = {}
+    for input_file in fisiere:
+        grupuri.setdefault(os.path.splitext(os.path.basename(input_file))[0], []).append(input_file)
+
+    nume = {}
+    for name, grup in grupuri.items():
+        if len(grup) == 1:
+            nume[grup[0]] = name
+            continue
+        comun = os.path.commonpath([os.path.dirname(os.path.abspath(f)) for f in grup])
+        relative = {f: os.path.splitext(os.path.relpath(os.path.abspath(f), comun)) for f in grup}
+        fara_extensie = Counter(relativ for relativ, _ in relative.values())
+        for input_file, (relativ, extensie) in relative.items():
+            # Același nume în același director, cu extensii diferite (ex. bwv1.6.xml și bwv1.6.mid)
+            if fara_extensie[relativ] > 1:
+                relativ = f"{relativ}_{extensie.lstrip('.').lower()}"
+            nume[input_file] = relativ.replace(os.sep, '_')
+
+    duplicate = [n for n, numar in Counter(nume.values()).items() if numar > 1]
+    if duplicate:
+        raise ValueError(f"Mai multe partituri ar fi scrise în același director: {sorted(duplicate)}.")
+    return nume
+
+def proceseaza_fisier(input_file, output_root, optiuni, rezultate, instrumentare=None, name=None):
+    """
+    Punctul de intrare al procesului pentru o partitură: rulează pipeline-ul complet,
+    cu mesajele scrise în output/<nume>/batch.log, și trimite rezultatul prin coadă.
+
+    Args:
+        input_file (str): calea partiturii
+        output_root (str): directorul principal de ieșire
+        optiuni (dict): argumentele suplimentare pentru lucrare_completa
+        rezultate (multiprocessing.Queue): coada pentru rezultate
+        instrumentare (dict): nivelul mesajelor ('nivel'), trasarea etapelor în output/<nume>/trasare.json
+            ('trasare', 'memorie') și profilarea cProfile în output/<nume>/profil/ ('profil')
+        name (str): numele directorului din output_root (implicit numele fișierului, vezi `nume_iesire`)
+    """
+    if hasattr(os, 'setpgrp'):
+        # Grup de procese propriu, ca la timeout să fie oprite și procesele pornite de etape (pool-uri)
+        os.setpgrp()
+    name = name or os.path.splitext(os.path.basename(input_file))[0]
+    output_dir = os.path.join(output_root, name)
+    os.makedirs(output_dir, exist_ok=True)
+    instrumentare = instrumentare or {}
+    try:
+        with open(os.path.join(output_dir, 'batch.log'), 'w', encoding='utf-8') as log, redirect_stdout(log):
+            from lucrari import lucrare_completa
+            from instrumentare import seteaza_nivel, trasare
+            seteaza_nivel(instrumentare.get('nivel', 'INFO'))
+            if instrumentare.get('trasare') or instrumentare.get('profil'):
+                with trasare(os.path.join(output_dir, 'trasare.json'), instrumentare.get('memorie', True),
+                             os.path.join(output_dir, 'profil') if instrumentare.get('profil') else None):
+                    rezultat = lucrare_completa(input_file, output_dir, name, **optiuni)
+            else:
+                rezultat = lucrare_completa(input_file, output_dir, name, **optiuni)
+        rezultate.put((input_file, 'ok', rezultat))
+    except Exception as e:
+        rezultate.put((input_file, 'eroare', str(e)))
+
+def opreste_proces(process, asteptare=5):
+    """
+    Oprește procesul unei partituri împreună cu procesele pornite de el (pool-urile pentru pattern-uri
+    și grafice), trimițând semnalul întregului grup de procese. Unde grupurile nu există (Windows),
+    este oprit doar procesul.
+
+    Args:
+        process (multiprocessing.Process): procesul partiturii
+        asteptare (float): secundele așteptate după SIGTERM, înainte de SIGKILL
+    """
+    if not hasattr(os, 'killpg'):
+        process.terminate()
+        process.join()
+        return
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+    except ProcessLookupError:
+        # Procesul nu și-a creat încă grupul propriu
+        process.terminate()
+    process.join(asteptare)
+    try:
+        # Procesele din grup care nu s-au oprit, inclusiv cele rămase fără părinte
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    if process.is_alive():
+        process.kill()
+    process.join()
+
+def ruleaza_lot(fisiere, output_root, workers=1, timeout=None, optiuni=None, instrumentare=None):
+    """
+    Procesează partiturile în paralel, câte un proces pentru fiecare partitură.
+    Procesele care depășesc timpul limită sunt oprite.
+
+    Args:
+        fisiere (list): căile partiturilor
+        output_root (str): directorul principal de ieșire
+        workers (int): numărul maxim de partituri procesate simultan
+        timeout (float): timpul maxim pentru o partitură, în secunde (None = fără limită)
+        optiuni (dict): argumentele suplimentare pentru lucrare_completa (pattern_workers, min_length, ...)
+        instrumentare (dict): jurnalizarea și trasarea fiecărui proces (vezi proceseaza_fisier)
+
+    Return:
+        list: câte o intrare pentru fiecare fișier (status, durată, rezultate sau eroare)
+    """
+    optiuni = optiuni or {}
+    nume = nume_iesire(fisiere)
+    rezultate = multiprocessing.Queue()
+    in_asteptare = list(fisiere)
+    in_lucru = {}  # fișier -> (proces, momentul pornirii)
+    terminate = {}
+
+    def citeste_rezultate(timp_asteptare):
+        try:
+            while True:
+                input_file, status, continut = rezultate.get(timeout=timp_asteptare)
+                timp_asteptare = 0
+                if input_file in in_lucru:
+                    process, start = in_lucru.pop(input_file)
+                    process.join()
+                    intrare = {'input': input_file, 'status': status, 'seconds': round(time.time() - start, 3)}
+                    intrare['outputs' if status == 'ok' else 'error'] = continut
+                    terminate[input_file] = intrare
+                    print(f"[{len(terminate)}/{len(fisiere)}] {input_file}: {status}")
+        except queue.Empty:
+            pass
+
+    while in_asteptare or in_lucru:
+        while in_asteptare and len(in_lucru) < workers:
+            input_file = in_asteptare.pop(0)
+            # Procesele nu sunt daemon, ca să poată porni la rândul lor procese pentru pattern-uri
+            process = multiprocessing.Process(target=proceseaza_fisier, args=(input_file, output_root, optiuni, rezultate, instrumentare,
+                                                                                 nume[input_file]))
+            process.start()
+            in_lucru[input_file] = (process, time.time())
+
+        citeste_rezultate(0.2)
+
+        for input_file, (process, start) in list(in_lucru.items()):
+            if timeout is not None and process.is_alive() and time.time() - start > timeout:
+                opreste_proces(process)
+                del in_lucru[input_file]
+                terminate[input_file] = {'input': input_file, 'status': 'timeout', 'seconds': round(time.time() - start, 3),
+                                         'error': f"Timpul limită de {timeout} s a fost depășit."}
+                print(f"[{len(terminate)}/{len(fisiere)}] {input_file}: timeout")
+            elif not process.is_alive():
+                process.join()
+                citeste_rezultate(0.5)  # Rezultatul poate fi încă în coadă
+                if input_file in in_lucru:
+                    del in_lucru[input_file]
+                    terminate[input_file] = {'input': input_file, 'status': 'eroare', 'seconds': round(time.time() - start, 3),
+                                             'error': f"Procesul s-a oprit cu codul {process.exitcode}."}
+                    print(f"[{len(terminate)}/{len(fisiere)}] {input_file}: eroare")
+
+    return [terminate[input_file] for input_file in fisiere]
+
+def scrie_manifest(intrari, output_root, setari):
+    """
+    Scrie rezumatul lotului în output_root/manifest.json.
+
+    Args:
+        intrari (list): rezultatele întoarse de ruleaza_lot
+        output_root (str): directorul principal de ieșire
+        setari (dict): parametrii rulării
+
+    Return:
+        str: calea manifestului
+    """
+    manifest = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'settings': setari,
+        'total': len(intrari),
+        'ok': sum(1 for intrare in intrari if intrare['status'] == 'ok'),
+        'failed': sum(1 for intrare in intrari if intrare['status'] != 'ok'),
+        'files': intrari
+    }
+    os.makedirs(output_root, exist_ok=True)
+    path = os.path.join(output_root, 'manifest.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return path
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rulează pipeline-ul de analiză (note, analiză note, pattern, segmentare) fără interfață grafică.")
+    parser.add_argument('intrari', nargs='+', help="directoare, fișiere sau șabloane glob cu partituri .xml/.mid")
+    parser.add_argument('-o', '--output', default='output', help="directorul principal de ieșire (implicit: output)")
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count() or 1, help="numărul de partituri procesate simultan")
+    parser.add_argument('-t', '--timeout', type=float, default=None, help="timpul maxim pentru o partitură, în secunde")
+    parser.add_argument('--pattern-workers', type=int, default=1, help="numărul de procese pentru pattern-uri, în fiecare partitură")
+    parser.add_argument('--min-length', type=int, default=min_length, help=f"lungimea minimă a pattern-urilor (implicit: {min_length})")
+    parser.add_argument('--max-length', type=int, default=max_length, help=f"lungimea maximă a pattern-urilor (implicit: {max_length})")
+    parser.add_argument('--patterns-format', choices=['json', 'jsonl'], default='json',
+                        help="formatul rezultatelor pattern-urilor: tablou JSON sau JSON Lines (implicit: json)")
+    parser.add_argument('--patterns-compact', action='store_true', help="rezultatele pattern-urilor în schema compactă, numerică")
+    parser.add_argument('--patterns-gzip', action='store_true', help="comprimă rezultatele pattern-urilor cu gzip")
+    parser.add_argument('--top-k', type=int, default=0,
+                        help="salvează clasamentul celor mai semnificative K pattern-uri, cu câte un grafic (implicit: 0, fără clasament)")
+    parser.add_argument('--maximal', action='store_true',
+                        help="doar pattern-urile maximale, fără sub-pattern-urile incluse în altele mai lungi (ignoră --max-length); "
+                             "sunt găsite doar tiparele repetate identic, fără toleranța de ±1 semiton")
+    parser.add_argument('--density-bins', type=float, nargs='+', default=list(densitate_bins),
+                        help="rezoluțiile densității, în quarterLength (implicit: 1 2 4)")
+    parser.add_argument('--density-weighted', action='store_true', help="densitatea pe rezoluții ponderată cu durata notelor")
+    parser.add_argument('--key-window', type=int, default=1, help="numărul de măsuri din fereastra de analiză a tonalității (implicit: 1)")
+    parser.add_argument('--no-chord-cache', action='store_true', help="nu folosește cache-ul de acorduri de pe disc (output/cache_acorduri.json)")
+    parser.add_argument('--no-plots', action='store_true', help="nu generează graficele, doar fișierele CSV/JSON")
+    parser.add_argument('--plot-workers', type=int, default=1, help="numărul de procese pentru randarea graficelor, în fiecare partitură")
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help="nivelul mesajelor din batch.log (DEBUG afișează și fiecare fișier scris)")
+    parser.add_argument('--trace', action='store_true', help="scrie timpii, memoria și contoarele etapelor în output/<nume>/trasare.json")
+    parser.add_argument('--trace-no-memory', action='store_true', help="trasare fără măsurarea memoriei (tracemalloc încetinește rularea)")
+    parser.add_argument('--profile', action='store_true', help="salvează câte un profil cProfile pe etapă în output/<nume>/profil/")
+    parser.add_argument('-f', '--force', action='store_true', help="rulează toate etapele, chiar dacă rezultatele sunt actualizate")
+    args = parser.parse_args(argv)
+
+    fisiere = gaseste_fisiere(args.intrari)
+    if not fisiere:
+        print("Nu s-au găsit partituri de procesat.")
+        return 1
+    try:
+        nume_iesire(fisiere)
+    except ValueError as e:
+        print(e)
+        return 1
+
+    print(f"Procesez {len(fisiere)} partituri cu {args.workers} procese...")
+    optiuni = {'pattern_workers': args.pattern_workers, 'min_length': args.min_length,
+               'max_length': args.max_length, 'fortat': args.force, 'format_rezultate': args.patterns_format,
+               'compact': args.patterns_compact, 'comprimat': args.patterns_gzip, 'top_k': args.top_k,
+               'maximal': args.maximal, 'grafice': not args.no_plots, 'grafice_workers': args.plot_workers,
+               'bin_sizes': tuple(args.density_bins), 'ponderat': args.density_weighted,
+               'fereastra_tonalitate': args.key_window,
+               'fisier_cache_acorduri': None if args.no_chord_cache else os.path.join(args.output, 'cache_acorduri.json'),
+               'director_cache': os.path.join(args.output, cache_comun)}
+    instrumentare = {'nivel': args.log_level, 'trasare': args.trace, 'memorie': not args.trace_no_memory,
+                     'profil': args.profile}
+    intrari = ruleaza_lot(fisiere, args.output, args.workers, args.timeout, optiuni, instrumentare)
+    setari = {'workers': args.workers, 'timeout': args.timeout, **optiuni}
+    manifest = scrie_manifest(intrari, args.output, setari)
+    print(f"Manifestul lotului a fost salvat în {manifest}.")
+    return 0 if all(intrare['status'] == 'ok' for intrare in intrari) else 2
+
+if __name__ == "__main__":
+    sys.exit(main())
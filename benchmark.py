@@ -0,0 +1,221 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+import music21
+from music21 import stream, note, meter, tempo, corpus, converter
+from note import extrage_note_muzicale
+from pattern import load_triplets, triplets_to_intervals, similarity_function, pattern, min_length
+from analizare_note import analiza_note
+from segmentare import analizare_tonalitate, acorduri
+from cache_acorduri import cache
+from randare import randare_amanata
+
+# Parametri
+dimensiuni = [100, 1000, 10000, 100000]  # Numărul total de note al partiturilor generate
+voci = [1, 4, 16]  # Numărul de voci al partiturilor generate
+piese_corpus = ['bach/bwv66.6', 'bach/bwv1.6', 'bach/bwv4.8']  # Piese din corpus-ul music21 (disponibile offline)
+repetari = 3  # Fiecare etapă se rulează de atâtea ori; se păstrează timpul minim
+toleranta = 0.25  # Creșterea relativă a timpului peste care o etapă este considerată regresie
+
+def partitura_sintetica(numar_note, numar_voci, seed=0):
+    """
+    Generează o partitură aleatoare, reproductibilă, cu notele împărțite egal între voci.
+    Vocile se mișcă pe o gamă diatonică cu pași mici, ca să existe tipare repetate.
+
+    Args:
+        numar_note (int): numărul total de note
+        numar_voci (int): numărul de voci
+        seed (int): sămânța generatorului aleator
+
+    Return:
+        music21.Score: partitura generată
+    """
+    r = random.Random(seed)
+    gama = [0, 2, 4, 5, 7, 9, 11]
+    durate = [0.25, 0.5, 0.5, 1.0, 1.0, 1.0, 1.5, 2.0]
+    partitura = stream.Score()
+    for v in range(numar_voci):
+        part = stream.Part()
+        part.partName = f"Voce {v + 1}"
+        part.append(meter.TimeSignature('4/4'))
+        if v == 0:
+            part.append(tempo.MetronomeMark(number=96))
+        treapta = 7 * (3 + v % 3)
+        for _ in range(numar_note // numar_voci):
+            treapta = min(max(treapta + r.choice([-2, -1, -1, 0, 1, 1, 2]), 14), 48)
+            midi = 12 * (treapta // 7) + gama[treapta % 7]
+            part.append(note.Note(midi, quarterLength=r.choice(durate)))
+        part.makeMeasures(inPlace=True)
+        partitura.insert(0, part)
+    return partitura
+
+def cronometreaza(functie, repetari=repetari):
+    """
+    Rulează functie() de mai multe ori, fără mesajele afișate, și păstrează timpul minim.
+
+    Args:
+        functie (callable): etapa măsurată
+        repetari (int): numărul de rulări
+
+    Return:
+        tuple: (timpul minim în secunde, rezultatul ultimei rulări)
+    """
+    timpi = []
+    rezultat = None
+    for _ in range(repetari):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            rezultat = functie()
+            timpi.append(time.perf_counter() - start)
+    return min(timpi), rezultat
+
+def masoara_partitura(nume, partitura, repetari=repetari):
+    """
+    Măsoară toate etapele pipeline-ului pe o partitură. Graficele sunt dezactivate,
+    ca timpii să reflecte doar analiza.
+
+    Args:
+        nume (str): numele cazului
+        partitura (music21.Score): partitura
+        repetari (int): numărul de rulări pentru fiecare etapă
+
+    Return:
+        list: {'case', 'stage', 'seconds', 'notes', 'voices'} pentru fiecare etapă
+    """
+    rezultate = []
+    numar_note = len(partitura.flatten().notes)
+    numar_voci = len(partitura.parts)
+
+    def adauga(etapa, secunde):
+        rezultate.append({'case': nume, 'stage': etapa, 'seconds': round(secunde, 6),
+                          'notes': numar_note, 'voices': numar_voci})
+        print(f"{nume:>32} {etapa:>22}: {secunde:9.4f} s", file=sys.stderr)
+
+    with tempfile.TemporaryDirectory() as output_dir, randare_amanata(activ=False):
+        secunde, (csv_file, output_dir_notes) = cronometreaza(
+            lambda: extrage_note_muzicale(partitura, nume, output_dir), repetari)
+        adauga('extrage_note_muzicale', secunde)
+
+        secunde, voices = cronometreaza(lambda: load_triplets(csv_file), repetari)
+        adauga('load_triplets', secunde)
+
+        intervale = {voce: triplets_to_intervals(triplets) for voce, triplets in voices.items()}
+        sursa = next((i for i in intervale.values() if len(i) >= min_length - 1), None)
+        if sursa is not None:
+            tipar = tuple(sursa[:min_length - 1])
+            secunde, _ = cronometreaza(lambda: [similarity_function(tipar, i) for i in intervale.values()], repetari)
+            adauga('similarity_function', secunde)
+
+        secunde, _ = cronometreaza(lambda: pattern(csv_file, output_dir, partitura), repetari)
+        adauga('pattern', secunde)
+
+        secunde, _ = cronometreaza(lambda: analiza_note(csv_file, output_dir_notes), repetari)
+        adauga('analiza_note', secunde)
+
+        secunde, _ = cronometreaza(lambda: analizare_tonalitate(partitura), repetari)
+        adauga('analizare_tonalitate', secunde)
+
+        def acorduri_fara_cache():
+            cache.goleste()
+            return acorduri(partitura)
+        secunde, _ = cronometreaza(acorduri_fara_cache, repetari)
+        adauga('acorduri', secunde)
+    return rezultate
+
+def ruleaza_benchmark(dimensiuni=dimensiuni, voci=voci, piese=piese_corpus, fisiere=(), repetari=repetari):
+    """
+    Rulează benchmark-ul pe partiturile generate, pe piesele din corpus și pe fișierele date.
+
+    Return:
+        dict: metadatele rulării și rezultatele fiecărei etape
+    """
+    rezultate = []
+    for numar_note in dimensiuni:
+        for numar_voci in voci:
+            if numar_note < numar_voci * min_length:
+                continue
+            partitura = partitura_sintetica(numar_note, numar_voci)
+            rezultate += masoara_partitura(f"synthetic-n{numar_note}-v{numar_voci}", partitura, repetari)
+    for piesa in piese:
+        try:
+            partitura = corpus.parse(piesa)
+        except Exception as e:
+            print(f"Piesa '{piesa}' nu este disponibilă în corpus: {e}", file=sys.stderr)
+            continue
+        rezultate += masoara_partitura(f"corpus-{piesa}", partitura, repetari)
+    for fisier in fisiere:
+        rezultate += masoara_partitura(f"file-{os.path.basename(fisier)}", converter.parse(fisier), repetari)
+
+    return {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'music21': music21.__version__,
+            'repeats': repetari
+        },
+        'results': rezultate
+    }
+
+def compara(curent, referinta, toleranta=toleranta):
+    """
+    Compară timpii cu o rulare de referință.
+
+    Args:
+        curent (dict): rezultatele rulării curente
+        referinta (dict): rezultatele rulării de referință
+        toleranta (float): creșterea relativă permisă (0.25 = cu 25% mai lent)
+
+    Return:
+        list: regresiile (case, stage, timp de referință, timp curent)
+    """
+    timpi_referinta = {(r['case'], r['stage']): r['seconds'] for r in referinta['results']}
+    regresii = []
+    for r in curent['results']:
+        vechi = timpi_referinta.get((r['case'], r['stage']))
+        if vechi and r['seconds'] > vechi * (1 + toleranta):
+            regresii.append((r['case'], r['stage'], vechi, r['seconds']))
+    return regresii
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark pentru toate etapele pipeline-ului de analiză.")
+    parser.add_argument('-o', '--output', default='benchmark.json', help="fișierul JSON cu rezultatele")
+    parser.add_argument('--sizes', type=int, nargs='*', default=dimensiuni, help="numărul de note al partiturilor generate")
+    parser.add_argument('--voices', type=int, nargs='*', default=voci, help="numărul de voci al partiturilor generate")
+    parser.add_argument('--corpus', nargs='*', default=piese_corpus, help="piese din corpus-ul music21")
+    parser.add_argument('--files', nargs='*', default=[], help="fișiere MusicXML/MIDI suplimentare (ex. input/bach/bwv66.6.xml)")
+    parser.add_argument('--repeats', type=int, default=repetari, help="numărul de rulări pentru fiecare etapă")
+    parser.add_argument('--compare', help="fișierul JSON al unei rulări de referință")
+    parser.add_argument('--tolerance', type=float, default=toleranta, help="creșterea relativă permisă față de referință")
+    args = parser.parse_args(argv)
+
+    rezultat = ruleaza_benchmark(args.sizes, args.voices, args.corpus, args.files, args.repeats)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(rezultat, f, indent=2)
+    print(f"Rezultatele au fost salvate în {args.output}.")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            referinta = json.load(f)
+        regresii = compara(rezultat, referinta, args.tolerance)
+        for case, stage, vechi, nou in regresii:
+            print(f"REGRESIE {case} / {stage}: {vechi:.4f} s -> {nou:.4f} s (+{(nou / vechi - 1) * 100:.0f}%)")
+        if regresii:
+            return 1
+        print(f"Nicio etapă nu a încetinit cu mai mult de {args.tolerance * 100:.0f}%.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
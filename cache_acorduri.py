@@ -0,0 +1,156 @@
+import json
+import os
+from collections import OrderedDict
+import music21
+from music21 import chord, roman
+
+# Parametri
+max_intrari = 20000  # Numărul maxim de sonorități păstrate în cache (LRU)
+
+class CacheAcorduri:
+    """
+    Cache LRU pentru numele acordurilor, cu cheie dată de mulțimea normalizată a înălțimilor
+    (bas și clasele de înălțime scrise, fără octave și dublări). Poate fi salvat pe disc
+    și folosit de mai multe partituri / procese.
+    """
+
+    def __init__(self, max_intrari=max_intrari, fisier=None):
+        self.max_intrari = max_intrari
+        self.fisier = fisier
+        self.intrari = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if fisier:
+            self.incarca(fisier)
+
+    def obtine(self, cheie, calcul):
+        """
+        Valoarea pentru cheie, calculată cu calcul() doar la prima cerere.
+
+        Args:
+            cheie (str): cheia normalizată
+            calcul (callable): calculează valoarea (trebuie să poată fi salvată în JSON)
+
+        Return:
+            valoarea din cache
+        """
+        if cheie in self.intrari:
+            self.hits += 1
+            self.intrari.move_to_end(cheie)
+            return self.intrari[cheie]
+        self.misses += 1
+        valoare = calcul()
+        self.intrari[cheie] = valoare
+        if len(self.intrari) > self.max_intrari:
+            self.intrari.popitem(last=False)
+        return valoare
+
+    def statistici(self):
+        """
+        Return:
+            dict: numărul de intrări, hits, misses și rata de hit
+        """
+        total = self.hits + self.misses
+        return {'intrari': len(self.intrari), 'hits': self.hits, 'misses': self.misses,
+                'rata_hit': self.hits / total if total else 0.0}
+
+    def goleste(self):
+        """
+        Șterge intrările și contoarele (ex. între rulările unui benchmark).
+        """
+        self.intrari.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def incarca(self, fisier):
+        """
+        Încarcă intrările salvate pe disc, dacă fișierul există și a fost creat cu aceeași versiune music21.
+
+        Args:
+            fisier (str): calea fișierului JSON
+        """
+        self.fisier = fisier
+        try:
+            with open(fisier, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('music21') != music21.__version__:
+            return
+        for cheie, valoare in data.get('intrari', {}).items():
+            self.intrari.setdefault(cheie, valoare)
+        while len(self.intrari) > self.max_intrari:
+            self.intrari.popitem(last=False)
+
+    def salveaza(self, fisier=None):
+        """
+        Salvează intrările pe disc, împreună cu cele scrise între timp de alte procese.
+        Fișierul este înlocuit atomic.
+
+        Args:
+            fisier (str): calea fișierului JSON (implicit cel din care s-a încărcat cache-ul)
+        """
+        fisier = fisier or self.fisier
+        if not fisier:
+            return
+        self.incarca(fisier)  # Păstrează intrările adăugate de alte procese
+        os.makedirs(os.path.dirname(fisier) or '.', exist_ok=True)
+        tmp = f"{fisier}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'music21': music21.__version__, 'intrari': self.intrari}, f, ensure_ascii=False)
+        os.replace(tmp, fisier)
+
+# Cache-ul comun al procesului, folosit de segmentare
+cache = CacheAcorduri()
+
+def cheie_acord(pitches):
+    """
+    Cheia normalizată a unei sonorități: basul și clasele de înălțime scrise, sortate.
+    Ortografia se păstrează deoarece numele acordului depinde de ea (ex. C#-E-G# față de D--F-A-).
+
+    Args:
+        pitches (list): obiectele music21.pitch.Pitch care sună simultan
+
+    Return:
+        str: cheia
+    """
+    bas = min(pitches, key=lambda p: p.ps)
+    return f"{bas.name}|{','.join(sorted({p.name for p in pitches}))}"
+
+def info_acord(pitches, cache_acorduri=None):
+    """
+    Numele acordului (pitchedCommonName), numele comun și fundamentala, din cache.
+
+    Args:
+        pitches (list): obiectele music21.pitch.Pitch care sună simultan
+        cache_acorduri (CacheAcorduri): cache-ul folosit (implicit cel comun)
+
+    Return:
+        dict: {'name', 'common_name', 'root'}
+    """
+    def calcul():
+        acord = chord.Chord(pitches)
+        return {'name': acord.pitchedCommonName, 'common_name': acord.commonName, 'root': acord.root().name}
+    return (cache_acorduri or cache).obtine(cheie_acord(pitches), calcul)
+
+def nume_acord(pitches, cache_acorduri=None):
+    """
+    Numele acordului format din înălțimile date (ex. "C-major triad").
+    """
+    return info_acord(pitches, cache_acorduri)['name']
+
+def roman_acord(pitches, tonalitate, cache_acorduri=None):
+    """
+    Cifrajul roman al sonorității în tonalitatea dată, din cache.
+
+    Args:
+        pitches (list): obiectele music21.pitch.Pitch care sună simultan
+        tonalitate (music21.key.Key): tonalitatea de referință
+        cache_acorduri (CacheAcorduri): cache-ul folosit (implicit cel comun)
+
+    Return:
+        str: cifrajul (ex. "V7")
+    """
+    cheie = f"roman|{tonalitate.tonicPitchNameWithCase}|{cheie_acord(pitches)}"
+    return (cache_acorduri or cache).obtine(
+        cheie, lambda: roman.romanNumeralFromChord(chord.Chord(pitches), tonalitate).figure)
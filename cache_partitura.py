@@ -0,0 +1,166 @@
+import hashlib
+import os
+import music21
+from music21 import converter, corpus
+from instrumentare import jurnal
+
+log = jurnal("cache")
+
+# Parametri
+cache_subdir = "cache"  # Subdirectorul din output/<nume>/ unde se păstrează partiturile parsate
+cache_comun = "cache_partituri"  # Directorul din output/ cu cache-ul comun al unui lot (vezi batch.py)
+max_cache_bytes = 512 * 1024 * 1024  # Dimensiunea maximă a unui director de cache (octeți)
+
+def hash_fisier(input_file, chunk_size=1 << 20):
+    """
+    Calculează hash-ul SHA-256 al conținutului unui fișier.
+
+    Args:
+        input_file (str): calea fișierului
+        chunk_size (int): dimensiunea blocurilor citite
+
+    Return:
+        str: hash-ul în hexazecimal
+    """
+    h = hashlib.sha256()
+    with open(input_file, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def cheie_cache(input_file):
+    """
+    Cheia cache-ului: hash-ul conținutului fișierului și versiunea music21,
+    deoarece formatul obiectelor serializate depinde de versiune.
+
+    Args:
+        input_file (str): calea fișierului de intrare
+
+    Return:
+        str: cheia cache-ului
+    """
+    return f"{hash_fisier(input_file)}_{music21.__version__}"
+
+def parseaza_partitura(input_file):
+    """
+    Parsează partitura cu music21, încercând corpus-ul dacă fișierul nu poate fi citit direct.
+
+    Args:
+        input_file (str): calea fișierului de intrare
+
+    Return:
+        music21.Score: partitura parsată
+    """
+    try:
+        return converter.parse(input_file)
+    except Exception:
+        return corpus.parse(input_file)
+
+def sterge(path):
+    """
+    Șterge un fișier, fără eroare dacă a fost deja șters (ex. de alt proces).
+
+    Args:
+        path (str): calea fișierului
+    """
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def evacuare_lru(cache_dir, max_bytes=max_cache_bytes, pastreaza=None):
+    """
+    Șterge intrările cele mai vechi (după ultima accesare) până când cache-ul încape în limita dată.
+
+    Args:
+        cache_dir (str): directorul cache-ului
+        max_bytes (int): dimensiunea maximă a cache-ului
+        pastreaza (str): intrarea care nu se șterge (cea tocmai folosită)
+    """
+    if not os.path.isdir(cache_dir):
+        return
+    intrari = []
+    for file in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, file)
+        if not file.endswith('.p'):
+            continue
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue  # Ștearsă între timp de alt proces care folosește același cache
+        intrari.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in intrari)
+    for _, size, path in sorted(intrari):
+        if total <= max_bytes:
+            break
+        if path == pastreaza:
+            continue
+        sterge(path)
+        total -= size
+        log.info(f"Cache: intrarea '{path}' a fost ștearsă (LRU).")
+
+def invalideaza_cache(cache_dir, input_file=None):
+    """
+    Șterge intrările din cache: doar cea a fișierului dat sau, fără fișier, toate.
+
+    Args:
+        cache_dir (str): directorul cache-ului
+        input_file (str): fișierul de intrare a cărui intrare se șterge (opțional)
+    """
+    if not os.path.isdir(cache_dir):
+        return
+    if input_file is not None:
+        sterge(os.path.join(cache_dir, f"{cheie_cache(input_file)}.p"))
+        return
+    for file in os.listdir(cache_dir):
+        if file.endswith('.p'):
+            sterge(os.path.join(cache_dir, file))
+
+def incarca_partitura(input_file, output_dir, max_bytes=max_cache_bytes, cache_dir=None):
+    """
+    Încarcă partitura din cache-ul persistent dacă fișierul a mai fost analizat, altfel o parsează
+    și o salvează în cache (freeze/thaw din music21).
+
+    Limita max_bytes se aplică fiecărui director de cache. Implicit cache-ul este în directorul piesei
+    (output/<nume>/cache), deci limita este pe partitură; un lot transmite un director comun
+    (output/cache_partituri), ca limita să fie pe tot lotul.
+
+    Args:
+        input_file (str): calea fișierului MusicXML/MIDI
+        output_dir (str): directorul piesei (output/<nume>)
+        max_bytes (int): dimensiunea maximă a cache-ului
+        cache_dir (str): directorul cache-ului, comun mai multor partituri (implicit output_dir/cache)
+
+    Return:
+        music21.Score: partitura
+    """
+    if not os.path.isfile(input_file):
+        # Nume din corpus-ul music21, fără fișier pe disc de care să legăm cache-ul
+        return parseaza_partitura(input_file)
+
+    cache_dir = cache_dir or os.path.join(output_dir, cache_subdir)
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"{cheie_cache(input_file)}.p")
+
+    if os.path.isfile(path):
+        try:
+            partitura = converter.thaw(path)
+            os.utime(path)  # Marchează intrarea ca folosită recent, pentru LRU
+            log.info(f"Cache: partitura a fost încărcată din '{path}'.")
+            return partitura
+        except Exception as e:
+            log.warning(f"Cache: intrarea '{path}' nu poate fi citită ({e}). O voi regenera.")
+            sterge(path)
+
+    partitura = parseaza_partitura(input_file)
+    # Scrierea se face într-un fișier temporar, înlocuit atomic, ca alt proces să nu citească
+    # o intrare scrisă pe jumătate
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        converter.freeze(partitura, fmt='pickle', fp=tmp)
+        os.replace(tmp, path)
+        evacuare_lru(cache_dir, max_bytes, pastreaza=path)
+    except Exception as e:
+        log.warning(f"Cache: partitura nu a putut fi salvată în '{path}': {e}")
+        sterge(tmp)
+    return partitura
@@ -0,0 +1,236 @@
+import csv
+import os
+import numpy as np
+from randare import programeaza_grafic, grafice_active
+from rezultate_pattern import incarca_rezultate
+from vizualizare_pattern import date_grafic, generate_graphic
+
+# Parametri
+criterii = ('coverage', 'voices', 'exact', 'length')  # Coloanele matricei de caracteristici
+ponderi_implicite = {'coverage': 0.4, 'voices': 0.2, 'exact': 0.2, 'length': 0.2}  # Ponderile scorului
+top_k = 10  # Numărul implicit de pattern-uri din clasament
+
+def acoperire(grup, inceputuri, sfarsituri, numar_grupuri):
+    """
+    Lungimea reuniunii intervalelor [început, sfârșit) din fiecare grup; suprapunerile sunt numărate
+    o singură dată. Toate grupurile sunt calculate deodată.
+
+    Args:
+        grup (np.ndarray): grupul (pattern-ul) fiecărui interval, 0..numar_grupuri-1
+        inceputuri (np.ndarray): începuturile intervalelor
+        sfarsituri (np.ndarray): sfârșiturile intervalelor
+        numar_grupuri (int): numărul de grupuri
+
+    Return:
+        np.ndarray: lungimea reuniunii pentru fiecare grup
+    """
+    if len(grup) == 0:
+        return np.zeros(numar_grupuri)
+    # Fiecare grup este mutat pe axa timpului după cel anterior, ca maximul cumulat să nu treacă între grupuri
+    deplasare = grup * (float(max(sfarsituri.max(), 0.0) - min(inceputuri.min(), 0.0)) + 1.0)
+    inceputuri = inceputuri + deplasare
+    sfarsituri = sfarsituri + deplasare
+    ordine = np.lexsort((inceputuri, grup))
+    inceputuri = inceputuri[ordine]
+    # Cel mai mare sfârșit de până acum; fiecare interval adaugă doar partea de după el
+    maxim = np.maximum.accumulate(sfarsituri[ordine])
+    anterior = np.concatenate([[-np.inf], maxim[:-1]])
+    contributii = np.clip(maxim - np.maximum(inceputuri, anterior), 0, None)
+    return np.bincount(grup[ordine], weights=contributii, minlength=numar_grupuri)
+
+def index_start(aparitie, voices):
+    """
+    Indexul primei note a unei apariții în voce. Pentru rezultatele citite din patterns.json cu text,
+    care nu păstrează indexul, este nota cu același onset de la care încep aceleași intervale
+    (notele unui acord au același onset).
+
+    Args:
+        aparitie (Aparitie): apariția
+        voices (dict): vocile, cu tablourile (pitch, onset, duration)
+
+    Return:
+        int: indexul primei note
+    """
+    if aparitie.start is not None:
+        return aparitie.start
+    pitch, onset, _ = voices[aparitie.voice]
+    stanga = int(np.searchsorted(onset, aparitie.onset - 1e-6))
+    dreapta = int(np.searchsorted(onset, aparitie.onset + 1e-6))
+    intervale = np.array(aparitie.intervals, dtype=np.int64)
+    for start in range(stanga, dreapta):
+        if np.array_equal(np.diff(pitch[start:start + aparitie.num_notes]), intervale):
+            return start
+    return min(stanga, len(onset) - 1)
+
+def aparitii_plate(rezultate, voices):
+    """
+    Toate aparițiile (sursa și potrivirile) tuturor pattern-urilor, ca tablouri plate: pattern-ul,
+    vocea și intervalul de timp, de la onset-ul primei note până la sfârșitul ultimei note.
+
+    Args:
+        rezultate (list): obiectele RezultatPattern
+        voices (dict): vocile, cu tablourile (pitch, onset, duration)
+
+    Return:
+        tuple: (pattern, voce, început, sfârșit), tablouri cu câte un element pentru fiecare apariție
+    """
+    nume_voci = {voice_name: i for i, voice_name in enumerate(voices)}
+    pattern_id, voce, start, numar_note = [], [], [], []
+    for i, rezultat in enumerate(rezultate):
+        for aparitie in [rezultat.source] + rezultat.matches:
+            pattern_id.append(i)
+            voce.append(nume_voci[aparitie.voice])
+            start.append(index_start(aparitie, voices))
+            numar_note.append(aparitie.num_notes)
+    pattern_id = np.array(pattern_id, dtype=np.int64)
+    voce = np.array(voce, dtype=np.int64)
+    start = np.array(start, dtype=np.int64)
+    ultima = start + np.array(numar_note, dtype=np.int64) - 1
+
+    inceputuri = np.zeros(len(start))
+    sfarsituri = np.zeros(len(start))
+    for voice_name, v in nume_voci.items():
+        _, onset, duration = voices[voice_name]
+        alese = np.flatnonzero(voce == v)
+        if len(alese):
+            ultima_voce = np.minimum(ultima[alese], len(onset) - 1)
+            inceputuri[alese] = onset[start[alese]]
+            sfarsituri[alese] = onset[ultima_voce] + duration[ultima_voce]
+    return pattern_id, voce, inceputuri, sfarsituri
+
+def caracteristici(rezultate, voices):
+    """
+    Matricea caracteristicilor pattern-urilor, fiecare coloană normalizată la [0, 1]:
+    - coverage: reuniunea intervalelor de timp ale sursei și potrivirilor, raportată la durata piesei
+    - voices: numărul de voci în care apare pattern-ul, raportat la numărul de voci al piesei
+    - exact: proporția potrivirilor cu aceleași intervale melodice ca sursa
+    - length: numărul de note, raportat la cel mai lung pattern
+
+    Args:
+        rezultate (list): obiectele RezultatPattern
+        voices (dict): vocile, cu tablourile (pitch, onset, duration)
+
+    Return:
+        np.ndarray: matricea (len(rezultate), len(criterii))
+    """
+    numar = len(rezultate)
+    pattern_id, voce, inceputuri, sfarsituri = aparitii_plate(rezultate, voices)
+    durata_totala = max((float((onset + duration).max()) for _, onset, duration in voices.values() if len(onset)),
+                        default=0.0)
+
+    acoperiri = acoperire(pattern_id, inceputuri, sfarsituri, numar)
+    perechi = np.unique(pattern_id * max(len(voices), 1) + voce)
+    voci = np.bincount(perechi // max(len(voices), 1), minlength=numar).astype(np.float64)
+    numar_potriviri = np.bincount(pattern_id, minlength=numar) - 1
+    exacte = np.array([rezultat.potriviri_exacte() for rezultat in rezultate], dtype=np.float64)
+    exacte = np.divide(exacte, numar_potriviri, out=np.zeros(numar), where=numar_potriviri > 0)
+    lungimi = np.array([rezultat.source.num_notes for rezultat in rezultate], dtype=np.float64)
+
+    matrice = np.column_stack([acoperiri, voci, exacte, lungimi]) if numar else np.zeros((0, len(criterii)))
+    maxime = matrice.max(axis=0) if numar else np.ones(len(criterii))
+    maxime[criterii.index('coverage')] = durata_totala
+    maxime[criterii.index('voices')] = len(voices)
+    maxime[criterii.index('exact')] = 1.0
+    maxime[maxime == 0] = 1.0
+    return matrice / maxime
+
+def vector_ponderi(ponderi=None):
+    """
+    Ponderile criteriilor, în ordinea coloanelor din `caracteristici`.
+
+    Args:
+        ponderi (dict): ponderea fiecărui criteriu (implicit ponderi_implicite; criteriile lipsă au ponderea 0)
+
+    Return:
+        np.ndarray: vectorul ponderilor
+    """
+    ponderi = ponderi_implicite if ponderi is None else ponderi
+    necunoscute = set(ponderi) - set(criterii)
+    if necunoscute:
+        raise ValueError(f"Criterii necunoscute: {sorted(necunoscute)}. Criteriile sunt {criterii}.")
+    return np.array([ponderi.get(criteriu, 0.0) for criteriu in criterii], dtype=np.float64)
+
+def scoruri(rezultate, voices, ponderi=None):
+    """
+    Scorul ponderat al fiecărui pattern, calculat pentru toate deodată.
+
+    Args:
+        rezultate (list): obiectele RezultatPattern
+        voices (dict): vocile, cu tablourile (pitch, onset, duration)
+        ponderi (dict): ponderile criteriilor (vezi `vector_ponderi`)
+
+    Return:
+        np.ndarray: scorurile, în ordinea rezultatelor
+    """
+    return caracteristici(rezultate, voices) @ vector_ponderi(ponderi)
+
+def top_patternuri(rezultate, voices, k=top_k, ponderi=None):
+    """
+    Cele mai semnificative k pattern-uri, după scorul ponderat. Selecția se face cu argpartition,
+    iar la scor egal câștigă pattern-ul găsit primul.
+
+    Args:
+        rezultate (list): obiectele RezultatPattern
+        voices (dict): vocile, cu tablourile (pitch, onset, duration)
+        k (int): numărul de pattern-uri
+        ponderi (dict): ponderile criteriilor (vezi `scoruri`)
+
+    Return:
+        list: tupluri (rezultat, scor, caracteristici), în ordinea descrescătoare a scorului
+    """
+    if not rezultate or k <= 0:
+        return []
+    matrice = caracteristici(rezultate, voices)
+    scor = matrice @ vector_ponderi(ponderi)
+    k = min(k, len(rezultate))
+    # Pragul celui de-al k-lea scor, apoi toate pattern-urile peste prag (inclusiv egalitățile), ordonate stabil
+    prag = scor[np.argpartition(-scor, k - 1)[k - 1]]
+    candidati = np.flatnonzero(scor >= prag)
+    alesi = candidati[np.lexsort((candidati, -scor[candidati]))][:k]
+    return [(rezultate[i], float(scor[i]), dict(zip(criterii, matrice[i].tolist()))) for i in alesi]
+
+def scrie_clasament(top, output_file):
+    """
+    Salvează clasamentul într-un fișier CSV.
+
+    Args:
+        top (list): rezultatul `top_patternuri`
+        output_file (str): calea fișierului CSV
+    """
+    with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(['rank', 'score', *criterii, 'source_voice', 'onset', 'num_notes', 'total_matches', 'exact_matches'])
+        for rang, (rezultat, scor, valori) in enumerate(top, 1):
+            writer.writerow([rang, round(scor, 4), *(round(valori[criteriu], 4) for criteriu in criterii),
+                             rezultat.source.voice, rezultat.source.onset, rezultat.source.num_notes,
+                             rezultat.total_matches, rezultat.potriviri_exacte()])
+
+def generate_top_graphics(json_file, total_duration, output_dir, voices, k=top_k, ponderi=None, rezultate=None):
+    """
+    Clasamentul celor mai semnificative k pattern-uri (pattern_top.csv) și câte un grafic pentru fiecare
+    (pattern_top_01.png, pattern_top_02.png, ...).
+
+    Args:
+        json_file (str): Calea către fișierul patterns.json.
+        total_duration (int): Durata totală a piesei (în bătăi).
+        output_dir (str): Directorul de ieșire.
+        voices (dict): vocile, cu tablourile (pitch, onset, duration), pentru acoperirea în timp
+        k (int): numărul de pattern-uri
+        ponderi (dict): ponderile criteriilor (vezi `scoruri`)
+        rezultate (list): rezultatele în memorie (RezultatPattern); dacă lipsesc, sunt încărcate din json_file
+
+    Return:
+        list: clasamentul (vezi `top_patternuri`)
+    """
+    if rezultate is None:
+        rezultate = incarca_rezultate(json_file)
+    top = top_patternuri(rezultate, voices, k, ponderi)
+    os.makedirs(output_dir, exist_ok=True)
+    scrie_clasament(top, os.path.join(output_dir, 'pattern_top.csv'))
+
+    if grafice_active():
+        for rang, (rezultat, _, _) in enumerate(top, 1):
+            s_data, matches = date_grafic(rezultat)
+            programeaza_grafic(generate_graphic, json_file, total_duration, output_dir, s_data, matches,
+                               f'pattern_top_{rang:02d}.png')
+    return top
@@ -0,0 +1,159 @@
+import glob
+import json
+import os
+import music21
+from cache_partitura import hash_fisier
+from instrumentare import jurnal
+
+log = jurnal("etape")
+
+# Parametri
+manifest_subdir = "etape"  # Subdirectorul din output/<nume>/ cu câte un manifest pentru fiecare etapă
+
+def hash_intrare(path):
+    """
+    Hash-ul unei intrări a etapei. Pentru fișierele inexistente pe disc (ex. nume din corpus-ul
+    music21) se folosește chiar numele.
+
+    Args:
+        path (str): calea fișierului de intrare
+
+    Return:
+        str: hash-ul intrării
+    """
+    if os.path.isfile(path):
+        return hash_fisier(path)
+    return path
+
+def hash_partitura(input_file):
+    """
+    Hash-ul partiturii de intrare: conținutul fișierului și versiunea music21,
+    deoarece rezultatul parsării depinde de versiune.
+
+    Args:
+        input_file (str): calea fișierului MusicXML/MIDI
+
+    Return:
+        str: hash-ul partiturii
+    """
+    return f"{hash_intrare(input_file)}_{music21.__version__}"
+
+def fisiere_director(directory):
+    """
+    Toate fișierele dintr-un director și din subdirectoarele lui.
+
+    Args:
+        directory (str): directorul
+
+    Return:
+        list: căile fișierelor, sortate
+    """
+    return sorted(os.path.join(root, f) for root, _, files in os.walk(directory) for f in files)
+
+def fisiere_note(rezultat):
+    """
+    Fișierele scrise de extragerea notelor: CSV-ul principal, tabelul binar și CSV-urile vocilor.
+    Subdirectorul analiza_note aparține etapei următoare și nu este inclus.
+
+    Args:
+        rezultat (tuple): (csv_file, output_dir_notes), întors de extrage_note_muzicale
+
+    Return:
+        list: căile fișierelor
+    """
+    csv_file, output_dir_notes = rezultat
+    fisiere = [csv_file] + sorted(glob.glob(os.path.join(output_dir_notes, '*', '*_note.csv')))
+    npz_file = os.path.splitext(csv_file)[0] + '.npz'
+    if os.path.isfile(npz_file):
+        fisiere.append(npz_file)
+    return fisiere
+
+def cale_manifest(output_dir, etapa):
+    """
+    Calea manifestului unei etape: output/<nume>/etape/<etapa>.json. Fiecare etapă are fișierul ei,
+    ca etapele rulate în paralel din aplicație să nu se suprascrie una pe alta.
+    """
+    return os.path.join(output_dir, manifest_subdir, f"{etapa}.json")
+
+def citeste_manifest(output_dir, etapa):
+    """
+    Citește manifestul unei etape.
+
+    Args:
+        output_dir (str): directorul piesei (output/<nume>)
+        etapa (str): numele etapei
+
+    Return:
+        dict: manifestul sau None dacă lipsește ori nu poate fi citit
+    """
+    path = cale_manifest(output_dir, etapa)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def scrie_manifest(output_dir, etapa, manifest):
+    """
+    Scrie manifestul unei etape. Fișierul este înlocuit atomic, ca un proces oprit
+    la jumătate să nu lase un manifest incomplet.
+
+    Args:
+        output_dir (str): directorul piesei (output/<nume>)
+        etapa (str): numele etapei
+        manifest (dict): manifestul
+    """
+    path = cale_manifest(output_dir, etapa)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+def iesiri_neschimbate(iesiri):
+    """
+    Verifică dacă fișierele de ieșire înregistrate există și au același conținut.
+
+    Args:
+        iesiri (dict): {cale: hash}
+
+    Return:
+        bool: True dacă toate ieșirile sunt neschimbate
+    """
+    return bool(iesiri) and all(os.path.isfile(path) and hash_fisier(path) == h for path, h in iesiri.items())
+
+def ruleaza_etapa(output_dir, etapa, intrari, parametri, functie, iesiri, fortat=False):
+    """
+    Rulează o etapă a pipeline-ului doar dacă nu este actualizată: intrările (după hash),
+    parametrii sau ieșirile s-au schimbat față de manifestul etapei.
+
+    Args:
+        output_dir (str): directorul piesei (output/<nume>)
+        etapa (str): numele etapei ('notes', 'notes_detail', 'pattern', 'segmentation')
+        intrari (dict): {nume: hash} pentru intrările etapei
+        parametri (dict): parametrii care influențează rezultatul
+        functie (callable): rulează etapa și întoarce rezultatul (None = eșec)
+        iesiri (callable): primește rezultatul și întoarce lista fișierelor scrise
+        fortat (bool): rulează etapa chiar dacă este actualizată
+
+    Return:
+        rezultatul etapei (din manifest, dacă etapa a fost sărită)
+    """
+    manifest = citeste_manifest(output_dir, etapa)
+    if (not fortat and manifest and manifest.get('inputs') == intrari and manifest.get('params') == parametri
+            and iesiri_neschimbate(manifest.get('outputs'))):
+        log.info(f"Etapa '{etapa}' este actualizată. O sar.")
+        rezultat = manifest['result']
+        return tuple(rezultat) if isinstance(rezultat, list) else rezultat
+
+    rezultat = functie()
+    if rezultat is None:
+        return None
+
+    scrie_manifest(output_dir, etapa, {
+        'inputs': intrari,
+        'params': parametri,
+        'outputs': {path: hash_fisier(path) for path in iesiri(rezultat)},
+        'result': rezultat
+    })
+    return rezultat
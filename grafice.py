@@ -1,6 +1,9 @@
 import os
 import pandas as pd
 import matplotlib.pyplot as plt
+from instrumentare import jurnal
+
+log = jurnal("grafice")
 
 def grafic_distributie(instr, pitch_counts, output_dir = 'grafice_analizare'):
     """
@@ -22,7 +25,7 @@ def grafic_distributie(instr, pitch_counts, output_dir = 'grafice_analizare'):
     graph_file = os.path.join(output_dir, f"distribuție_pitch_{instr}.png")
     plt.savefig(graph_file)
     plt.close()
-    print(f"Grafic pitch-uri {instr} salvat în: {graph_file}")
+    log.debug(f"Grafic pitch-uri {instr} salvat în: {graph_file}")
 
 def grafic_distributie_ritm(instr, duration_counts, output_dir = 'grafice_analizare'):
     """
@@ -44,7 +47,7 @@ def grafic_distributie_ritm(instr, duration_counts, output_dir = 'grafice_analiz
     graph_file = os.path.join(output_dir, f"distribuție_durată_{instr}.png")
     plt.savefig(graph_file)
     plt.close()
-    print(f"Grafic durate {instr} salvat în: {graph_file}")
+    log.debug(f"Grafic durate {instr} salvat în: {graph_file}")
 
 def grafic_densitate(instr, density, output_dir = 'grafice_analizare'):
     """
@@ -66,4 +69,4 @@ def grafic_densitate(instr, density, output_dir = 'grafice_analizare'):
     graph_file = os.path.join(output_dir, f"densitate_{instr}.png")
     plt.savefig(graph_file)
     plt.close()
-    print(f"Grafic densitate {instr} salvat în: {graph_file}")
+    log.debug(f"Grafic densitate {instr} salvat în: {graph_file}")
@@ -0,0 +1,254 @@
+import cProfile
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+# Parametri
+nivel_jurnal = logging.INFO  # Nivelul implicit al mesajelor (DEBUG afișează și fiecare fișier scris)
+trasare_activa = False  # Etapele sunt măsurate doar în interiorul unui bloc `trasare`
+masurare_memorie = True  # Vârful de memorie al fiecărei etape, cu tracemalloc
+director_profil = None  # Directorul pentru fișierele cProfile (None = fără profilare)
+etape_deschise = []  # Etapele în curs, de la cea exterioară la cea curentă
+etape_incheiate = []  # Etapele măsurate în blocul `trasare` curent, în ordinea încheierii
+
+class IesireCurenta(logging.StreamHandler):
+    """
+    Handler care scrie mereu în sys.stdout-ul curent, nu în cel de la crearea lui, astfel încât
+    mesajele ajung și în stdout-ul redirecționat de aplicație (IesireCoada) sau de batch (batch.log).
+    """
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, valoare):
+        pass
+
+radacina = logging.getLogger("licenta")
+if not radacina.handlers:
+    handler = IesireCurenta()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    radacina.addHandler(handler)
+    radacina.setLevel(nivel_jurnal)
+    radacina.propagate = False
+
+def jurnal(nume):
+    """
+    Logger-ul unui modul al pipeline-ului.
+
+    Args:
+        nume (str): numele modulului (ex. "pattern")
+
+    Return:
+        logging.Logger: logger-ul "licenta.<nume>"
+    """
+    return logging.getLogger(f"licenta.{nume}")
+
+def seteaza_nivel(nivel):
+    """
+    Schimbă nivelul mesajelor afișate de toate modulele.
+
+    Args:
+        nivel (str sau int): ex. "DEBUG", "INFO", "WARNING" sau logging.DEBUG
+    """
+    radacina.setLevel(nivel.upper() if isinstance(nivel, str) else nivel)
+
+class Masuratoare:
+    """
+    Timpii, vârful de memorie și contoarele unei etape.
+    """
+
+    def __init__(self, nume, parinte=None, adancime=0):
+        self.nume = nume
+        self.parinte = parinte
+        self.adancime = adancime
+        self.contoare = Counter()
+        self.timp = 0.0
+        self.timp_cpu = 0.0
+        self.memorie_start = 0
+        self.varf_absolut = 0
+        self.varf_memorie = None
+        self.profil = None
+        self.profilata = False
+
+    def ca_dict(self):
+        """
+        Return:
+            dict: măsurătoarea, în forma scrisă în fișierul de trasare
+        """
+        return {
+            'stage': self.nume,
+            'parent': self.parinte,
+            'depth': self.adancime,
+            'wall_s': round(self.timp, 6),
+            'cpu_s': round(self.timp_cpu, 6),
+            'peak_memory_bytes': self.varf_memorie,
+            'counters': dict(self.contoare),
+            'profile': self.profil
+        }
+
+@contextmanager
+def masoara(nume):
+    """
+    Măsoară blocul ca etapă: timpul real, timpul CPU, vârful de memorie și contoarele adăugate
+    cu `contor`. Etapele pot fi imbricate; contoarele unei etape se adună și la etapa părinte.
+    În afara unui bloc `trasare` nu măsoară nimic.
+
+    Args:
+        nume (str): numele etapei
+    """
+    if not trasare_activa:
+        yield None
+        return
+
+    parinte = etape_deschise[-1] if etape_deschise else None
+    masuratoare = Masuratoare(nume, parinte.nume if parinte else None, len(etape_deschise))
+
+    memorie = masurare_memorie and tracemalloc.is_tracing()
+    if memorie:
+        curent, varf = tracemalloc.get_traced_memory()
+        if parinte:
+            parinte.varf_absolut = max(parinte.varf_absolut, varf)
+        tracemalloc.reset_peak()
+        masuratoare.memorie_start = masuratoare.varf_absolut = curent
+
+    # cProfile nu poate fi imbricat, deci se profilează doar etapa exterioară
+    profil = None
+    if director_profil and not any(e.profilata for e in etape_deschise):
+        profil = cProfile.Profile()
+        masuratoare.profilata = True
+
+    etape_deschise.append(masuratoare)
+    start, start_cpu = time.perf_counter(), time.process_time()
+    if profil:
+        profil.enable()
+    try:
+        yield masuratoare
+    finally:
+        if profil:
+            profil.disable()
+        masuratoare.timp = time.perf_counter() - start
+        masuratoare.timp_cpu = time.process_time() - start_cpu
+        etape_deschise.pop()
+
+        if memorie:
+            varf = max(masuratoare.varf_absolut, tracemalloc.get_traced_memory()[1])
+            masuratoare.varf_memorie = varf - masuratoare.memorie_start
+            if parinte:
+                parinte.varf_absolut = max(parinte.varf_absolut, varf)
+        if parinte:
+            parinte.contoare.update(masuratoare.contoare)
+        if profil:
+            os.makedirs(director_profil, exist_ok=True)
+            masuratoare.profil = os.path.join(director_profil, f"{len(etape_incheiate):03d}_{nume}.prof")
+            profil.dump_stats(masuratoare.profil)
+        etape_incheiate.append(masuratoare)
+
+def masurat(nume=None):
+    """
+    Decorator: fiecare apel al funcției este măsurat ca etapă (vezi `masoara`).
+
+    Args:
+        nume (str): numele etapei (implicit numele funcției)
+    """
+    def decorator(functie):
+        @wraps(functie)
+        def masurata(*args, **kwargs):
+            with masoara(nume or functie.__name__):
+                return functie(*args, **kwargs)
+        return masurata
+    return decorator
+
+def contor(nume, valoare=1):
+    """
+    Adaugă valoarea la contorul etapei curente. Nu face nimic în afara unei etape măsurate.
+
+    Args:
+        nume (str): numele contorului (ex. "dp_cells")
+        valoare (int): valoarea adăugată
+    """
+    if etape_deschise:
+        etape_deschise[-1].contoare[nume] += valoare
+
+def adauga_contoare(contoare):
+    """
+    Adaugă la etapa curentă contoarele strânse în alt proces (vezi `colecteaza_contoare`).
+
+    Args:
+        contoare (dict): contoarele
+    """
+    for nume, valoare in contoare.items():
+        contor(nume, valoare)
+
+@contextmanager
+def colecteaza_contoare():
+    """
+    Strânge contoarele din bloc într-un dicționar, chiar și fără trasare activă. Folosit în procesele
+    din pool, care trimit contoarele înapoi împreună cu rezultatele.
+    """
+    masuratoare = Masuratoare("colectare")
+    etape_deschise.append(masuratoare)
+    try:
+        yield masuratoare.contoare
+    finally:
+        etape_deschise.remove(masuratoare)
+
+def scrie_trasare(fisier, etape):
+    """
+    Scrie etapele măsurate într-un fișier JSON.
+
+    Args:
+        fisier (str): calea fișierului
+        etape (list): obiectele Masuratoare
+
+    Return:
+        str: calea fișierului
+    """
+    os.makedirs(os.path.dirname(fisier) or '.', exist_ok=True)
+    trasare_json = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'memory': masurare_memorie,
+        'stages': [etapa.ca_dict() for etapa in etape]
+    }
+    with open(fisier, 'w', encoding='utf-8') as f:
+        json.dump(trasare_json, f, indent=2, ensure_ascii=False)
+    return fisier
+
+@contextmanager
+def trasare(fisier=None, memorie=True, profil=None):
+    """
+    Activează măsurarea etapelor în interiorul blocului și scrie trasarea JSON la final.
+
+    Args:
+        fisier (str): fișierul JSON cu trasarea (None = doar în memorie)
+        memorie (bool): măsoară vârful de memorie cu tracemalloc (încetinește rularea)
+        profil (str): directorul pentru câte un fișier cProfile (.prof) pe etapă (None = fără profilare)
+
+    Return:
+        list: etapele măsurate (obiecte Masuratoare), completată pe măsură ce se încheie
+    """
+    global trasare_activa, masurare_memorie, director_profil, etape_incheiate
+    anterior = (trasare_activa, masurare_memorie, director_profil, etape_incheiate)
+    trasare_activa, masurare_memorie, director_profil, etape_incheiate = True, memorie, profil, []
+    pornit = memorie and not tracemalloc.is_tracing()
+    if pornit:
+        tracemalloc.start()
+    etape = etape_incheiate
+    try:
+        yield etape
+    finally:
+        if pornit:
+            tracemalloc.stop()
+        if fisier:
+            scrie_trasare(fisier, etape)
+        trasare_activa, masurare_memorie, director_profil, etape_incheiate = anterior
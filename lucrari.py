@@ -0,0 +1,255 @@
+import os
+import sys
+from functools import lru_cache
+import matplotlib
+matplotlib.use('Agg')  # Graficele sunt doar salvate în fișiere, niciodată afișate din procesele de lucru
+from analizare_note import analiza_note, densitate_bins
+from pattern import pattern, min_length, max_length
+from segmentare import segmentare
+from note import extrage_note_muzicale
+from cache_partitura import incarca_partitura
+from randare import randare_amanata
+from cache_acorduri import cache
+from instrumentare import masurat
+from etape import ruleaza_etapa, hash_partitura, hash_intrare, fisiere_director, fisiere_note
+
+def afisare_actualizata(input_file, output_dir):
+    """
+    Verifică dacă MusicXML-ul temporar folosit la afișare (partitura_temp.xml) corespunde partiturii
+    de intrare: hash-ul partiturii din care a fost scris este păstrat în partitura_temp.hash.
+
+    Args:
+        input_file (str): calea fișierului MusicXML/MIDI
+        output_dir (str): directorul piesei (output/<nume>)
+
+    Return:
+        bool: True dacă fișierul există și a fost scris din aceeași partitură
+    """
+    musicxml_path = os.path.join(output_dir, "partitura_temp.xml")
+    hash_path = os.path.join(output_dir, "partitura_temp.hash")
+    if not os.path.isfile(musicxml_path) or not os.path.isfile(hash_path):
+        return False
+    with open(hash_path, 'r', encoding='utf-8') as f:
+        return f.read().strip() == hash_partitura(input_file)
+
+def scrie_afisare(partitura, input_file, output_dir):
+    """
+    Scrie MusicXML-ul temporar folosit la afișare și hash-ul partiturii din care provine.
+    Ambele fișiere sunt scrise sub un nume temporar și înlocuite atomic, ca o altă lucrare
+    sau interfața să nu citească un fișier scris pe jumătate.
+
+    Args:
+        partitura (music21.Score): partitura
+        input_file (str): calea fișierului MusicXML/MIDI
+        output_dir (str): directorul piesei (output/<nume>)
+    """
+    musicxml_path = os.path.join(output_dir, "partitura_temp.xml")
+    hash_path = os.path.join(output_dir, "partitura_temp.hash")
+    tmp = f"{musicxml_path}.{os.getpid()}.tmp"
+    partitura.write('musicxml', fp=tmp)
+    os.replace(tmp, musicxml_path)
+    tmp = f"{hash_path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(hash_partitura(input_file))
+    os.replace(tmp, hash_path)
+
+@masurat('incarca_partitura')
+def incarca(input_file, output_dir, scrie_musicxml=True, director_cache=None):
+    """
+    Încarcă partitura (din cache-ul persistent, dacă există) și scrie MusicXML-ul temporar
+    folosit la afișare, doar dacă lipsește sau provine din altă partitură.
+
+    Args:
+        input_file (str): calea fișierului MusicXML/MIDI
+        output_dir (str): directorul piesei (output/<nume>)
+        scrie_musicxml (bool): scrie MusicXML-ul temporar pentru afișare
+        director_cache (str): directorul cache-ului de partituri comun mai multor piese (implicit output/<nume>/cache)
+
+    Return:
+        music21.Score: partitura
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    partitura = incarca_partitura(input_file, output_dir, cache_dir=director_cache)
+
+    if scrie_musicxml and not afisare_actualizata(input_file, output_dir):
+        scrie_afisare(partitura, input_file, output_dir)
+    return partitura
+
+def cu_grafice(functie, grafice=True, grafice_workers=1):
+    """
+    Rulează etapa cu randarea graficelor amânată până la finalul ei (în paralel dacă grafice_workers > 1),
+    ca manifestul etapei să includă și graficele. Cu grafice=False se scriu doar fișierele de date.
+
+    Args:
+        functie (callable): etapa
+        grafice (bool): generează graficele
+        grafice_workers (int): numărul de procese pentru randare
+
+    Return:
+        callable: etapa, cu randarea amânată
+    """
+    def etapa():
+        with randare_amanata(grafice_workers, grafice):
+            return functie()
+    return etapa
+
+def lucrare_note(input_file, output_dir, name, fortat=False, incarcare=None):
+    """
+    Extragerea notelor. Returnează (csv_file, output_dir_notes).
+    Etapa este sărită dacă partitura și ieșirile nu s-au schimbat de la ultima rulare. Fără `incarcare`
+    (din interfață), MusicXML-ul pentru afișare este actualizat și când etapa este sărită.
+    """
+    afisare = incarcare is None
+    incarcare = incarcare or (lambda: incarca(input_file, output_dir))
+    rezultat = ruleaza_etapa(output_dir, 'notes', {'score': hash_partitura(input_file)}, {'name': name},
+                             lambda: extrage_note_muzicale(incarcare(), name, output_dir), fisiere_note, fortat)
+    # Și când etapa este sărită, partitura afișată în interfață trebuie să fie cea curentă
+    if afisare and rezultat and not afisare_actualizata(input_file, output_dir):
+        incarcare()
+    return rezultat
+
+def lucrare_segmentare(input_file, output_dir, fortat=False, incarcare=None, grafice=True, grafice_workers=1,
+                       fereastra_tonalitate=1, fisier_cache_acorduri=None):
+    """
+    Segmentarea partiturii. Returnează directorul segmentării.
+    Cu fisier_cache_acorduri, numele acordurilor sunt citite din / salvate în cache-ul comun de pe disc.
+    """
+    incarcare = incarcare or (lambda: incarca(input_file, output_dir))
+    parametri = {'plots': grafice, 'key_window': fereastra_tonalitate}
+
+    def etapa():
+        if fisier_cache_acorduri:
+            cache.incarca(fisier_cache_acorduri)
+        rezultat = segmentare(incarcare(), output_dir, fereastra_tonalitate=fereastra_tonalitate)
+        if fisier_cache_acorduri:
+            cache.salveaza(fisier_cache_acorduri)
+        return rezultat
+
+    return ruleaza_etapa(output_dir, 'segmentation', {'score': hash_partitura(input_file)}, parametri,
+                         cu_grafice(etapa, grafice, grafice_workers), fisiere_director, fortat)
+
+def lucrare_analiza_note(csv_file, output_dir_notes, output_dir, fortat=False, grafice=True, grafice_workers=1,
+                         bin_sizes=densitate_bins, ponderat=False):
+    """
+    Analiza detaliată a notelor. Returnează directorul analizelor.
+    Depinde doar de conținutul CSV-ului cu note.
+    """
+    parametri = {'plots': grafice, 'density_bins': list(bin_sizes), 'density_weighted': ponderat}
+    return ruleaza_etapa(output_dir, 'notes_detail', {'notes': hash_intrare(csv_file)}, parametri,
+                         cu_grafice(lambda: analiza_note(csv_file, output_dir_notes, bin_sizes=bin_sizes,
+                                                         ponderat=ponderat),
+                                    grafice, grafice_workers),
+                         fisiere_director, fortat)
+
+def lucrare_pattern(input_file, csv_file, output_dir, workers=1, min_length=min_length, max_length=max_length,
+                    fortat=False, incarcare=None, grafice=True, grafice_workers=1, format_rezultate="json",
+                    compact=False, comprimat=False, top_k=0, maximal=False):
+    """
+    Analiza pattern-urilor. Returnează directorul analizei.
+    Partitura este folosită doar pentru durata totală din grafice; numărul de procese nu schimbă
+    rezultatul, deci nu face parte din parametrii etapei.
+    """
+    incarcare = incarcare or (lambda: incarca(input_file, output_dir))
+    intrari = {'score': hash_partitura(input_file), 'notes': hash_intrare(csv_file)}
+    parametri = {'min_length': min_length, 'max_length': max_length, 'plots': grafice,
+                 'results_format': format_rezultate, 'results_compact': compact, 'results_gzip': comprimat,
+                 'top_k': top_k, 'maximal': maximal}
+    return ruleaza_etapa(output_dir, 'pattern', intrari, parametri,
+                         cu_grafice(lambda: pattern(csv_file, output_dir, incarcare(), workers=workers,
+                                                    min_length=min_length, max_length=max_length,
+                                                    format_rezultate=format_rezultate, compact=compact,
+                                                    comprimat=comprimat, top_k=top_k, maximal=maximal),
+                                    grafice, grafice_workers),
+                         fisiere_director, fortat)
+
+def lucrare_completa(input_file, output_dir, name, pattern_workers=1, min_length=min_length, max_length=max_length,
+                     fortat=False, grafice=True, grafice_workers=1, bin_sizes=densitate_bins, ponderat=False,
+                     fereastra_tonalitate=1, fisier_cache_acorduri=None, format_rezultate="json", compact=False,
+                     comprimat=False, top_k=0, maximal=False, director_cache=None):
+    """
+    Întregul pipeline pentru o partitură, fără interfață: note -> analiză note -> pattern -> segmentare.
+    Directoarele sunt aceleași ca în aplicație. Etapele actualizate sunt sărite, iar partitura
+    este încărcată o singură dată, doar dacă cel puțin o etapă trebuie rulată.
+
+    Args:
+        input_file (str): calea fișierului MusicXML/MIDI
+        output_dir (str): directorul piesei (output/<nume>)
+        name (str): numele piesei
+        pattern_workers (int): numărul de procese pentru descoperirea pattern-urilor
+        min_length (int): lungimea minimă a pattern-urilor
+        max_length (int): lungimea maximă a pattern-urilor
+        fortat (bool): rulează toate etapele, chiar dacă sunt actualizate
+        grafice (bool): generează graficele (False = doar fișierele CSV/JSON)
+        grafice_workers (int): numărul de procese pentru randarea graficelor
+        bin_sizes (tuple): rezoluțiile densității din CSV-ul lat al analizei notelor
+        ponderat (bool): densitatea pe rezoluții este ponderată cu durata notelor
+        fereastra_tonalitate (int): numărul de măsuri din fereastra de netezire a tonalității
+        fisier_cache_acorduri (str): fișierul cache-ului de acorduri comun mai multor partituri (opțional)
+        format_rezultate (str): formatul rezultatelor pattern-urilor ('json' sau 'jsonl')
+        compact (bool): rezultatele pattern-urilor în schema compactă, numerică
+        comprimat (bool): rezultatele pattern-urilor comprimate cu gzip
+        top_k (int): numărul de pattern-uri din clasament, cu câte un grafic (0 = fără clasament)
+        maximal (bool): doar pattern-urile maximale, fără sub-pattern-urile incluse în altele mai lungi
+        director_cache (str): directorul cache-ului de partituri comun mai multor piese (opțional)
+
+    Return:
+        dict: directoarele/fișierele generate de fiecare etapă
+    """
+    incarcare = lru_cache(maxsize=None)(lambda: incarca(input_file, output_dir, scrie_musicxml=False,
+                                                        director_cache=director_cache))
+    rezultat = lucrare_note(input_file, output_dir, name, fortat=fortat, incarcare=incarcare)
+    if not rezultat:
+        raise RuntimeError("Extragerea notelor a eșuat.")
+    csv_file, output_dir_notes = rezultat
+    randare = {'grafice': grafice, 'grafice_workers': grafice_workers}
+    return {
+        'notes': csv_file,
+        'notes_detail': lucrare_analiza_note(csv_file, output_dir_notes, output_dir, fortat=fortat,
+                                             bin_sizes=bin_sizes, ponderat=ponderat, **randare),
+        'pattern': lucrare_pattern(input_file, csv_file, output_dir, pattern_workers, min_length, max_length,
+                                   fortat=fortat, incarcare=incarcare, format_rezultate=format_rezultate,
+                                   compact=compact, comprimat=comprimat, top_k=top_k, maximal=maximal,
+                                   **randare),
+        'segmentation': lucrare_segmentare(input_file, output_dir, fortat=fortat, incarcare=incarcare,
+                                           fereastra_tonalitate=fereastra_tonalitate,
+                                           fisier_cache_acorduri=fisier_cache_acorduri, **randare)
+    }
+
+class IesireCoada:
+    """
+    Înlocuiește stdout în procesul de lucru: fiecare linie afișată devine un mesaj de progres.
+    """
+
+    def __init__(self, coada, job_id):
+        self.coada = coada
+        self.job_id = job_id
+        self.buffer = ''
+
+    def write(self, text):
+        self.buffer += text
+        while '\n' in self.buffer:
+            linie, self.buffer = self.buffer.split('\n', 1)
+            if linie.strip():
+                self.coada.put(('progres', self.job_id, linie.strip()))
+        return len(text)
+
+    def flush(self):
+        pass
+
+def ruleaza(coada, job_id, functie, args):
+    """
+    Punctul de intrare al unui proces de lucru: rulează lucrarea și trimite progresul
+    și rezultatul prin coadă, ca mesaje (tip, job_id, conținut).
+
+    Args:
+        coada (multiprocessing.Queue): coada citită de interfață
+        job_id (str): identificatorul lucrării
+        functie (callable): una dintre funcțiile lucrare_*
+        args (tuple): argumentele funcției
+    """
+    sys.stdout = IesireCoada(coada, job_id)
+    try:
+        rezultat = functie(*args)
+        coada.put(('gata', job_id, rezultat))
+    except Exception as e:
+        coada.put(('eroare', job_id, str(e)))
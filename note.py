@@ -1,6 +1,32 @@
 from music21 import *
 import csv
 import os
+import numpy as np
+import pandas as pd
+from instrumentare import jurnal, masurat, contor
+
+log = jurnal("note")
+
+# Coloanele fișierelor CSV cu note; rândurile sunt scrise ca tupluri în această ordine
+COLOANE_NOTE = ['pitch', 'pitch_num', 'frequency', 'octave', 'duration', 'offset']
+
+def afiseaza_durata(quarter_length, bpm=None):
+    """
+    Afișează durata piesei, în secunde dacă tempo-ul este cunoscut.
+
+    Args:
+        quarter_length (float): durata totală a piesei în "lungimi de cvartă"
+        bpm (float): tempo-ul piesei sau None dacă nu este definit
+    """
+    if bpm is not None:
+        # Calcularea duratei totale a piesei în secunde
+        seconds_per_quarter = 60 / bpm  # Cât timp durează o cvartă de notă (în secunde)
+        total_seconds = quarter_length * seconds_per_quarter
+        log.info(f"Timpul total al piesei este: {total_seconds:.2f} secunde")
+        log.info(f"Timpul total al piesei este: {quarter_length:.2f} măsuri")
+    else:
+        log.warning("Nu s-a găsit un tempo definit. Timpul nu poate fi calculat.")
+        log.info(f"Timpul total al piesei este: {quarter_length:.2f} măsuri (fără tempo definit)")
 
 def durata_piesa(partitura):
     """
@@ -9,39 +35,79 @@ def durata_piesa(partitura):
     Args:
         partitura (music21.Score): Obiect music21 Score, partitura de analizat.
     """
-    tempo_markers = partitura.flat.getElementsByClass('MetronomeMark')
+    flat = partitura.flatten()
+    tempo_markers = flat.getElementsByClass('MetronomeMark')
+    bpm = tempo_markers[0].number if tempo_markers else None
+    afiseaza_durata(flat.highestTime, bpm)
 
-    # Dacă există un tempo definit, extrage BPM-ul
-    if tempo_markers:
-        bpm = tempo_markers[0].number
+def note_voce(flat):
+    """
+    Extrage notele dintr-un flux aplatizat, cu offset-uri absolute, într-o singură parcurgere.
+    Acordurile sunt desfăcute în câte un rând pentru fiecare notă.
 
-    quarter_length = partitura.flat.quarterLength
-    if bpm is not None:
-        # Calcularea duratei totale a piesei în secunde
-        total_duration = partitura.duration.quarterLength  # Durata totală în "lungimi de cvartă"
-        seconds_per_quarter = 60 / bpm  # Cât timp durează o cvartă de notă (în secunde)
-        total_seconds = total_duration * seconds_per_quarter
-        print(f"Timpul total al piesei este: {total_seconds:.2f} secunde")
-        print(f"Timpul total al piesei este: {quarter_length:.2f} măsuri")
-    else:
-        print("Nu s-a găsit un tempo definit. Timpul nu poate fi calculat.")
-        print(f"Timpul total al piesei este: {quarter_length:.2f} măsuri (fără tempo definit)")
+    Args:
+        flat (music21.Stream): fluxul aplatizat al vocii (sau al întregii partituri)
+
+    Return:
+        rows (list): rânduri (pitch, pitch_num, frequency, octave, duration, offset), în ordinea COLOANE_NOTE
+    """
+    rows = []
+    for element in flat.notes:
+        durata = float(element.duration.quarterLength)
+        offset = float(element.offset)
+        if isinstance(element, note.Note):
+            p = element.pitch
+            rows.append((str(p), int(p.midi), p.frequency, p.octave, durata, offset))
+        elif isinstance(element, chord.Chord):
+            for p in element.pitches:
+                rows.append((str(p), int(p.midi), p.frequency, p.octave, durata, offset))
+    return rows
 
-def analiza_voce(part, output_dir):
+def nume_voci(parts):
+    """
+    Numele vocilor, câte unul pentru fiecare parte a partiturii. Părțile cu același nume
+    (portativele unui pian, pistele MIDI fără nume) primesc un sufix, ca să rămână voci separate.
+
+    Args:
+        parts (list): părțile partiturii, în ordine
+
+    Return:
+        list: numele vocilor, unice, în ordinea părților
+    """
+    nume = [part.partName if part.partName else 'Unknown' for part in parts]
+    folosite = set(nume)
+    vazute = {}
+    rezultat = []
+    for part_name in nume:
+        vazute[part_name] = vazute.get(part_name, 0) + 1
+        if vazute[part_name] > 1:
+            numar = vazute[part_name]
+            while f"{part_name} {numar}" in folosite:
+                numar += 1
+            vazute[part_name] = numar
+            part_name = f"{part_name} {numar}"
+            folosite.add(part_name)
+        rezultat.append(part_name)
+    return rezultat
+
+def analiza_voce(part, output_dir, flat=None, part_name=None):
     """
     Analizează un instrument (voce) dintr-o partitură și returnează datele notelor.
 
     Args:
-        part (str): instrumentul (vocea) de analizat.
+        part (music21.Part): instrumentul (vocea) de analizat.
         output_dir (str): directorul unde se salveaza informatia.
+        flat (music21.Stream): fluxul aplatizat al vocii, dacă a fost deja calculat
+        part_name (str): numele vocii, dacă a fost deja stabilit (vezi nume_voci)
 
     Return:
-        tuplu (note_data (list), part_name (str)): notele corespunzătoare instrumentului/vocii, numele instrumentului/vocii
+        tuplu (note_data (list), part_name (str)): rândurile notelor corespunzătoare instrumentului/vocii
+            (în ordinea COLOANE_NOTE), numele instrumentului/vocii
     """
     # Numele instrumentului sau fallback
-    part_name = part.partName if part.partName else 'Unknown'
-    # Lista pentru datele notelor
-    note_data = []
+    if part_name is None:
+        part_name = part.partName if part.partName else 'Unknown'
+    note_data = note_voce(flat if flat is not None else part.flatten())
     
     # Creează directorul de ieșire dacă nu există
     os.makedirs(output_dir, exist_ok=True)
@@ -51,44 +117,102 @@ def analiza_voce(part, output_dir):
 
     # Verifică dacă fișierul CSV există deja
     if os.path.isfile(nume_fisier):
-        print(f"Fișierul CSV '{nume_fisier}' există deja. Îl voi suprascrie.")
+        log.debug(f"Fișierul CSV '{nume_fisier}' există deja. Îl voi suprascrie.")
     else:
-        print(f"Fișierul CSV '{nume_fisier}' nu există. Îl voi crea.")
-
+        log.debug(f"Fișierul CSV '{nume_fisier}' nu există. Îl voi crea.")
 
     with open(nume_fisier, 'w', newline='', encoding='utf-8') as csvfile:
-        fieldnames = ['pitch', 'pitch_num', 'frequency', 'octave', 'duration', 'offset']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        
-        for element in part.recurse():
-            if isinstance(element, note.Note):
-                note_info = {
-                    'pitch': str(element.pitch),
-                    'pitch_num': int(element.pitch.midi),
-                    'frequency': element.pitch.frequency,
-                    'octave': element.octave,
-                    'duration': float(element.duration.quarterLength),
-                    'offset': float(element.offset)
-                }
-                note_data.append(note_info)
-                writer.writerow(note_info)
-            elif isinstance(element, chord.Chord):
-                for n in element.pitches:
-                    note_info = {
-                        'pitch': str(n),
-                        'pitch_num': int(n.midi),
-                        'frequency': n.frequency,
-                        'octave': n.octave,
-                        'duration': float(element.duration.quarterLength),
-                        'offset': float(element.offset)
-                    }
-                    note_data.append(note_info)
-                    writer.writerow(note_info)
+        writer = csv.writer(csvfile)
+        writer.writerow(COLOANE_NOTE)
+        writer.writerows(note_data)
     
     return note_data, part_name
 
-def extrage_note_muzicale(partitura, name, output_dir, output_subdir = "note"):
+def cale_binar(csv_file):
+    """
+    Returnează calea fișierului NPZ corespunzător unui CSV de note.
+    """
+    return os.path.splitext(csv_file)[0] + '.npz'
+
+def fisier_binar(csv_file):
+    """
+    Returnează fișierul NPZ de lângă CSV dacă există și nu este mai vechi decât CSV-ul, altfel None.
+    """
+    npz_file = cale_binar(csv_file)
+    if not os.path.isfile(npz_file):
+        return None
+    if os.path.isfile(csv_file) and os.path.getmtime(npz_file) < os.path.getmtime(csv_file):
+        return None
+    return npz_file
+
+def salveaza_note_binar(voci, output_file):
+    """
+    Salvează tabelul de note într-un fișier NPZ cu coloane tipizate.
+    Offset-ul și durata rămân float64: valorile triolelor (ex. 1/3) nu se pot reprezenta exact
+    în float32, iar etapele următoare trebuie să vadă aceleași valori ca în CSV.
+
+    Args:
+        voci (list): perechi (part_name, rows), ca în CSV-ul principal; part_name este None
+            pentru notele fără voce
+        output_file (str): calea fișierului NPZ
+    """
+    part_codes = {}
+    codes = []
+    rows = []
+    for part_name, note_data in voci:
+        code = part_codes.setdefault(part_name, len(part_codes)) if part_name is not None else -1
+        codes.extend([code] * len(note_data))
+        rows.extend(note_data)
+
+    pitches, pitch_nums, frequencies, octaves, durations, offsets = zip(*rows) if rows else ([],) * 6
+    np.savez(output_file,
+             part_names=np.array(list(part_codes), dtype=str),
+             part=np.array(codes, dtype=np.int16),
+             pitch=np.array(pitches, dtype=str),
+             pitch_num=np.array(pitch_nums, dtype=np.int16),
+             frequency=np.array(frequencies, dtype=np.float64),
+             octave=np.array([o if o is not None else -1 for o in octaves], dtype=np.int8),
+             duration=np.array(durations, dtype=np.float64),
+             offset=np.array(offsets, dtype=np.float64))
+
+def incarca_note(csv_file):
+    """
+    Încarcă notele piesei ca tabel, cu o coloană categorială 'part' pentru vocea fiecărei note.
+    Citește direct fișierul NPZ dacă este disponibil, altfel CSV-ul principal.
+
+    Args:
+        csv_file (str): fișierul CSV principal cu notele piesei
+
+    Return:
+        pd.DataFrame: notele piesei (fără rândurile 'Instrument')
+    """
+    npz_file = fisier_binar(csv_file)
+    if npz_file:
+        with np.load(npz_file, allow_pickle=False) as data:
+            octave = pd.Series(data['octave'])
+            if (octave < 0).any():
+                octave = octave.where(octave >= 0)
+            return pd.DataFrame({
+                'type': 'Note',
+                'part': pd.Categorical.from_codes(data['part'], categories=data['part_names'].tolist()),
+                'pitch': data['pitch'].astype(object),
+                'pitch_num': data['pitch_num'].astype(np.int64),
+                'frequency': data['frequency'],
+                'octave': octave,
+                'duration': data['duration'],
+                'offset': data['offset']
+            })
+
+    df = pd.read_csv(csv_file)
+    is_instrument = df['type'] == 'Instrument'
+    part = df['pitch'].where(is_instrument).ffill()
+    note_rows = df[df['type'] == 'Note'].copy()
+    part_names = pd.unique(df.loc[is_instrument, 'pitch'])
+    note_rows.insert(1, 'part', pd.Categorical(part[note_rows.index], categories=part_names))
+    return note_rows
+
+@masurat()
+def extrage_note_muzicale(partitura, name, output_dir, output_subdir = "note", format_binar=True):
     """
     Extrage notele muzicale dintr-un fișier MusicXML și le salvează în fișiere CSV.
 
@@ -97,6 +221,7 @@ def extrage_note_muzicale(partitura, name, output_dir, output_subdir = "note"):
         name (str): numele fisierului de intrare
         output_dir (str): directorul principal unde sunt salvate informatiile
         output_subdir (str): subdirectorul unde se salveaza segmentarea
+        format_binar (bool): salvează și tabelul binar NPZ, citit direct de etapele următoare
 
     Return:
         output_file (str): calea către fișierul CSV cu notele extrase.
@@ -111,73 +236,66 @@ def extrage_note_muzicale(partitura, name, output_dir, output_subdir = "note"):
 
     # Verifică dacă fișierul CSV există deja
     if os.path.isfile(output_file):
-        print(f"Fișierul CSV '{output_file}' există deja. Îl voi suprascrie.")
+        log.debug(f"Fișierul CSV '{output_file}' există deja. Îl voi suprascrie.")
     else:
-        print(f"Fișierul CSV '{output_file}' nu există. Îl voi crea.")
+        log.debug(f"Fișierul CSV '{output_file}' nu există. Îl voi crea.")
         
-    durata_piesa(partitura)
-    all_notes = []
+    # O singură parcurgere: fiecare voce este aplatizată o dată, iar din aceeași parcurgere
+    # obținem și tempo-ul și durata piesei
+    voci = []
+    bpm = None
+    quarter_length = 0.0
     
     try:
-        parts = instrument.partitionByInstrument(partitura)
+        parts = list(partitura.parts)
         if parts:
-            for part in parts:
-                part_name = part.partName if part.partName else 'Unknown'
-                print(f"Analizând partitura: {part_name}")
+            # O voce pentru fiecare parte a partiturii (nu pentru fiecare instrument)
+            for part, part_name in zip(parts, nume_voci(parts)):
+                log.debug(f"Analizând partitura: {part_name}")
+                flat = part.flatten()
+                if bpm is None:
+                    tempo_markers = flat.getElementsByClass('MetronomeMark')
+                    if tempo_markers:
+                        bpm = tempo_markers[0].number
+                quarter_length = max(quarter_length, flat.highestTime)
                 # Analizează instrumentul și obține notele
-                note_data, name = analiza_voce(part, output_dir)
-                all_notes.append({'type': 'Instrument', 'value': name})
-                all_notes.extend(note_data)
+                note_data, part_name = analiza_voce(part, output_dir, flat, part_name)
+                voci.append((part_name, note_data))
         else:
-            print("Partitura nu conține informații despre voci separate. Analizând ca un singur flux.")
-            note_data = []
-            for element in partitura.recurse():
-                if isinstance(element, note.Note):
-                    note_data.append({
-                        'pitch': str(element.pitch),
-                        'pitch_num': int(element.pitch.midi),
-                        'frequency': element.pitch.frequency,
-                        'octave': element.octave,
-                        'duration': float(element.duration.quarterLength),
-                        'offset': float(element.offset)
-                    })
-                elif isinstance(element, chord.Chord):
-                    for n in element.pitches:
-                        note_data.append({
-                            'pitch': str(n),
-                            'pitch_num': int(n.midi),
-                            'frequency': n.frequency,
-                            'octave': n.octave,
-                            'duration': float(element.duration.quarterLength),
-                            'offset': float(element.offset)
-                        })
-            all_notes.extend(note_data)
+            log.info("Partitura nu conține informații despre voci separate. Analizând ca un singur flux.")
+            flat = partitura.flatten()
+            tempo_markers = flat.getElementsByClass('MetronomeMark')
+            if tempo_markers:
+                bpm = tempo_markers[0].number
+            quarter_length = flat.highestTime
+            voci.append((None, note_voce(flat)))
     except Exception as e:
-        print(f"Eroare la extragerea notelor: {e}")
+        log.error(f"Eroare la extragerea notelor: {e}")
         return
 
+    contor('voices', len(voci))
+    contor('notes', sum(len(note_data) for _, note_data in voci))
+    afiseaza_durata(quarter_length, bpm)
+
     try:
         # Salvează toate notele în fișierul CSV principal
         with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = ['type', 'pitch', 'pitch_num', 'frequency', 'octave', 'duration', 'offset']
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            for item in all_notes:
-                if item.get('type') == 'Instrument':
-                    writer.writerow({'type': 'Instrument', 'pitch': item['value']})
-                else:
-                    writer.writerow({
-                        'type': 'Note',
-                        'pitch': item['pitch'],
-                        'pitch_num': item['pitch_num'],
-                        'frequency': item['frequency'],
-                        'octave': item['octave'],
-                        'duration': item['duration'],
-                        'offset': item['offset']
-                    })
-        print(f"Notele au fost scrise în fișierul: '{output_file}'")
+            writer = csv.writer(csvfile)
+            writer.writerow(['type'] + COLOANE_NOTE)
+            for part_name, note_data in voci:
+                if part_name is not None:
+                    writer.writerow(['Instrument', part_name] + [''] * (len(COLOANE_NOTE) - 1))
+                writer.writerows(('Note',) + row for row in note_data)
+        log.info(f"Notele au fost scrise în fișierul: '{output_file}'")
     except Exception as e:
-        print(f"Eroare la scrierea în fișierul CSV '{output_file}': {e}")
+        log.error(f"Eroare la scrierea în fișierul CSV '{output_file}': {e}")
+
+    if format_binar:
+        try:
+            salveaza_note_binar(voci, cale_binar(output_file))
+            log.debug(f"Notele au fost scrise în fișierul binar: '{cale_binar(output_file)}'")
+        except Exception as e:
+            log.error(f"Eroare la scrierea fișierului binar '{cale_binar(output_file)}': {e}")
 
     return output_file, output_dir
     
@@ -3,51 +3,73 @@ import csv
 import os
 import numpy as np
 import pandas as pd
-import json
+from concurrent.futures import ProcessPoolExecutor
+from numpy.lib.stride_tricks import sliding_window_view
 from vizualizare_pattern import *
+from note import incarca_note, fisier_binar
+from rezultate_pattern import ScriitorRezultate, intrare_json, intrare_compacta, fisier_rezultate, rezultat_model
+from clasament_pattern import generate_top_graphics
+from instrumentare import jurnal, masoara, masurat, contor, colecteaza_contoare, adauga_contoare
+
+log = jurnal("pattern")
 
 # Parametri
-min_length = 3  # Lungimea minimă a tiparului (note)
-max_length = 8  # Lungimea maximă a tiparului (note)
-checked_patterns = set()  # Set global pentru a stoca tiparele deja verificate
-output_file = "patterns.json"  # Fișierul unde salvăm rezultatele
+min_length = 3  # Lungimea minimă implicită a tiparului (note)
+max_length = 8  # Lungimea maximă implicită a tiparului (note)
 
-def load_triplets(csv_file):
+def load_voices(csv_file):
     """
-    Încarcă notele din fișierul CSV și le organizează ca triplete (pitch, onset, duration) pentru fiecare voce.
+    Încarcă notele piesei ca tablouri NumPy (pitch, onset, duration) pentru fiecare voce.
+    Folosește tabelul binar NPZ scris de `extrage_note_muzicale` dacă există, altfel CSV-ul;
+    vocile sunt separate vectorizat după coloana 'part', deci sunt acceptate orice nume de voci.
 
     Args:
         csv_file (str): fisierul cu informatii despre notele piesei
 
     Return:
-        voices (dict[str, list]): Un dicționar cu voci ca chei și liste de triplete ca valori.
+        voices (dict[str, tuple]): Un dicționar cu voci ca chei (în ordinea din fișier) și
+            tupluri (pitch, onset, duration) de tablouri NumPy ca valori.
     """
-    if not os.path.exists(csv_file):
+    if not os.path.exists(csv_file) and not fisier_binar(csv_file):
         raise FileNotFoundError(f"Fișierul {csv_file} nu există.")
     
-    df = pd.read_csv(csv_file)
-    voices = {'Soprano': [], 'Alto': [], 'Tenor': [], 'Bass': []}
-    current_voice = None
-    
-    for _, row in df.iterrows():
-        if row['type'] == 'Instrument':
-            current_voice = row['pitch']
-        elif row['type'] == 'Note' and current_voice:
-            try:
-                pitch_num = int(row['pitch_num'])
-                onset = float(row['offset'])
-                duration = float(row['duration'])
-                voices[current_voice].append((pitch_num, onset, duration))
-            except (ValueError, KeyError) as e:
-                print(f"Eroare la procesarea rândului {row}: {e}")
-    
-    for voice_name, triplets in voices.items():
-        print(f"{voice_name}: {len(triplets)} note")
-        if not triplets:
-            print(f"Avertisment: Vocea {voice_name} este goală!")
+    notes = incarca_note(csv_file)
+    notes = notes[notes['part'].notna()]
+    pitch_num = pd.to_numeric(notes['pitch_num'], errors='coerce')
+    onset = pd.to_numeric(notes['offset'], errors='coerce')
+    duration = pd.to_numeric(notes['duration'], errors='coerce')
+    valid = (pitch_num.notna() & onset.notna() & duration.notna()).to_numpy()
+    if not valid.all():
+        log.error(f"Eroare: {int((~valid).sum())} rânduri de note cu valori invalide au fost ignorate.")
+
+    pitch_num = pitch_num.to_numpy()[valid].astype(np.int64)
+    onset = onset.to_numpy(dtype=np.float64)[valid]
+    duration = duration.to_numpy(dtype=np.float64)[valid]
+    part_codes = notes['part'].cat.codes.to_numpy()[valid]
+
+    voices = {}
+    for code, voice_name in enumerate(notes['part'].cat.categories):
+        mask = part_codes == code
+        voices[voice_name] = (pitch_num[mask], onset[mask], duration[mask])
+        log.debug(f"{voice_name}: {int(mask.sum())} note")
+        if not mask.any():
+            log.warning(f"Avertisment: Vocea {voice_name} este goală!")
     
     return voices
 
+def load_triplets(csv_file):
+    """
+    Încarcă notele din fișierul CSV și le organizează ca triplete (pitch, onset, duration) pentru fiecare voce.
+
+    Args:
+        csv_file (str): fisierul cu informatii despre notele piesei
+
+    Return:
+        voices (dict[str, list]): Un dicționar cu voci ca chei și liste de triplete ca valori.
+    """
+    return {voice_name: list(zip(pitch_num.tolist(), onset.tolist(), duration.tolist()))
+            for voice_name, (pitch_num, onset, duration) in load_voices(csv_file).items()}
+
 def triplets_to_intervals(triplets):
     """
     Transformă o secvență de note în intervale melodice (Δp, onset, duration).
@@ -64,6 +86,168 @@ def triplets_to_intervals(triplets):
         intervals.append((delta_p, triplets[i][1], triplets[i][2]))
     return intervals
 
+class VoiceIndex:
+    """
+    Tablouri compacte (pitch, onset, duration, delta_p) pentru fiecare voce.
+    Se construiește o singură dată pe rulare, după `load_voices`, și este citit de codul de potrivire.
+    """
+
+    def __init__(self, voices):
+        """
+        Args:
+            voices (dict[str, tuple]): dicționar cu voci și tablourile lor (pitch, onset, duration)
+        """
+        self.pitch = {}
+        self.onset = {}
+        self.duration = {}
+        self.delta_p = {}
+        for voice_name, (pitch_num, onset, duration) in voices.items():
+            self.pitch[voice_name] = np.asarray(pitch_num, dtype=np.int64)
+            self.onset[voice_name] = np.asarray(onset, dtype=np.float64)
+            self.duration[voice_name] = np.asarray(duration, dtype=np.float64)
+            self.delta_p[voice_name] = np.diff(self.pitch[voice_name])
+
+    @classmethod
+    def from_triplets(cls, voices):
+        """
+        Construiește indexul dintr-un dicționar de triplete, ca cel întors de `load_triplets`.
+
+        Args:
+            voices (dict[str, list]): dicționar cu voci și tripletele lor (pitch, onset, duration)
+        """
+        return cls({voice_name: ([p for p, _, _ in triplets], [o for _, o, _ in triplets], [d for _, _, d in triplets])
+                    for voice_name, triplets in voices.items()})
+
+    def voice_length(self, voice_name):
+        """
+        Returnează numărul de note din voce.
+        """
+        return len(self.pitch[voice_name])
+
+    def interval_durations(self, voice_name):
+        """
+        Returnează duratele intervalelor vocii (durata notei de sosire a fiecărui interval).
+        """
+        return self.duration[voice_name][1:]
+
+    def triplets(self, voice_name, start, stop):
+        """
+        Returnează tripletele (pitch, onset, duration) dintre notele start și stop (exclusiv).
+        """
+        return list(zip(self.pitch[voice_name][start:stop].tolist(),
+                        self.onset[voice_name][start:stop].tolist(),
+                        self.duration[voice_name][start:stop].tolist()))
+
+    def intervals(self, voice_name, start, stop):
+        """
+        Returnează intervalele (delta_p, onset, duration) ale notelor dintre start și stop (exclusiv),
+        la fel ca `triplets_to_intervals` aplicată pe aceleași note.
+        """
+        return list(zip(self.delta_p[voice_name][start:stop - 1].tolist(),
+                        self.onset[voice_name][start + 1:stop].tolist(),
+                        self.duration[voice_name][start + 1:stop].tolist()))
+
+def quantize_durations(durations):
+    """
+    Cuantizează duratele la miimi de pătrime, pentru cheile indexului de n-grame.
+    """
+    return np.rint(np.asarray(durations, dtype=np.float64) * 1000).astype(np.int64)
+
+class NGramIndex:
+    """
+    Index inversat peste n-gramele de intervale (delta_p, durată cuantizată) ale tuturor vocilor.
+    Pentru un tipar, dă doar pozițiile care se pot potrivi în toleranța de ±1 semiton,
+    astfel încât verificarea completă se face numai acolo.
+    """
+
+    def __init__(self, index, n):
+        """
+        Args:
+            index (VoiceIndex): tablourile precalculate ale vocilor
+            n (int): lungimea n-gramelor (număr de intervale)
+        """
+        self.n = n
+        self.positions = {}
+        for voice_name in index.pitch:
+            delta_p = index.delta_p[voice_name].tolist()
+            durations = quantize_durations(index.interval_durations(voice_name)).tolist()
+            keys = list(zip(delta_p, durations))
+            positions = {}
+            for start in range(len(keys) - n + 1):
+                positions.setdefault(tuple(keys[start:start + n]), []).append(start)
+            self.positions[voice_name] = {key: np.array(starts, dtype=np.int64) for key, starts in positions.items()}
+
+    def candidates(self, voice_name, pattern_dp, pattern_dur):
+        """
+        Returnează pozițiile de start din voce ale căror prime n intervale pot potrivi tiparul.
+
+        Args:
+            voice_name (str): vocea în care căutăm
+            pattern_dp (np.ndarray): intervalele melodice ale tiparului
+            pattern_dur (np.ndarray): duratele tiparului
+
+        Return:
+            np.ndarray: pozițiile de start candidate, sortate
+        """
+        prefix_dp = pattern_dp[:self.n].tolist()
+        prefix_dur = quantize_durations(pattern_dur[:self.n]).tolist()
+        voice_positions = self.positions[voice_name]
+
+        # Toate cheile aflate la cel mult un semiton de tipar, interval cu interval
+        keys = [()]
+        for delta_p, duration in zip(prefix_dp, prefix_dur):
+            keys = [key + ((delta_p + shift, duration),) for key in keys for shift in (-1, 0, 1)]
+
+        found = [voice_positions[key] for key in keys if key in voice_positions]
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate(found))
+
+    def match_ends(self, index, voice_name, pattern_dp, pattern_dur):
+        """
+        Echivalent cu `match_ends` pe vocea întreagă, dar verifică doar pozițiile din index.
+        Tiparele mai scurte decât n-gramele (sau cu ultimul interval inclus în n-gramă) se caută complet.
+
+        Args:
+            index (VoiceIndex): tablourile precalculate ale vocilor
+            voice_name (str): vocea în care căutăm
+            pattern_dp (np.ndarray): intervalele melodice ale tiparului
+            pattern_dur (np.ndarray): duratele tiparului
+
+        Return:
+            np.ndarray: indicii b (numerotați de la 1) ai ultimului interval din fiecare potrivire
+        """
+        voice_dp = index.delta_p[voice_name]
+        voice_dur = index.interval_durations(voice_name)
+        # Durata ultimului interval nu contează la potrivire, deci nu poate face parte din cheie
+        if len(pattern_dp) - 1 < self.n:
+            return match_ends(pattern_dp, pattern_dur, voice_dp, voice_dur)
+        starts = self.candidates(voice_name, pattern_dp, pattern_dur)
+        return match_ends_at(starts, pattern_dp, pattern_dur, voice_dp, voice_dur)
+
+class PatternRun:
+    """
+    Contextul unei singure rulări `pattern()`: parametrii, tiparele deja verificate și indexurile
+    precalculate. Fiecare partitură primește un context nou, astfel încât starea nu se
+    acumulează între rulări în același proces.
+    """
+
+    def __init__(self, voices, voice_order, min_length=min_length, max_length=max_length):
+        """
+        Args:
+            voices (dict[str, tuple]): dicționar cu voci și tablourile lor (pitch, onset, duration)
+            voice_order (list): ordinea vocilor pentru căutare
+            min_length (int): lungimea minimă a tiparului (note)
+            max_length (int): lungimea maximă a tiparului (note)
+        """
+        self.voices = voices
+        self.voice_order = voice_order
+        self.min_length = min_length
+        self.max_length = max_length
+        self.checked_patterns = set()  # Tiparele standardizate deja verificate în această rulare
+        self.index = VoiceIndex(voices)
+        self.ngrams = NGramIndex(self.index, min_length - 1)
+
 def delta_function(t1, t2):
     """
     Compară intervalele și duratele pentru notele intermediare.
@@ -100,9 +284,10 @@ def delta_f_function(t1, t2):
         return 1
     return 0
 
-def similarity_function(pattern, voice):
+def similarity_function_dp(pattern, voice):
     """
     Detectează aparițiile tiparului în voce folosind programare dinamică.
+    Implementarea de referință, celulă cu celulă; `similarity_function` trebuie să dea aceleași potriviri.
 
     Args:
         pattern (tuple): pattern-ul ales ca sursa
@@ -129,6 +314,96 @@ def similarity_function(pattern, voice):
     matches = [(b, S_f[m, b]) for b in range(1, n + 1) if S_f[m, b] == m]
     return matches
 
+def intervals_to_arrays(intervals):
+    """
+    Transformă o listă de intervale în tablouri NumPy.
+
+    Args:
+        intervals (list): lista de intervale (delta_p, onset, duration)
+
+    Return:
+        tuple(delta_p (np.ndarray), durations (np.ndarray)): intervalele melodice și duratele
+    """
+    delta_p = np.array([delta_p for delta_p, _, _ in intervals], dtype=np.int64)
+    durations = np.array([duration for _, _, duration in intervals], dtype=np.float64)
+    return delta_p, durations
+
+def match_ends(pattern_dp, pattern_dur, voice_dp, voice_dur):
+    """
+    Găsește, vectorizat, pozițiile în care tiparul se potrivește în voce.
+    Echivalent cu recurența pe diagonală din `similarity_function_dp`: toate intervalele
+    trebuie să difere cu cel mult un semiton, iar toate în afară de ultimul trebuie să aibă
+    aceeași durată.
+
+    Args:
+        pattern_dp (np.ndarray): intervalele melodice ale tiparului
+        pattern_dur (np.ndarray): duratele tiparului
+        voice_dp (np.ndarray): intervalele melodice ale vocii
+        voice_dur (np.ndarray): duratele vocii
+
+    Return:
+        np.ndarray: indicii b (numerotați de la 1) ai ultimului interval din fiecare potrivire
+    """
+    m = len(pattern_dp)
+    n = len(voice_dp)
+    if m == 0:
+        return np.arange(1, n + 1)
+    if m > n:
+        return np.empty(0, dtype=np.int64)
+    contor('dp_cells', (n - m + 1) * m)
+
+    # Fiecare rând al ferestrei corespunde unei alinieri (offset) a tiparului în voce
+    dp_windows = sliding_window_view(voice_dp, m)
+    mask = (np.abs(dp_windows - pattern_dp) <= 1).all(axis=1)
+    if m > 1:
+        dur_windows = sliding_window_view(voice_dur[:n - 1], m - 1)
+        mask &= (dur_windows == pattern_dur[:m - 1]).all(axis=1)
+
+    return np.flatnonzero(mask) + m
+
+def match_ends_at(starts, pattern_dp, pattern_dur, voice_dp, voice_dur):
+    """
+    Verifică tiparul doar la pozițiile de start candidate, cu aceleași reguli ca `match_ends`.
+
+    Args:
+        starts (np.ndarray): pozițiile de start candidate (indici de interval, de la 0)
+        pattern_dp (np.ndarray): intervalele melodice ale tiparului
+        pattern_dur (np.ndarray): duratele tiparului
+        voice_dp (np.ndarray): intervalele melodice ale vocii
+        voice_dur (np.ndarray): duratele vocii
+
+    Return:
+        np.ndarray: indicii b (numerotați de la 1) ai ultimului interval din fiecare potrivire
+    """
+    m = len(pattern_dp)
+    starts = starts[starts + m <= len(voice_dp)]
+    if m == 0 or len(starts) == 0:
+        return starts + m
+    contor('dp_cells', len(starts) * m)
+
+    positions = starts[:, None] + np.arange(m)
+    mask = (np.abs(voice_dp[positions] - pattern_dp) <= 1).all(axis=1)
+    if m > 1:
+        mask &= (voice_dur[positions[:, :m - 1]] == pattern_dur[:m - 1]).all(axis=1)
+
+    return starts[mask] + m
+
+def similarity_function(pattern, voice):
+    """
+    Detectează aparițiile tiparului în voce, evaluând toate alinierile într-o singură trecere vectorizată.
+
+    Args:
+        pattern (tuple): pattern-ul ales ca sursa
+        voice (list): vocea în care căutăm pattern-ul
+
+    Return:
+        matches (list): Lista de potriviri găsite, fiecare potrivire conținând indexul și scorul.
+    """
+    m = len(pattern)
+    pattern_dp, pattern_dur = intervals_to_arrays(pattern)
+    voice_dp, voice_dur = intervals_to_arrays(voice)
+    return [(int(b), float(m)) for b in match_ends(pattern_dp, pattern_dur, voice_dp, voice_dur)]
+
 def standardize_pattern_intervals(pattern_intervals):
     """
     Creează o reprezentare unică a unui tipar.
@@ -154,87 +429,87 @@ def calculate_end_notes(triplets):
     """
     return len(triplets) - 1
 
-def evaluate_pattern_length(voices, source_voice, length, voice_order, start_pos=0):
+def evaluate_pattern_length(run, source_voice, length, start_pos=0):
     """
     Functie care evaluează lungimea unui pattern în diferite voci.
 
     Args:
-        voices (dict): dicționar cu voci și tripletele lor
+        run (PatternRun): contextul rulării curente
         source_voice (str): vocea sursă
         length (int): lungimea pattern-ului
-        voice_order (list): ordinea vocii pentru căutare
         start_pos (int): poziția de start în vocea sursă
 
     Return:
         dict: informații despre pattern-ul găsit sau None
     """
 
-    if len(voices[source_voice]) < start_pos + length:
+    if run.index.voice_length(source_voice) < start_pos + length:
         return None
     
-    pattern_triplets = voices[source_voice][start_pos:start_pos + length]
-    pattern_intervals = triplets_to_intervals(pattern_triplets)
+    pattern_intervals = run.index.intervals(source_voice, start_pos, start_pos + length)
     pattern_intervals_tuple = standardize_pattern_intervals(pattern_intervals)
     
-    if pattern_intervals_tuple in checked_patterns:
+    if pattern_intervals_tuple in run.checked_patterns:
+        contor('candidates_pruned')
         return None
     
-    checked_patterns.add(pattern_intervals_tuple)
+    run.checked_patterns.add(pattern_intervals_tuple)
+    contor('candidates_evaluated')
     
-    pattern_onset = pattern_triplets[0][1] if pattern_triplets else None
-    pattern_end_notes = calculate_end_notes(pattern_triplets)
+    return score_pattern(run.index, source_voice, length, run.voice_order, start_pos, run.ngrams)
+
+def score_pattern(index, source_voice, length, voice_order, start_pos=0, ngrams=None):
+    """
+    Caută pattern-ul în toate vocile, fără verificarea tiparelor deja evaluate.
+    Potrivirile rămân înregistrări compacte (start_index, interval_diff) până la salvare;
+    notele și intervalele sunt generate doar în `save_results`.
+
+    Args:
+        index (VoiceIndex): tablourile precalculate ale vocilor
+        source_voice (str): vocea sursă
+        length (int): lungimea pattern-ului
+        voice_order (list): ordinea vocii pentru căutare
+        start_pos (int): poziția de start în vocea sursă
+        ngrams (NGramIndex): indexul de n-grame pentru restrângerea pozițiilor verificate (opțional)
+
+    Return:
+        dict: informații despre pattern-ul găsit sau None
+    """
+    pattern_onset = float(index.onset[source_voice][start_pos])
     
     # Extrage intervalele melodice ale sursei (doar p2 - p1)
-    source_intervals = [delta_p for delta_p, _, _ in pattern_intervals]
+    source_dp = index.delta_p[source_voice][start_pos:start_pos + length - 1]
+    source_dur = index.interval_durations(source_voice)[start_pos:start_pos + length - 1]
     
     total_matches = 0
     matches_by_voice = {}
 
     for voice_name in voice_order:
-        intervals = triplets_to_intervals(voices[voice_name])
-        matches = similarity_function(pattern_intervals, intervals)
-        matches_by_voice[voice_name] = []
-        
-        # Colectăm toate potrivirile cu detalii
-        voice_matches = []
-        for b, score in matches:
-            first_note_idx = max(0, b - (length - 1))
-            last_note_idx = min(len(voices[voice_name]) - 1, b)
-            matched_triplets = voices[voice_name][first_note_idx:last_note_idx + 1]
-            if len(matched_triplets) < length:
-                continue
-            matched_onset = matched_triplets[0][1]
-            if voice_name == source_voice and abs(matched_onset - pattern_onset) < 1e-6:
-                continue
-            matched_end_notes = calculate_end_notes(matched_triplets)
-            matched_notes_names = [pitch.Pitch(p).nameWithOctave for p, _, _ in matched_triplets]
-            matched_notes_midi = [p for p, _, _ in matched_triplets]
-            matched_intervals = triplets_to_intervals(matched_triplets)
-            matched_intervals_p = [delta_p for delta_p, _, _ in matched_intervals]
-            interval_diff = sum(abs(p1 - p2) for p1, p2 in zip(source_intervals, matched_intervals_p)) if len(matched_intervals_p) == len(source_intervals) else float('inf')
-            
-            voice_matches.append({
-                'onset': matched_onset,
-                'end_notes': matched_end_notes,
-                'num_notes': len(matched_triplets),
-                'matched_notes': matched_notes_names,
-                'matched_notes_midi': matched_notes_midi,
-                'interval (p2 - p1, duration)': [(delta_p, round(duration, 3)) for delta_p, _, duration in matched_intervals],
-                'interval_diff': interval_diff
-            })
-        
+        if ngrams is not None:
+            ends = ngrams.match_ends(index, voice_name, source_dp, source_dur)
+        else:
+            ends = match_ends(source_dp, source_dur, index.delta_p[voice_name], index.interval_durations(voice_name))
+
+        # Potrivirile complete, fără sursa însăși
+        first = np.maximum(0, ends - (length - 1))
+        last = np.minimum(index.voice_length(voice_name) - 1, ends)
+        first = first[last - first + 1 >= length]
+        onsets = index.onset[voice_name][first]
+        if voice_name == source_voice:
+            keep = np.abs(onsets - pattern_onset) >= 1e-6
+            first, onsets = first[keep], onsets[keep]
+        interval_diff = np.abs(index.delta_p[voice_name][first[:, None] + np.arange(length - 1)] - source_dp).sum(axis=1)
+
         # Filtrează potrivirile suprapuse în aceeași voce, păstrând cea mai apropiată de sursă
-        voice_matches.sort(key=lambda x: (x['onset'], x['interval_diff']))
+        order = np.lexsort((interval_diff, onsets))
         filtered_matches = []
-        i = 0
-        while i < len(voice_matches):
-            match = voice_matches[i]
-            filtered_matches.append(match)
-            end = match['onset'] + (match['num_notes'] - 1)
-            i += 1
-            while i < len(voice_matches) and voice_matches[i]['onset'] <= end:
-                i += 1
-            total_matches += 1
+        end = None
+        for start_index, onset, diff in zip(first[order].tolist(), onsets[order].tolist(), interval_diff[order].tolist()):
+            if end is not None and onset <= end:
+                continue
+            filtered_matches.append((start_index, diff))
+            end = onset + (length - 1)
+        total_matches += len(filtered_matches)
         matches_by_voice[voice_name] = filtered_matches
     
     return {
@@ -242,69 +517,287 @@ def evaluate_pattern_length(voices, source_voice, length, voice_order, start_pos
         'length': length,
         'start_pos': start_pos,
         'pattern_onset': pattern_onset,
-        'pattern_end_notes': pattern_end_notes,
-        'pattern_num_notes': len(pattern_triplets),
         'total_matches': total_matches,
-        'pattern_notes': [pitch.Pitch(p).nameWithOctave for p, _, _ in pattern_triplets],
-        'pattern_notes_midi': [p for p, _, _ in pattern_triplets],
-        'pattern_intervals': [(delta_p, d) for delta_p, _, d in pattern_intervals],
         'matches_by_voice': matches_by_voice
     } if total_matches > 0 else None
 
+def unique_candidates(run):
+    """
+    Enumeră toate pattern-urile candidate (voce sursă, lungime, poziție de start), păstrând doar
+    prima apariție a fiecărui tipar standardizat, în aceeași ordine ca parcurgerea serială.
 
+    Args:
+        run (PatternRun): contextul rulării curente
 
-def save_results(results, voices, output_file, output_dir):
+    Return:
+        list: lista de tupluri (source_voice, length, start_pos)
+    """
+    candidates = []
+    pruned = 0
+    for source_voice in run.voice_order:
+        voice_length = run.index.voice_length(source_voice)
+        for length in range(run.min_length, run.max_length + 1):
+            for start_pos in range(voice_length - length + 1):
+                pattern_intervals = run.index.intervals(source_voice, start_pos, start_pos + length)
+                pattern_intervals_tuple = standardize_pattern_intervals(pattern_intervals)
+                if pattern_intervals_tuple in run.checked_patterns:
+                    pruned += 1
+                    continue
+                run.checked_patterns.add(pattern_intervals_tuple)
+                candidates.append((source_voice, length, start_pos))
+    contor('candidates_pruned', pruned)
+    return candidates
+
+def suffix_array(sir):
     """
-    Salvează rezultatele în JSON.
+    Tabloul de sufixe al unui șir de numere întregi, prin dublarea prefixelor (vectorizat, O(n log² n)).
 
     Args:
-        results (list): Lista de rezultate de la evaluarea pattern-urilor.
-        voices (dict): Dicționar cu voci ca chei și liste de triplete ca valori.
-        output_file (str): Calea către fișierul de ieșire.
-        output_dir (str): Directorul în care se salvează rezultatele.
+        sir (np.ndarray): șirul
 
     Return:
-        json_data (list): Lista de date JSON pentru salvare.
+        np.ndarray: pozițiile de start ale sufixelor, în ordine lexicografică
+    """
+    n = len(sir)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    rang = np.unique(sir, return_inverse=True)[1].astype(np.int64).ravel()
+    k = 1
+    while True:
+        urmator = np.full(n, -1, dtype=np.int64)
+        if k < n:
+            urmator[:n - k] = rang[k:]
+        sa = np.lexsort((urmator, rang))
+        diferit = np.ones(n, dtype=bool)
+        diferit[1:] = (rang[sa][1:] != rang[sa][:-1]) | (urmator[sa][1:] != urmator[sa][:-1])
+        rang = np.empty(n, dtype=np.int64)
+        rang[sa] = np.cumsum(diferit) - 1
+        if rang[sa[-1]] == n - 1 or k >= n:
+            return sa
+        k *= 2
+
+def lcp_array(sir, sa):
     """
-    json_data = []
-    for result in results:
-        if result is None or result['total_matches'] <= 0:  # Modificat pentru a include doar pattern-uri cu potriviri
+    Lungimea celui mai lung prefix comun al sufixelor vecine din tabloul de sufixe (algoritmul Kasai).
+
+    Args:
+        sir (np.ndarray): șirul
+        sa (np.ndarray): tabloul de sufixe
+
+    Return:
+        np.ndarray: lcp[i] = prefixul comun al sufixelor sa[i - 1] și sa[i] (lcp[0] = 0)
+    """
+    n = len(sir)
+    sir = sir.tolist()
+    sa_lista = sa.tolist()
+    rang = [0] * n
+    for i, pozitie in enumerate(sa_lista):
+        rang[pozitie] = i
+    lcp = [0] * n
+    h = 0
+    for pozitie in range(n):
+        if rang[pozitie] > 0:
+            anterior = sa_lista[rang[pozitie] - 1]
+            while pozitie + h < n and anterior + h < n and sir[pozitie + h] == sir[anterior + h]:
+                h += 1
+            lcp[rang[pozitie]] = h
+            if h > 0:
+                h -= 1
+        else:
+            h = 0
+    return np.array(lcp, dtype=np.int64)
+
+def maximal_candidates(run):
+    """
+    Enumeră tiparele maximale: secvențele de intervale care apar identic de cel puțin două ori în voci
+    și care nu pot fi extinse nici la stânga, nici la dreapta în toate aparițiile. Aparițiile sunt comparate
+    ca la potrivire (intervalele melodice și duratele, fără durata ultimului interval), dar fără toleranța
+    de ±1 semiton: un tipar care se repetă doar aproximativ nu este generat, deși ar fi găsit în modul obișnuit.
+    Sub-tiparele incluse într-unul mai lung nu sunt generate, iar lungimea nu este limitată de max_length.
+    Vocile sunt concatenate cu separatori unici, iar tiparele sunt intervalele LCP ale tabloului de sufixe.
+
+    Args:
+        run (PatternRun): contextul rulării curente
+
+    Return:
+        list: lista de tupluri (source_voice, length, start_pos), sursa fiind prima apariție
+    """
+    voice_order = run.voice_order
+    tokens = []
+    for voice_name in voice_order:
+        durations = quantize_durations(run.index.interval_durations(voice_name))
+        tokens.append(np.stack([run.index.delta_p[voice_name], durations], axis=1))
+    lungimi = [len(t) for t in tokens]
+    if sum(lungimi) == 0:
+        return []
+
+    # Alfabetul: perechile (delta_p, durată) numerotate, apoi câte un separator diferit după fiecare voce
+    _, coduri = np.unique(np.concatenate(tokens), axis=0, return_inverse=True)
+    coduri = coduri.ravel()
+    alfabet = int(coduri.max()) + 1 if len(coduri) else 0
+    sir = []
+    inceputuri = []
+    pozitie = 0
+    for idx, lungime in enumerate(lungimi):
+        inceputuri.append(pozitie + idx)
+        sir.append(coduri[pozitie:pozitie + lungime])
+        sir.append(np.array([alfabet + idx], dtype=np.int64))
+        pozitie += lungime
+    sir = np.concatenate(sir).astype(np.int64)
+    inceputuri = np.array(inceputuri, dtype=np.int64)
+
+    separator = sir >= alfabet
+    sa = suffix_array(sir)
+    lcp = lcp_array(sir, sa)
+
+    # Potrivirea ignoră durata ultimului interval: după cele lcp perechi comune, sufixele vecine au încă
+    # un interval comun dacă diferă doar durata. Codurile sunt ordonate după (delta_p, durată), deci
+    # lungimea comună astfel calculată rămâne minimul pe orice interval din tabloul de sufixe.
+    delta_p_sir = np.concatenate([np.append(run.index.delta_p[voice_name], np.iinfo(np.int64).max - idx)
+                                  for idx, voice_name in enumerate(voice_order)])
+    if len(sir) > 1:
+        urmator_stanga, urmator_dreapta = sa[:-1] + lcp[1:], sa[1:] + lcp[1:]
+        lcp[1:] += (delta_p_sir[urmator_stanga] == delta_p_sir[urmator_dreapta]) & ~separator[urmator_stanga]
+
+    # Simbolul dinaintea fiecărui sufix; început de voce = -1 (mereu maximal la stânga)
+    stanga = np.full(len(sir), -1, dtype=np.int64)
+    stanga[1:] = np.where(separator[:-1], -1, sir[:-1])
+    stanga_sa = stanga[sa].tolist()
+    sa_lista = sa.tolist()
+    lcp_lista = lcp.tolist()
+
+    mixt = -1
+    def combina(a, b):
+        return b if a is None else (a if a == b else mixt)
+
+    # Parcurgerea de jos în sus a intervalelor LCP: [lcp, lb, simbolul din stânga comun, prima poziție]
+    minim_intervale = run.min_length - 1
+    maximale = []
+    stiva = [[0, 0, None, None]]
+    for i in range(1, len(sir) + 1):
+        l = lcp_lista[i] if i < len(sir) else 0
+        frunza = (stanga_sa[i - 1], sa_lista[i - 1])
+        varf = stiva[-1]
+        varf[2] = combina(varf[2], frunza[0])
+        varf[3] = frunza[1] if varf[3] is None else min(varf[3], frunza[1])
+        lb, copil = i - 1, frunza
+        while l < stiva[-1][0]:
+            interval = stiva.pop()
+            if interval[0] >= minim_intervale and interval[2] == mixt:
+                maximale.append((interval[3], interval[0]))
+            parinte = stiva[-1]
+            parinte[2] = combina(parinte[2], interval[2])
+            parinte[3] = interval[3] if parinte[3] is None else min(parinte[3], interval[3])
+            lb, copil = interval[1], (interval[2], interval[3])
+        if l > stiva[-1][0]:
+            stiva.append([l, lb, copil[0], copil[1]])
+
+    # Poziția din șir -> (voce, start); ordinea ca la enumerarea obișnuită: voce, lungime, start
+    candidates = []
+    for prima, lungime_intervale in maximale:
+        idx = int(np.searchsorted(inceputuri, prima, side='right')) - 1
+        candidates.append((idx, lungime_intervale + 1, prima - int(inceputuri[idx])))
+    candidates.sort()
+
+    unique = []
+    for idx, length, start_pos in candidates:
+        source_voice = voice_order[idx]
+        pattern_intervals_tuple = standardize_pattern_intervals(run.index.intervals(source_voice, start_pos, start_pos + length))
+        if pattern_intervals_tuple in run.checked_patterns:
+            contor('candidates_pruned')
             continue
-        
-        processed_matches_by_voice = {}
-        for voice_name, matches_list in result['matches_by_voice'].items():
-            processed_matches = []
-            for match in matches_list:
-                processed_matches.append({
-                    'onset': match['onset'],
-                    'end_notes': match['end_notes'],
-                    'num_notes': match['num_notes'],
-                    'matched_notes': [f"{note} ({midi})" for note, midi in zip(match['matched_notes'], match['matched_notes_midi'])],
-                    'intervals (p2 - p1, duration)': ' '.join([f"({dp}, {dur})" for dp, dur in match['interval (p2 - p1, duration)']])
-                })
-            processed_matches_by_voice[voice_name] = processed_matches
-        
-        output_entry = {
-            'pattern': {
-                'source_voice': result['source_voice'],
-                'intervals (p2 - p1, duration)': ' '.join([f"({dp}, {dur})" for dp, dur in result['pattern_intervals']]),
-                'onset': result['pattern_onset'],
-                'end_notes': result['pattern_end_notes'],
-                'num_notes': result['pattern_num_notes'],
-                'notes' : [f"{note} ({midi})" for note, midi in zip(result['pattern_notes'], result['pattern_notes_midi'])]
-            },
-            'total_matches': result['total_matches'],
-            'matches': processed_matches_by_voice
-        }
-        json_data.append(output_entry)
-
-    with open(output_file, 'w') as f:
-        json.dump(json_data, f, indent=2)
-    print(f"Rezultatele au fost salvate în {output_file}.")
+        run.checked_patterns.add(pattern_intervals_tuple)
+        unique.append((source_voice, length, start_pos))
+    return unique
+
+# Starea fiecărui proces din pool, setată o singură dată de init_worker
+worker_state = {}
+
+def init_worker(index, ngrams, voice_order):
+    """
+    Inițializează un proces din pool cu datele comune tuturor candidaților.
+    """
+    worker_state['index'] = index
+    worker_state['ngrams'] = ngrams
+    worker_state['voice_order'] = voice_order
+
+def evaluate_chunk(chunk):
+    """
+    Evaluează un grup de candidați într-un proces din pool.
+
+    Args:
+        chunk (list): lista de tupluri (source_voice, length, start_pos)
+
+    Return:
+        tuple: rezultatele `score_pattern`, în ordinea candidaților, și contoarele grupului
+    """
+    with colecteaza_contoare() as contoare:
+        results = [score_pattern(worker_state['index'], source_voice, length, worker_state['voice_order'], start_pos, worker_state['ngrams'])
+                   for source_voice, length, start_pos in chunk]
+    return results, dict(contoare)
+
+def evaluate_candidates(run, candidates, workers=1):
+    """
+    Evaluează candidații serial sau într-un ProcessPoolExecutor. Rezultatele sunt
+    produse pe rând, în ordinea candidaților, deci ieșirea este identică cu rularea serială
+    și pot fi salvate pe măsură ce sunt calculate, fără a ține toată lista în memorie.
+
+    Args:
+        run (PatternRun): contextul rulării curente
+        candidates (list): lista de tupluri (source_voice, length, start_pos)
+        workers (int): numărul de procese; 1 înseamnă rulare serială
+
+    Return:
+        generator: rezultatele `score_pattern`, în ordinea candidaților
+    """
+    contor('candidates_evaluated', len(candidates))
+    if workers <= 1 or len(candidates) < 2:
+        for source_voice, length, start_pos in candidates:
+            yield score_pattern(run.index, source_voice, length, run.voice_order, start_pos, run.ngrams)
+        return
+
+    # Câteva grupuri pe proces, ca să se echilibreze încărcarea
+    chunk_size = max(1, -(-len(candidates) // (workers * 4)))
+    chunks = [candidates[i:i + chunk_size] for i in range(0, len(candidates), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(run.index, run.ngrams, run.voice_order)) as executor:
+        for chunk_results, contoare in executor.map(evaluate_chunk, chunks):
+            adauga_contoare(contoare)
+            yield from chunk_results
+
+def save_results(results, voices, output_file, output_dir, format=None, compact=False, model=None):
+    """
+    Salvează rezultatele în JSON, câte un pattern pe rând, fără a construi întregul document în memorie.
+    Notele și intervalele potrivirilor sunt generate aici, din înregistrările compacte
+    (start_index, interval_diff) ale `score_pattern`.
+
+    Args:
+        results (iterable): Rezultatele evaluării pattern-urilor (listă sau generator, ex. `evaluate_candidates`).
+        voices (dict): Dicționar cu voci ca chei și tablouri (pitch, onset, duration) ca valori.
+        output_file (str): Calea către fișierul de ieșire (.json, .jsonl, opțional comprimat .gz).
+        output_dir (str): Directorul în care se salvează rezultatele.
+        format (str): 'json' (tablou) sau 'jsonl' (un pattern pe linie); implicit după extensie.
+        compact (bool): schema compactă, cu valori numerice în locul textului formatat.
+        model (list): dacă este dată, i se adaugă obiectul RezultatPattern al fiecărui pattern salvat.
+
+    Return:
+        int: numărul de pattern-uri salvate.
+    """
+    intrare = intrare_compacta if compact else intrare_json
+    with ScriitorRezultate(output_file, format, compact) as scriitor:
+        for result in results:
+            if result is None or result['total_matches'] <= 0:  # Modificat pentru a include doar pattern-uri cu potriviri
+                continue
+            scriitor.scrie(intrare(result, voices))
+            if model is not None:
+                model.append(rezultat_model(result, voices))
+    log.info(f"Rezultatele au fost salvate în {output_file}.")
     
-    return json_data
+    return scriitor.numar
 
-def pattern(csv_file, output_dir, partitura, output_subdir = "analiza_pattern"):
+@masurat()
+def pattern(csv_file, output_dir, partitura, output_subdir = "analiza_pattern", workers=1,
+            min_length=min_length, max_length=max_length, format_rezultate="json", compact=False, comprimat=False,
+            top_k=0, ponderi=None, maximal=False):
     """
     Rulează algoritmul pentru toate lungimile și pozițiile.
 
@@ -313,6 +806,15 @@ def pattern(csv_file, output_dir, partitura, output_subdir = "analiza_pattern"):
         output_dir (str): Directorul în care se salvează rezultatele.
         partitura (music21.Score): Obiect music21 Score, partitura de analizat.
         output_subdir (str): Subdirectorul în care se salvează rezultatele analizei.
+        workers (int): Numărul de procese pentru evaluarea candidaților (1 = serial).
+        min_length (int): Lungimea minimă a tiparului (note).
+        max_length (int): Lungimea maximă a tiparului (note).
+        format_rezultate (str): 'json' (patterns.json) sau 'jsonl' (patterns.jsonl, un pattern pe linie).
+        compact (bool): rezultatele sunt salvate în schema compactă, numerică.
+        comprimat (bool): fișierul cu rezultate este comprimat cu gzip (.gz).
+        top_k (int): numărul de pattern-uri din clasament (pattern_top.csv și câte un grafic); 0 = fără clasament.
+        ponderi (dict): ponderile criteriilor clasamentului (vezi clasament_pattern.scoruri).
+        maximal (bool): caută doar tiparele maximale, repetate identic (vezi maximal_candidates), fără limita max_length.
 
     Return:
         output_dir (str): Directorul în care sunt salvate rezultatele analizei.
@@ -323,28 +825,32 @@ def pattern(csv_file, output_dir, partitura, output_subdir = "analiza_pattern"):
     os.makedirs(output_dir, exist_ok=True)
 
 
-    voices = load_triplets(csv_file)
-    voice_order = ['Soprano', 'Alto', 'Tenor', 'Bass']
-    
-    results = []
-    for source_voice in voice_order:
-        voice_length = len(voices[source_voice])
-        for length in range(min_length, max_length + 1):
-            for start_pos in range(voice_length - length + 1):
-                if len(voices[source_voice]) >= start_pos + length:
-                    result = evaluate_pattern_length(voices, source_voice, length, voice_order, start_pos)
-                    if result and result['total_matches'] > 1:
-                        results.append(result)
+    with masoara('load_voices'):
+        voices = load_voices(csv_file)
+    voice_order = list(voices)
+    with masoara('index'):
+        run = PatternRun(voices, voice_order, min_length, max_length)
     
-    output_file = os.path.join(output_dir, "patterns.json")
-    json_data = save_results(results, voices, output_file, output_dir)
+    with masoara('maximal_candidates' if maximal else 'unique_candidates'):
+        candidates = maximal_candidates(run) if maximal else unique_candidates(run)
+
+    # Rezultatele sunt scrise pe măsură ce sunt evaluate; în memorie rămâne doar modelul compact
+    # (RezultatPattern), de care au nevoie distribuția, graficele și clasamentul
+    output_file = fisier_rezultate(output_dir, format_rezultate, comprimat)
+    model = []
+    with masoara('evaluate_candidates'):
+        results = (result for result in evaluate_candidates(run, candidates, workers)
+                   if result and result['total_matches'] > 1)
+        save_results(results, voices, output_file, output_dir, format_rezultate, compact, model)
+        contor('patterns_emitted', len(model))
+        contor('matches_emitted', sum(rezultat.total_matches for rezultat in model))
 
     # Generare tabel cu distribuția tiparelor
     pattern_distribution = {}
     max_matches = 2  # Inițializăm cu minim 2 potriviri
-    for result in results:
-        length = result['length']
-        matches = result['total_matches']
+    for rezultat in model:
+        length = rezultat.source.num_notes
+        matches = rezultat.total_matches
         max_matches = max(max_matches, matches)  # Actualizăm maximul de potriviri
         if length not in pattern_distribution:
             pattern_distribution[length] = {}
@@ -359,6 +865,8 @@ def pattern(csv_file, output_dir, partitura, output_subdir = "analiza_pattern"):
         writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
         
         writer.writeheader()
+        if maximal:
+            max_length = max([min_length] + list(pattern_distribution))
         for length in range(min_length, max_length + 1):
             row = {'Length': length}
             dist = pattern_distribution.get(length, {})
@@ -366,8 +874,12 @@ def pattern(csv_file, output_dir, partitura, output_subdir = "analiza_pattern"):
                 row[f'Matches_{i}'] = dist.get(i, 0)
             writer.writerow(row)
 
-    print(f"Distribuția tiparelor a fost salvată în {csv_file_path}.")
+    log.info(f"Distribuția tiparelor a fost salvată în {csv_file_path}.")
     total_duration = int(partitura.flat.quarterLength) - 1
-    generate_all_graphics(output_file, total_duration, output_dir)
+    with masoara('generate_all_graphics'):
+        generate_all_graphics(output_file, total_duration, output_dir, model)
+    if top_k > 0:
+        with masoara('generate_top_graphics'):
+            generate_top_graphics(output_file, total_duration, output_dir, voices, top_k, ponderi, model)
 
     return output_dir
\ No newline at end of file
@@ -0,0 +1,82 @@
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+# Parametri
+mod_randare = "imediat"  # 'imediat' (graficul este desenat pe loc), 'amanat' (intră în coadă) sau 'dezactivat'
+coada_grafice = []  # Graficele amânate: (funcție, args, kwargs)
+
+def grafice_active():
+    """
+    Return:
+        bool: False dacă graficele nu se mai generează deloc (mod doar date)
+    """
+    return mod_randare != "dezactivat"
+
+def programeaza_grafic(functie, *args, **kwargs):
+    """
+    Desenează un grafic acum, îl adaugă în coada de randare sau îl ignoră, după modul curent.
+    Funcția și argumentele trebuie să poată fi trimise altor procese (funcții de modul, date simple).
+
+    Args:
+        functie (callable): funcția care desenează și salvează graficul
+        args, kwargs: argumentele funcției
+    """
+    if mod_randare == "imediat":
+        functie(*args, **kwargs)
+    elif mod_randare == "amanat":
+        coada_grafice.append((functie, args, kwargs))
+
+def init_randare():
+    """
+    Inițializarea proceselor de randare: backend-ul Agg, fără ferestre.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+
+def randeaza(grafic):
+    """
+    Desenează un grafic din coadă.
+    """
+    functie, args, kwargs = grafic
+    functie(*args, **kwargs)
+
+def randeaza_coada(workers=1):
+    """
+    Desenează toate graficele din coadă și golește coada.
+
+    Args:
+        workers (int): numărul de procese pentru randare (1 = serial, în procesul curent)
+
+    Return:
+        int: numărul de grafice desenate
+    """
+    grafice = list(coada_grafice)
+    coada_grafice.clear()
+    if workers > 1 and len(grafice) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(grafice)), initializer=init_randare) as executor:
+            list(executor.map(randeaza, grafice))
+    else:
+        for grafic in grafice:
+            randeaza(grafic)
+    return len(grafice)
+
+@contextmanager
+def randare_amanata(workers=1, activ=True):
+    """
+    Graficele cerute în interiorul blocului sunt strânse într-o coadă și desenate la final,
+    în paralel dacă workers > 1. Cu activ=False graficele nu se generează deloc.
+
+    Args:
+        workers (int): numărul de procese pentru randare
+        activ (bool): generează graficele (False = doar fișierele de date)
+    """
+    global mod_randare
+    mod_anterior = mod_randare
+    mod_randare = "amanat" if activ else "dezactivat"
+    try:
+        yield
+        if activ:
+            randeaza_coada(workers)
+    finally:
+        coada_grafice.clear()
+        mod_randare = mod_anterior
@@ -0,0 +1,383 @@
+import gzip
+import json
+import os
+import re
+from functools import lru_cache
+import numpy as np
+from music21 import pitch
+
+# Parametri
+nume_rezultate = "patterns"  # Numele fișierului cu rezultate, fără extensie
+formate = ('json', 'jsonl')  # 'json' = un singur tablou JSON, 'jsonl' = câte un pattern pe linie
+interval_text = re.compile(r'\((-?\d+),')  # Intervalul melodic din fiecare "(p2 - p1, durată)"
+
+@lru_cache(maxsize=None)
+def nume_midi():
+    """
+    Tabelul numelor notelor (ex. "E5") pentru valorile MIDI 0-127, calculat o singură dată.
+    """
+    return tuple(pitch.Pitch(p).nameWithOctave for p in range(128))
+
+def nume_nota(midi):
+    """
+    Numele notei cu valoarea MIDI dată, din tabel (sau prin music21 în afara intervalului 0-127).
+    """
+    return nume_midi()[midi] if 0 <= midi < 128 else pitch.Pitch(midi).nameWithOctave
+
+def formateaza_note(pitches, durations, rotunjire=None):
+    """
+    Notele și intervalele unei apariții a tiparului, în forma din patterns.json.
+
+    Args:
+        pitches (list): valorile MIDI ale notelor
+        durations (list): duratele notelor
+        rotunjire (int): numărul de zecimale al duratelor intervalelor (None = nerotunjite)
+
+    Return:
+        tuple(notes (list), intervals (str)): notele "E5 (76)" și intervalele "(2, 0.5) (-1, 1.0)"
+    """
+    durations = durations[1:]
+    if rotunjire is not None:
+        durations = [round(duration, rotunjire) for duration in durations]
+    notes = [f"{nume_nota(p)} ({p})" for p in pitches]
+    intervals = ' '.join(f"({p2 - p1}, {duration})" for p1, p2, duration in zip(pitches, pitches[1:], durations))
+    return notes, intervals
+
+def note_voce(voice, start, length):
+    """
+    Valorile MIDI și duratele notelor start ... start + length - 1 ale unei voci.
+
+    Args:
+        voice (tuple): tablourile vocii (pitch, onset, duration)
+        start (int): indicele primei note
+        length (int): numărul de note
+
+    Return:
+        tuple(list, list): valorile MIDI și duratele
+    """
+    return voice[0][start:start + length].tolist(), voice[2][start:start + length].tolist()
+
+def intrare_json(result, voices):
+    """
+    Intrarea din patterns.json pentru un rezultat al `score_pattern` (forma cu text, pentru citire).
+
+    Args:
+        result (dict): rezultatul, cu potrivirile compacte (start_index, interval_diff)
+        voices (dict): vocile, cu tablourile (pitch, onset, duration)
+
+    Return:
+        dict: intrarea JSON
+    """
+    length = result['length']
+    matches_by_voice = {}
+    for voice_name, matches_list in result['matches_by_voice'].items():
+        voice = voices[voice_name]
+        matches = []
+        for start_index, _ in matches_list:
+            notes, intervals = formateaza_note(*note_voce(voice, start_index, length), rotunjire=3)
+            matches.append({
+                'onset': float(voice[1][start_index]),
+                'end_notes': length - 1,
+                'num_notes': length,
+                'matched_notes': notes,
+                'intervals (p2 - p1, duration)': intervals
+            })
+        matches_by_voice[voice_name] = matches
+
+    notes, intervals = formateaza_note(*note_voce(voices[result['source_voice']], result['start_pos'], length))
+    return {
+        'pattern': {
+            'source_voice': result['source_voice'],
+            'intervals (p2 - p1, duration)': intervals,
+            'onset': result['pattern_onset'],
+            'end_notes': length - 1,
+            'num_notes': length,
+            'notes' : notes
+        },
+        'total_matches': result['total_matches'],
+        'matches': matches_by_voice
+    }
+
+def intrare_compacta(result, voices):
+    """
+    Intrarea compactă pentru un rezultat al `score_pattern`: doar valori numerice, cu potrivirile
+    fiecărei voci pe coloane (start, onset, interval_diff, pitches, durations).
+
+    Args:
+        result (dict): rezultatul, cu potrivirile compacte (start_index, interval_diff)
+        voices (dict): vocile, cu tablourile (pitch, onset, duration)
+
+    Return:
+        dict: intrarea JSON compactă
+    """
+    length = result['length']
+    matches_by_voice = {}
+    for voice_name, matches_list in result['matches_by_voice'].items():
+        voice = voices[voice_name]
+        starts = [start_index for start_index, _ in matches_list]
+        note = [note_voce(voice, start_index, length) for start_index in starts]
+        matches_by_voice[voice_name] = {
+            'start': starts,
+            'onset': voice[1][starts].tolist(),
+            'interval_diff': [interval_diff for _, interval_diff in matches_list],
+            'pitches': [pitches for pitches, _ in note],
+            'durations': [durations for _, durations in note]
+        }
+
+    pitches, durations = note_voce(voices[result['source_voice']], result['start_pos'], length)
+    return {
+        'source_voice': result['source_voice'],
+        'start': result['start_pos'],
+        'onset': result['pattern_onset'],
+        'length': length,
+        'pitches': pitches,
+        'durations': durations,
+        'total_matches': result['total_matches'],
+        'matches': matches_by_voice
+    }
+
+def din_compacta(intrare):
+    """
+    Transformă o intrare compactă în forma cu text din patterns.json.
+
+    Args:
+        intrare (dict): intrarea compactă (vezi `intrare_compacta`)
+
+    Return:
+        dict: intrarea în forma cu text
+    """
+    length = intrare['length']
+    matches_by_voice = {}
+    for voice_name, coloane in intrare['matches'].items():
+        matches = []
+        for onset, pitches, durations in zip(coloane['onset'], coloane['pitches'], coloane['durations']):
+            notes, intervals = formateaza_note(pitches, durations, rotunjire=3)
+            matches.append({'onset': onset, 'end_notes': length - 1, 'num_notes': length,
+                            'matched_notes': notes, 'intervals (p2 - p1, duration)': intervals})
+        matches_by_voice[voice_name] = matches
+
+    notes, intervals = formateaza_note(intrare['pitches'], intrare['durations'])
+    return {
+        'pattern': {
+            'source_voice': intrare['source_voice'],
+            'intervals (p2 - p1, duration)': intervals,
+            'onset': intrare['onset'],
+            'end_notes': length - 1,
+            'num_notes': length,
+            'notes': notes
+        },
+        'total_matches': intrare['total_matches'],
+        'matches': matches_by_voice
+    }
+
+def fisier_rezultate(output_dir, format='json', comprimat=False):
+    """
+    Calea fișierului cu rezultate pentru formatul dat (patterns.json, patterns.jsonl, cu .gz dacă este comprimat).
+    """
+    return os.path.join(output_dir, f"{nume_rezultate}.{format}{'.gz' if comprimat else ''}")
+
+def deschide(fisier, mod):
+    """
+    Deschide un fișier cu rezultate ca text, prin gzip dacă numele se termină cu .gz.
+    """
+    if fisier.endswith('.gz'):
+        return gzip.open(fisier, mod + 't', encoding='utf-8')
+    return open(fisier, mod, encoding='utf-8')
+
+class ScriitorRezultate:
+    """
+    Scrie rezultatele pe rând, fără a ține toate intrările în memorie: fie ca tablou JSON
+    (identic cu json.dump(..., indent=2) în forma implicită), fie JSON Lines. Se folosește ca context manager.
+    """
+
+    def __init__(self, fisier, format=None, compact=False):
+        """
+        Args:
+            fisier (str): calea fișierului (.json, .jsonl, opțional cu .gz)
+            format (str): 'json' sau 'jsonl' (implicit după extensie)
+            compact (bool): intrările sunt scrise pe o singură linie, fără indentare
+        """
+        self.fisier = fisier
+        self.format = format or ('jsonl' if fisier.endswith(('.jsonl', '.jsonl.gz')) else 'json')
+        if self.format not in formate:
+            raise ValueError(f"Formatul rezultatelor trebuie să fie unul dintre {formate}.")
+        self.compact = compact
+        self.numar = 0
+        self.f = None
+
+    def __enter__(self):
+        self.f = deschide(self.fisier, 'w')
+        return self
+
+    def scrie(self, intrare):
+        """
+        Scrie o intrare (un pattern).
+        """
+        if self.format == 'jsonl':
+            self.f.write(json.dumps(intrare, separators=(',', ':') if self.compact else None))
+            self.f.write('\n')
+        elif self.compact:
+            self.f.write(',\n' if self.numar else '[\n')
+            self.f.write(json.dumps(intrare, separators=(',', ':')))
+        else:
+            self.f.write(',\n' if self.numar else '[\n')
+            self.f.write('\n'.join('  ' + linie for linie in json.dumps(intrare, indent=2).split('\n')))
+        self.numar += 1
+
+    def __exit__(self, *exc):
+        if self.format == 'json':
+            self.f.write('\n]' if self.numar else '[]')
+        self.f.close()
+        return False
+
+def citeste_intrari(fisier):
+    """
+    Citește intrările scrise de `ScriitorRezultate`, așa cum sunt pe disc (cu text sau compacte).
+
+    Args:
+        fisier (str): calea fișierului
+
+    Return:
+        list: intrările
+    """
+    with deschide(fisier, 'r') as f:
+        if fisier.endswith(('.jsonl', '.jsonl.gz')):
+            return [json.loads(linie) for linie in f if linie.strip()]
+        return json.load(f)
+
+def citeste_rezultate(fisier):
+    """
+    Citește rezultatele scrise de `ScriitorRezultate`, în oricare dintre formate, ca intrări în forma cu text.
+
+    Args:
+        fisier (str): calea fișierului
+
+    Return:
+        list: intrările
+    """
+    return [intrare if 'pattern' in intrare else din_compacta(intrare) for intrare in citeste_intrari(fisier)]
+
+class Aparitie:
+    """
+    O apariție a unui tipar (sursa sau o potrivire): vocea, onset-ul, numărul de note,
+    intervalele melodice (p2 - p1) și indexul primei note în voce.
+    """
+    __slots__ = ('voice', 'onset', 'num_notes', 'intervals', 'start')
+
+    def __init__(self, voice, onset, num_notes, intervals, start=None):
+        """
+        Args:
+            voice (str): vocea
+            onset (float): onset-ul primei note
+            num_notes (int): numărul de note
+            intervals (tuple): intervalele melodice, ca numere întregi
+            start (int): indexul primei note în voce (None pentru patterns.json cu text, care nu îl păstrează)
+        """
+        self.voice = voice
+        self.onset = onset
+        self.num_notes = num_notes
+        self.intervals = intervals
+        self.start = start
+
+    @property
+    def end(self):
+        """
+        Sfârșitul apariției pe axa timpului, ca în grafice (onset + numărul de note - 1).
+        """
+        return self.onset + (self.num_notes - 1)
+
+class RezultatPattern:
+    """
+    Un pattern găsit: apariția sursă, numărul total de potriviri și potrivirile, în ordinea vocilor.
+    """
+    __slots__ = ('source', 'total_matches', 'matches')
+
+    def __init__(self, source, total_matches, matches):
+        """
+        Args:
+            source (Aparitie): apariția sursă
+            total_matches (int): numărul total de potriviri
+            matches (list): potrivirile (Aparitie)
+        """
+        self.source = source
+        self.total_matches = total_matches
+        self.matches = matches
+
+    def potriviri_exacte(self):
+        """
+        Return:
+            int: numărul potrivirilor cu aceleași intervale melodice ca sursa (durata este ignorată)
+        """
+        return sum(1 for match in self.matches
+                   if match.num_notes == self.source.num_notes and match.intervals == self.source.intervals)
+
+def rezultat_model(result, voices):
+    """
+    Obiectul RezultatPattern pentru un rezultat `score_pattern`, fără a trece prin JSON.
+
+    Args:
+        result (dict): rezultatul, cu potrivirile compacte (start_index, interval_diff)
+        voices (dict): vocile, cu tablourile (pitch, onset, duration)
+
+    Return:
+        RezultatPattern: pattern-ul, cu sursa și potrivirile
+    """
+    def aparitie(voice_name, start, onset):
+        intervals = tuple(np.diff(voices[voice_name][0][start:start + length]).tolist())
+        return Aparitie(voice_name, onset, length, intervals, start)
+
+    length = result['length']
+    source = aparitie(result['source_voice'], result['start_pos'], result['pattern_onset'])
+    matches = [aparitie(voice_name, start_index, float(voices[voice_name][1][start_index]))
+               for voice_name, matches_list in result['matches_by_voice'].items()
+               for start_index, _ in matches_list]
+    return RezultatPattern(source, result['total_matches'], matches)
+
+def model_rezultate(results, voices):
+    """
+    Modelul în memorie al rezultatelor `score_pattern`, fără a trece prin JSON.
+
+    Args:
+        results (list): rezultatele, cu potrivirile compacte (start_index, interval_diff)
+        voices (dict): vocile, cu tablourile (pitch, onset, duration)
+
+    Return:
+        list: obiectele RezultatPattern
+    """
+    return [rezultat_model(result, voices) for result in results
+            if result is not None and result['total_matches'] > 0]
+
+def din_intrare(intrare):
+    """
+    Obiectul RezultatPattern pentru o intrare citită de pe disc (cu text sau compactă).
+    """
+    if 'pattern' not in intrare:
+        length = intrare['length']
+        pitches = intrare['pitches']
+        source = Aparitie(intrare['source_voice'], intrare['onset'], length,
+                          tuple(p2 - p1 for p1, p2 in zip(pitches, pitches[1:])), intrare['start'])
+        matches = [Aparitie(voice_name, onset, length, tuple(p2 - p1 for p1, p2 in zip(pitches, pitches[1:])), start)
+                   for voice_name, coloane in intrare['matches'].items()
+                   for start, onset, pitches in zip(coloane['start'], coloane['onset'], coloane['pitches'])]
+        return RezultatPattern(source, intrare['total_matches'], matches)
+
+    sursa = intrare['pattern']
+    source = Aparitie(sursa['source_voice'], sursa['onset'], sursa['num_notes'],
+                      tuple(map(int, interval_text.findall(sursa['intervals (p2 - p1, duration)']))))
+    matches = [Aparitie(voice_name, match['onset'], match['num_notes'],
+                        tuple(map(int, interval_text.findall(match['intervals (p2 - p1, duration)']))))
+               for voice_name, matches_list in intrare['matches'].items() for match in matches_list]
+    return RezultatPattern(source, intrare['total_matches'], matches)
+
+def incarca_rezultate(fisier):
+    """
+    Încarcă rezultatele de pe disc (patterns.json, .jsonl, compacte sau comprimate) direct în model,
+    fără a genera forma cu text pentru intrările compacte.
+
+    Args:
+        fisier (str): calea fișierului
+
+    Return:
+        list: obiectele RezultatPattern
+    """
+    return [din_intrare(intrare) for intrare in citeste_intrari(fisier)]
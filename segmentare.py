@@ -1,14 +1,109 @@
 import csv
 import os
+from functools import lru_cache
 import matplotlib.pyplot as plt
+import numpy as np
 from music21 import *
+from randare import programeaza_grafic
+from cache_acorduri import nume_acord, roman_acord, cache
+from instrumentare import jurnal, masurat, contor
 
-def analizare_tonalitate(partitura):
+log = jurnal("segmentare")
+
+# Profilele Aarden-Essen, folosite implicit de music21 în analyze('key')
+profil_major = analysis.discrete.AardenEssen().getWeights('major')
+profil_minor = analysis.discrete.AardenEssen().getWeights('minor')
+
+# Tonica fiecărei clase de înălțime, cu ortografia aleasă de music21 (pitch.Pitch(pc), enarmonica doar dacă tonalitatea nu e validă)
+tonice_major = ['C', 'C#', 'D', 'E-', 'E', 'F', 'F#', 'G', 'A-', 'A', 'B-', 'B']
+tonice_minor = ['C', 'C#', 'D', 'E-', 'E', 'F', 'F#', 'G', 'G#', 'A', 'B-', 'B']
+
+@lru_cache(maxsize=None)
+def matrice_profile():
+    """
+    Cele 24 de profile tonale (12 majore, apoi 12 minore), centrate și normate,
+    ca scorurile să fie coeficienții de corelație din music21.
+
+    Return:
+        np.ndarray: matricea 24 x 12
+    """
+    profile = np.array([np.roll(profil, tonica) for profil in (profil_major, profil_minor) for tonica in range(12)])
+    profile = profile - profile.mean(axis=1, keepdims=True)
+    return profile / np.linalg.norm(profile, axis=1, keepdims=True)
+
+@lru_cache(maxsize=None)
+def tonalitate_index(index):
+    """
+    Obiectul music21 pentru una dintre cele 24 de tonalități, creat o singură dată.
+
+    Args:
+        index (int): 0-11 pentru tonalitățile majore, 12-23 pentru cele minore (după tonică)
+
+    Return:
+        music21.key.Key: tonalitatea
+    """
+    if index < 12:
+        return key.Key(tonice_major[index], 'major')
+    return key.Key(tonice_minor[index - 12].lower(), 'minor')
+
+def histograme_masuri(partitura, parti=None):
+    """
+    Histograma claselor de înălțime pe fiecare măsură, ponderată cu durata notelor,
+    construită dintr-o singură trecere prin notele fiecărei părți.
+    Măsurile sunt cele ale primei părți; notele celorlalte părți sunt atribuite după offset.
+
+    Args:
+        partitura (music21.Score): Obiect music21 Score, partitura de analizat.
+        parti (list): părțile folosite (implicit toate)
+
+    Returns:
+        tuple: (măsurile primei părți, np.ndarray cu forma (număr măsuri, 12))
+    """
+    masuri = list(partitura.parts[0].getElementsByClass('Measure'))
+    histograme = np.zeros((len(masuri), 12))
+    if not masuri:
+        return masuri, histograme
+
+    inceput = np.array([float(masura.offset) for masura in masuri])
+    offset, clase, durate = [], [], []
+    for part in (partitura.parts if parti is None else parti):
+        for n in part.flatten().notes:
+            for p in n.pitches:
+                offset.append(float(n.offset))
+                clase.append(p.pitchClass)
+                durate.append(float(n.quarterLength))
+
+    if offset:
+        index_masura = np.clip(np.searchsorted(inceput, offset, side='right') - 1, 0, len(masuri) - 1)
+        np.add.at(histograme, (index_masura, np.array(clase)), np.array(durate))
+    return masuri, histograme
+
+def scoruri_tonalitati(histograme):
+    """
+    Corelația fiecărei histograme cu cele 24 de profile tonale, printr-o singură înmulțire de matrice.
+
+    Args:
+        histograme (np.ndarray): histogramele, cu forma (n, 12)
+
+    Return:
+        np.ndarray: scorurile, cu forma (n, 24); 0 pentru histogramele constante
+    """
+    centrate = histograme - histograme.mean(axis=1, keepdims=True)
+    norme = np.linalg.norm(centrate, axis=1, keepdims=True)
+    norme[norme == 0] = np.inf
+    return (centrate / norme) @ matrice_profile().T
+
+@masurat()
+def analizare_tonalitate(partitura, fereastra=1, parti=None):
     """
     Segmentează o partitură în funcție de tonalitate.
+    Tonalitatea fiecărei măsuri este estimată ca în music21 (profilele Aarden-Essen) pe histograma
+    măsurilor dintr-o fereastră centrată pe ea (fereastra=1: doar măsura însăși).
 
     Args:
         partitura (music21.Score): Obiect music21 Score, partitura de analizat.
+        fereastra (int): numărul de măsuri din fereastra de netezire
+        parti (list): părțile folosite pentru histograme (implicit toate)
 
     Returns:
         list: Lista de segmente de tonalitate, fiecare segment fiind un tuplu (tonalitate, start, end).
@@ -19,11 +114,25 @@ def analizare_tonalitate(partitura):
 
     durata_totala = partitura.duration.quarterLength
 
-    for masura in partitura.parts[0].getElementsByClass('Measure'):
-        try:
-            analiza_tonalitate = masura.analyze('key')
-        except:
-            analiza_tonalitate = tonalitate_curenta if tonalitate_curenta else key.Key('C')
+    masuri, histograme = histograme_masuri(partitura, parti)
+    contor('measures', len(masuri))
+    if fereastra > 1 and len(masuri):
+        # Sumele pe ferestre din sumele prefix, fără a reface histogramele
+        cumulat = np.vstack([np.zeros(12), np.cumsum(histograme, axis=0)])
+        index = np.arange(len(masuri))
+        stanga = np.clip(index - fereastra // 2, 0, len(masuri))
+        dreapta = np.clip(index - fereastra // 2 + fereastra, 0, len(masuri))
+        histograme = cumulat[dreapta] - cumulat[stanga]
+    # Rotunjirea păstrează egalitățile exacte (ex. histograme simetrice): câștigă prima tonalitate, ca în music21
+    cele_mai_bune = np.argmax(np.round(scoruri_tonalitati(histograme), 12), axis=1)
+    fara_note = ~histograme.any(axis=1)
+
+    for masura, index, gol in zip(masuri, cele_mai_bune, fara_note):
+        if gol:
+            # Măsură fără note: păstrăm tonalitatea anterioară
+            analiza_tonalitate = tonalitate_curenta if tonalitate_curenta else tonalitate_index(0)
+        else:
+            analiza_tonalitate = tonalitate_index(int(index))
 
         if analiza_tonalitate != tonalitate_curenta and masura_curenta:
             start_time = masura_curenta[0].offset
@@ -45,15 +154,17 @@ def analizare_tonalitate(partitura):
         # Limităm end_time la durata totală a partiturii
         end_time = min(end_time, durata_totala)
         segmente.append((tonalitate_curenta, start_time, end_time))
+    contor('key_segments', len(segmente))
     return segmente
 
-def segmentare_tonalitate(partitura, output_dir):
+def segmentare_tonalitate(partitura, output_dir, fereastra=1):
     """
     Segmentează o partitură bazată pe tonalitate, salvând rezultatele într-un fișier.
 
     Args:
         partitura (music21.Score): Obiect music21 Score, partitura de analizat.
         output_dir (str): directorul unde sunt salvate informațiile (output_dir/output_subdir).
+        fereastra (int): numărul de măsuri din fereastra de netezire a tonalității
 
     Returns:
         list: Lista de segmente de tonalitate, fiecare segment fiind un tuplu (tonalitate, start, end).
@@ -63,11 +174,11 @@ def segmentare_tonalitate(partitura, output_dir):
     output_file = os.path.join(dir, 'tonalitate.csv')
 
     if os.path.isfile(output_file):
-        print(f"\tFișierul '{output_file}' există deja. Îl voi suprascrie.")
+        log.debug(f"\tFișierul '{output_file}' există deja. Îl voi suprascrie.")
     else:
-        print(f"\tFișierul '{output_file}' nu există. Îl voi crea.")
+        log.debug(f"\tFișierul '{output_file}' nu există. Îl voi crea.")
     
-    segmente = analizare_tonalitate(partitura)
+    segmente = analizare_tonalitate(partitura, fereastra)
 
     try:
         with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
@@ -76,15 +187,69 @@ def segmentare_tonalitate(partitura, output_dir):
             for idx, (tonalitate, start, end) in enumerate(segmente, 1):
                 tonalitate_str = str(tonalitate).replace(' ', '_') if tonalitate else 'Unknown'
                 writer.writerow([f"{start:.3f}", f"{end:.3f}", f"Secțiunea {idx}: {tonalitate_str}"])
-        print(f"\tRezultatele au fost salvate în fișierul: '{output_file}'")
+        log.info(f"\tRezultatele au fost salvate în fișierul: '{output_file}'")
     except Exception as e:
-        print(f"Eroare la scrierea în fișierul CSV: {e}")
+        log.error(f"Eroare la scrierea în fișierul CSV: {e}")
 
     return segmente
 
+# Parametri
+toleranta_onset = 0.1  # Notele care încep la mai puțin de atât după începutul unui grup sunt considerate simultane
+durata_minima_acord = 0.25  # Durata minimă a unei sonorități pentru a fi păstrată
+note_minime_acord = 3  # Numărul minim de note care sună simultan
+
+def sonoritati(partitura):
+    """
+    Extrage sonoritățile verticale cu o baleiere a evenimentelor de început și sfârșit ale notelor:
+    la fiecare schimbare, mulțimea notelor care sună (inclusiv cele ținute) formează o sonoritate.
+
+    Args:
+        partitura (music21.Score): Obiect music21 Score, partitura de analizat.
+
+    Return:
+        list: sonoritățile (start, end, pitches), în ordinea timpului
+    """
+    note_toate = []
+    for part in partitura.parts:
+        for n in part.flatten().notes:
+            start = float(n.offset)
+            end = start + float(n.quarterLength)
+            if end > start:  # Notele de ornament nu au durată
+                note_toate.extend((start, end, p) for p in n.pitches)
+    if not note_toate:
+        return []
+
+    # Notele care încep aproape simultan (sub toleranță) sunt mutate la începutul grupului, cu tot cu sfârșit
+    note_toate.sort(key=lambda x: x[0])
+    inceput_grup = note_toate[0][0]
+    evenimente = []
+    for idx, (start, end, p) in enumerate(note_toate):
+        if start - inceput_grup >= toleranta_onset:
+            inceput_grup = start
+        evenimente.append((inceput_grup, 1, idx))
+        evenimente.append((round(end - (start - inceput_grup), 6), 0, idx))
+    evenimente.sort()  # La același moment, sfârșiturile (0) înaintea începuturilor (1)
+
+    rezultat = []
+    suna = {}
+    i = 0
+    while i < len(evenimente):
+        moment = evenimente[i][0]
+        while i < len(evenimente) and evenimente[i][0] == moment:
+            _, tip, idx = evenimente[i]
+            if tip:
+                suna[idx] = note_toate[idx][2]
+            else:
+                suna.pop(idx, None)
+            i += 1
+        if suna and i < len(evenimente):
+            rezultat.append((moment, evenimente[i][0], list(suna.values())))
+    return rezultat
+
+@masurat()
 def acorduri(partitura):
     """
-    Segmentează o partitură bazată pe acorduri, combinând notele simultane din toate vocile.
+    Segmentează o partitură bazată pe acorduri, combinând notele care sună simultan în toate vocile.
 
     Args:
         partitura (music21.Score): Obiect music21 Score, partitura de analizat.
@@ -92,72 +257,56 @@ def acorduri(partitura):
     Returns:
         list: Lista de segmente de acorduri, fiecare segment fiind un tuplu (figura, start, end).
     """
-    print("\tRealizez segmentarea bazată pe acorduri...")
+    log.info("\tRealizez segmentarea bazată pe acorduri...")
     segmente = []
-    
-    # Colectăm toate notele din toate părțile
-    note_toate = []
-    for part in partitura.parts:
-        for n in part.recurse().getElementsByClass('Note'):
-            note_toate.append((n.offset, n.offset + n.duration.quarterLength, n.pitch, part))
-
-    note_toate.sort(key=lambda x: (x[0], x[1]))
+    hits, misses = cache.hits, cache.misses
 
-    if not note_toate:
-        print("\tEroare: Nu s-au găsit note în partitură!")
+    lista_sonoritati = sonoritati(partitura)
+    if not lista_sonoritati:
+        log.error("\tEroare: Nu s-au găsit note în partitură!")
         return []
 
-    # Grupăm notele simultane pentru a forma acorduri
-    i = 0
-    while i < len(note_toate):
-        start_time = note_toate[i][0]
-        end_time = note_toate[i][1]
-        pitches = [note_toate[i][2]]
-        
-        # Cautăm note care încep aproape simultan (toleranță mărită la 0.1)
-        j = i + 1
-        while j < len(note_toate) and abs(note_toate[j][0] - start_time) < 0.1:
-            pitches.append(note_toate[j][2])
-            end_time = min(end_time, note_toate[j][1])
-            j += 1
-
-        # Creăm un acord din notele simultane
+    ignorate = 0
+    erori = 0
+    for start_time, end_time, pitches in lista_sonoritati:
+        # Acceptăm acorduri cu cel puțin 3 note, suficient de lungi
+        if len(pitches) < note_minime_acord or (end_time - start_time) < durata_minima_acord:
+            ignorate += 1
+            continue
         try:
-            acord = chord.Chord(pitches)
-            acord.duration = duration.Duration(end_time - start_time)
-            # Relaxăm condițiile: acceptăm acorduri cu cel puțin 3 note
-            if len(pitches) >= 3 and (end_time - start_time) >= 0.25:
-                simbol = acord.pitchedCommonName  # Ex. "C major"
-                segmente.append((simbol, start_time, end_time))
-                print(f"\tAcord detectat: {simbol} de la {start_time} la {end_time}")
-            else:
-                print(f"\tAcord ignorat (prea puține note sau durată scurtă): {pitches}")
-        except Exception as e:
-            print(f"\tEroare la crearea acordului: {e}, pitches: {pitches}")
+            segmente.append((nume_acord(pitches), start_time, end_time))
+        except Exception:
+            erori += 1
 
-        i = j
+    contor('sonorities', len(lista_sonoritati))
+    contor('sonorities_ignored', ignorate)
+    log.info(f"\t{len(segmente)} acorduri detectate din {len(lista_sonoritati)} sonorități "
+          f"({ignorate} ignorate: prea puține note sau durată scurtă; {erori} erori).")
 
     if not segmente:
-        print("\tEroare: Nu s-au găsit acorduri semnificative!")
-        # Fallback: Încercăm analiza armonică
-        print("\tÎncercăm analiza armonică ca fallback...")
+        log.warning("\tEroare: Nu s-au găsit acorduri semnificative!")
+        # Fallback: cifrajul roman al sonorităților, în tonalitatea piesei
+        log.info("\tÎncercăm analiza armonică ca fallback...")
         try:
-            roman = partitura.analyze('roman')
-            for event in roman.recurse().getElementsByClass('RomanNumeral'):
-                start_time = event.offset
-                end_time = start_time + event.duration.quarterLength
-                if end_time - start_time >= 0.25:
-                    segmente.append((event.figure, start_time, end_time))
-                    print(f"\tAcord roman detectat: {event.figure} de la {start_time} la {end_time}")
+            tonalitate = partitura.analyze('key')
+            for start_time, end_time, pitches in lista_sonoritati:
+                if end_time - start_time >= durata_minima_acord:
+                    segmente.append((roman_acord(pitches, tonalitate), start_time, end_time))
+            log.info(f"\t{len(segmente)} acorduri detectate prin cifraj roman în {tonalitate}.")
         except Exception as e:
-            print(f"\tEroare la analiza armonică: {e}")
+            log.error(f"\tEroare la analiza armonică: {e}")
+
+    contor('chord_cache_hits', cache.hits - hits)
+    contor('chord_cache_misses', cache.misses - misses)
+    statistici = cache.statistici()
+    log.info(f"\tCache acorduri: {statistici['hits']} hits, {statistici['misses']} misses, {statistici['intrari']} intrări.")
 
     if not segmente:
-        print("\tEroare finală: Tot nu s-au găsit acorduri!")
+        log.error("\tEroare finală: Tot nu s-au găsit acorduri!")
         return []
 
     segmente.sort(key=lambda x: x[1])
-    print(f"\tSegmente acorduri detectate: {segmente}")
+    contor('chords', len(segmente))
     return segmente
 
 def segmentare_acorduri(partitura, output_dir):
@@ -176,13 +325,13 @@ def segmentare_acorduri(partitura, output_dir):
     output_file = os.path.join(dir, 'acorduri.csv')
 
     if os.path.isfile(output_file):
-        print(f"\tFișierul '{output_file}' există deja. Îl voi suprascrie.")
+        log.debug(f"\tFișierul '{output_file}' există deja. Îl voi suprascrie.")
     else:
-        print(f"\tFișierul '{output_file}' nu există. Îl voi crea.")
+        log.debug(f"\tFișierul '{output_file}' nu există. Îl voi crea.")
 
     segmente = acorduri(partitura)
     if not segmente:
-        print(f"\tNu s-au găsit segmente pentru acorduri.")
+        log.warning(f"\tNu s-au găsit segmente pentru acorduri.")
         return
 
     try:
@@ -192,31 +341,25 @@ def segmentare_acorduri(partitura, output_dir):
             for idx, (figura, start, end) in enumerate(segmente, 1):
                 figura_str = figura.replace(' ', '_') if figura else 'Unknown'
                 writer.writerow([f"{start:.3f}", f"{end:.3f}", f"Acord_{idx}_{figura_str}"])
-        print(f"\tRezultatele au fost salvate în fișierul: '{output_file}'")
+        log.info(f"\tRezultatele au fost salvate în fișierul: '{output_file}'")
     except Exception as e:
-        print(f"\tEroare la scrierea fișierului: {e}")
+        log.error(f"\tEroare la scrierea fișierului: {e}")
 
     return segmente
 
-def vizualizare_tonalitate(partitura, output_dir):
+def grafic_tonalitate(segmente, total_duration, output_dir):
     """
-    Creează un grafic pentru segmentele de tonalitate.
+    Desenează graficul segmentelor de tonalitate.
 
     Args:
-        partitura (music21.Score): Obiect music21 Score, partitura de analizat.
+        segmente (list): segmentele (tonalitate ca text, start, end)
+        total_duration (float): durata totală a piesei (quarterLength)
         output_dir (str): directorul unde sunt salvate informațiile (output_dir/output_subdir).
     """
-    segmente = segmentare_tonalitate(partitura, output_dir)
-    if not segmente:
-        print("\tNu există segmente de tonalitate pentru vizualizare.")
-        return
-
-    total_duration = partitura.duration.quarterLength
     colors = ['skyblue', 'lightgreen', 'lightcoral']
 
     fig, ax = plt.subplots(figsize=(15, 3))
-    for idx, (tonalitate, start, end) in enumerate(segmente):
-        tonalitate_str = str(tonalitate) if tonalitate else 'Unknown'
+    for idx, (tonalitate_str, start, end) in enumerate(segmente):
         ax.barh(0, end - start, left=start, height=0.4, color=colors[idx % len(colors)],
                 label=tonalitate_str if idx < len(colors) else "")
         ax.text((start + end) / 2, 0, tonalitate_str, ha='center', va='center', fontsize=10, color='black')
@@ -234,22 +377,35 @@ def vizualizare_tonalitate(partitura, output_dir):
     plt.tight_layout()
     plt.savefig(output_file)
     plt.close()
-    print(f"\tVizualizarea tonalității a fost salvată în: '{output_file}'")
+    log.debug(f"\tVizualizarea tonalității a fost salvată în: '{output_file}'")
 
-def vizualizare_acorduri(partitura, output_dir):
+def vizualizare_tonalitate(partitura, output_dir, fereastra=1):
     """
-    Creează un grafic pentru segmentele de acorduri.
+    Creează un grafic pentru segmentele de tonalitate.
 
     Args:
         partitura (music21.Score): Obiect music21 Score, partitura de analizat.
         output_dir (str): directorul unde sunt salvate informațiile (output_dir/output_subdir).
+        fereastra (int): numărul de măsuri din fereastra de netezire a tonalității
     """
-    segmente = segmentare_acorduri(partitura, output_dir)
+    segmente = segmentare_tonalitate(partitura, output_dir, fereastra)
     if not segmente:
-        print("\tNu există segmente de acorduri pentru vizualizare.")
+        log.warning("\tNu există segmente de tonalitate pentru vizualizare.")
         return
 
-    total_duration = partitura.duration.quarterLength
+    # Tonalitățile sunt trimise ca text, ca graficul să poată fi desenat și în alt proces
+    segmente = [(str(tonalitate) if tonalitate else 'Unknown', start, end) for tonalitate, start, end in segmente]
+    programeaza_grafic(grafic_tonalitate, segmente, partitura.duration.quarterLength, output_dir)
+
+def grafic_acorduri(segmente, total_duration, output_dir):
+    """
+    Desenează graficul segmentelor de acorduri.
+
+    Args:
+        segmente (list): segmentele (figura, start, end)
+        total_duration (float): durata totală a piesei (quarterLength)
+        output_dir (str): directorul unde sunt salvate informațiile (output_dir/output_subdir).
+    """
     colors = plt.cm.Paired.colors
 
     fig, ax = plt.subplots(figsize=(15, 3))
@@ -279,9 +435,25 @@ def vizualizare_acorduri(partitura, output_dir):
     plt.tight_layout()
     plt.savefig(output_file)
     plt.close()
-    print(f"\tVizualizarea acordurilor a fost salvată în: '{output_file}'")
+    log.debug(f"\tVizualizarea acordurilor a fost salvată în: '{output_file}'")
+
+def vizualizare_acorduri(partitura, output_dir):
+    """
+    Creează un grafic pentru segmentele de acorduri.
+
+    Args:
+        partitura (music21.Score): Obiect music21 Score, partitura de analizat.
+        output_dir (str): directorul unde sunt salvate informațiile (output_dir/output_subdir).
+    """
+    segmente = segmentare_acorduri(partitura, output_dir)
+    if not segmente:
+        log.warning("\tNu există segmente de acorduri pentru vizualizare.")
+        return
+
+    programeaza_grafic(grafic_acorduri, segmente, partitura.duration.quarterLength, output_dir)
 
-def segmentare(partitura, output_dir, output_subdir="segmentare"):
+@masurat()
+def segmentare(partitura, output_dir, output_subdir="segmentare", fereastra_tonalitate=1):
     """
     Funcția principală pentru segmentarea partiturii.
     Apelează funcțiile de segmentare bazate pe tonalitate și acorduri.
@@ -290,11 +462,12 @@ def segmentare(partitura, output_dir, output_subdir="segmentare"):
         partitura (music21.Score): Obiect music21 Score, partitura de analizat.
         output_dir (str): directorul principal unde sunt salvate informațiile.
         output_subdir (str): subdirectorul unde se salvează segmentarea.
+        fereastra_tonalitate (int): numărul de măsuri din fereastra de netezire a tonalității (1 = fiecare măsură separat).
 
     Return:
         output_path (str): directorul unde sunt salvate segmentele de tonalitate și acorduri.
     """
-    print(f"\tRealizez segmentarea partiturii...")
+    log.info(f"\tRealizez segmentarea partiturii...")
     
     # Creează directorul de ieșire dacă nu există
     os.makedirs(output_dir, exist_ok=True)
@@ -302,11 +475,11 @@ def segmentare(partitura, output_dir, output_subdir="segmentare"):
     os.makedirs(output_path, exist_ok=True)
 
     if not partitura.parts:
-        print("\tEroare: Partitura nu conține părți!")
+        log.error("\tEroare: Partitura nu conține părți!")
         return
 
     # Apelează funcțiile de segmentare și vizualizare
-    vizualizare_tonalitate(partitura, output_path)
+    vizualizare_tonalitate(partitura, output_path, fereastra_tonalitate)
     vizualizare_acorduri(partitura, output_path)
 
     return output_path
\ No newline at end of file
@@ -0,0 +1,20 @@
+import os
+import pytest
+from batch import nume_iesire
+
+def test_nume_unice_raman_neschimbate():
+    fisiere = [os.path.join('input', 'bach', 'bwv66.6.xml'), os.path.join('input', 'bach', 'bwv1.6.xml')]
+    assert nume_iesire(fisiere) == {fisiere[0]: 'bwv66.6', fisiere[1]: 'bwv1.6'}
+
+def test_acelasi_nume_in_directoare_diferite():
+    a = os.path.join('input', 'a', 'bwv1.6.xml')
+    b = os.path.join('input', 'b', 'bwv1.6.xml')
+    c = os.path.join('input', 'b', 'bwv1.6.mid')
+    altul = os.path.join('input', 'a', 'bwv66.6.xml')
+    nume = nume_iesire([a, b, c, altul])
+    assert nume == {a: 'a_bwv1.6', b: 'b_bwv1.6_xml', c: 'b_bwv1.6_mid', altul: 'bwv66.6'}
+    assert len(set(nume.values())) == 4
+
+def test_nume_care_tot_se_suprapun_sunt_respinse():
+    with pytest.raises(ValueError):
+        nume_iesire([os.path.join('a', 'x.xml'), os.path.join('b', 'x.xml'), os.path.join('c', 'a_x.xml')])
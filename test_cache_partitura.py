@@ -0,0 +1,38 @@
+import os
+from music21 import corpus
+from cache_partitura import incarca_partitura, cache_subdir
+
+def scrie_partituri(tmp_path, piese):
+    fisiere = []
+    for piesa in piese:
+        fisier = str(tmp_path / f"{piesa.replace('/', '_')}.xml")
+        corpus.parse(piesa).write('musicxml', fp=fisier)
+        fisiere.append(fisier)
+    return fisiere
+
+def test_cache_comun_are_o_singura_limita(tmp_path):
+    """
+    Cu un director comun, limita se aplică tuturor partiturilor: a doua intrare o evacuează pe prima,
+    iar în directoarele pieselor nu se creează alt cache.
+    """
+    fisiere = scrie_partituri(tmp_path, ['bach/bwv66.6', 'bach/bwv1.6'])
+    cache_dir = str(tmp_path / 'output' / 'cache_partituri')
+    iesiri = [str(tmp_path / 'output' / os.path.basename(fisier)) for fisier in fisiere]
+
+    incarca_partitura(fisiere[0], iesiri[0], cache_dir=cache_dir)
+    prima = os.listdir(cache_dir)
+    assert len(prima) == 1
+    marime = os.path.getsize(os.path.join(cache_dir, prima[0]))
+
+    partitura = incarca_partitura(fisiere[1], iesiri[1], max_bytes=marime, cache_dir=cache_dir)
+    ramase = os.listdir(cache_dir)
+    assert len(ramase) == 1 and ramase != prima
+    assert len(partitura.parts) == len(corpus.parse('bach/bwv1.6').parts)
+    assert not any(os.path.isdir(os.path.join(iesire, cache_subdir)) for iesire in iesiri)
+
+def test_cache_implicit_in_directorul_piesei(tmp_path):
+    fisier, = scrie_partituri(tmp_path, ['bach/bwv66.6'])
+    output_dir = str(tmp_path / 'output' / 'bwv66.6')
+    incarca_partitura(fisier, output_dir)
+    assert len(os.listdir(os.path.join(output_dir, cache_subdir))) == 1
+    assert len(incarca_partitura(fisier, output_dir).parts) == 4
@@ -0,0 +1,69 @@
+import numpy as np
+from clasament_pattern import acoperire, caracteristici, criterii, top_patternuri
+from rezultate_pattern import Aparitie, RezultatPattern
+
+def voci_test():
+    """
+    Două voci cu câte 8 note de o bătaie (onset 0..7), deci piesa durează 8 bătăi.
+    """
+    onset = np.arange(8, dtype=np.float64)
+    return {
+        'S': (np.arange(60, 68), onset, np.ones(8)),
+        'A': (np.arange(50, 58), onset, np.ones(8))
+    }
+
+def test_acoperire_reuniune():
+    grup = np.array([0, 0, 0, 1, 1])
+    inceputuri = np.array([0.0, 1.0, 5.0, 2.0, 0.0])
+    sfarsituri = np.array([3.0, 4.0, 6.0, 3.0, 10.0])
+    assert acoperire(grup, inceputuri, sfarsituri, 3).tolist() == [5.0, 10.0, 0.0]
+    assert acoperire(np.array([], dtype=np.int64), np.array([]), np.array([]), 2).tolist() == [0.0, 0.0]
+
+def test_aparitii_suprapuse_nu_dubleaza_acoperirea():
+    """
+    Sursa [0, 3) și o potrivire suprapusă [1, 4) acoperă 4 bătăi din 8, nu 6.
+    """
+    voices = voci_test()
+    suprapus = RezultatPattern(Aparitie('S', 0.0, 3, (1, 1)), 1, [Aparitie('S', 1.0, 3, (1, 1))])
+    identic = RezultatPattern(Aparitie('S', 0.0, 3, (1, 1)), 1, [Aparitie('A', 0.0, 3, (1, 1))])
+    disjunct = RezultatPattern(Aparitie('S', 0.0, 3, (1, 1)), 1, [Aparitie('A', 4.0, 3, (1, 1))])
+
+    coloana = caracteristici([suprapus, identic, disjunct], voices)[:, criterii.index('coverage')]
+    assert np.allclose(coloana, [4 / 8, 3 / 8, 6 / 8])
+
+def test_durata_reala_a_notelor():
+    """
+    Acoperirea folosește duratele notelor, nu numărul de note: ultima notă lungă contează întreagă.
+    """
+    voices = voci_test()
+    voices['S'] = (voices['S'][0], voices['S'][1], np.array([1, 1, 4, 1, 1, 1, 1, 1], dtype=np.float64))
+    rezultat = RezultatPattern(Aparitie('S', 0.0, 3, (1, 1)), 1, [Aparitie('A', 0.0, 3, (1, 1))])
+    assert np.isclose(caracteristici([rezultat], voices)[0, criterii.index('coverage')], 6 / 8)
+
+def test_top_ordine_stabila():
+    voices = voci_test()
+    rezultat = RezultatPattern(Aparitie('S', 0.0, 3, (1, 1)), 1, [Aparitie('A', 0.0, 3, (1, 1))])
+    top = top_patternuri([rezultat, rezultat, rezultat], voices, k=2)
+    assert [r for r, _, _ in top] == [rezultat, rezultat]
+    assert top[0][1] == top[1][1]
+
+def test_start_pe_nota_unui_acord():
+    """
+    Notele unui acord au același onset; apariția care începe pe a doua notă a acordului
+    se termină la sfârșitul notei corecte, nu cu o notă mai devreme.
+    """
+    voices = {
+        'S': (np.array([60, 64, 65, 67]), np.array([0.0, 0.0, 1.0, 2.0]), np.array([1.0, 1.0, 1.0, 4.0])),
+        'A': (np.array([50, 52, 53, 55]), np.arange(4, dtype=np.float64), np.ones(4))
+    }
+    # Pornind de la nota 1 (E4, onset 0), trei note se termină la sfârșitul notei 3: 2 + 4 = 6
+    cu_index = RezultatPattern(Aparitie('S', 0.0, 3, (1, 2), 1), 1, [Aparitie('A', 0.0, 1, (), 0)])
+    fara_index = RezultatPattern(Aparitie('S', 0.0, 3, (1, 2)), 1, [Aparitie('A', 0.0, 1, ())])
+    coloana = caracteristici([cu_index, fara_index], voices)[:, criterii.index('coverage')]
+    assert np.allclose(coloana, [6 / 6, 6 / 6])
+
+def test_voci_raportate_la_vocile_piesei():
+    voices = voci_test()
+    voices['T'] = voices['A']
+    rezultat = RezultatPattern(Aparitie('S', 0.0, 3, (1, 1)), 1, [Aparitie('A', 0.0, 3, (1, 1))])
+    assert np.isclose(caracteristici([rezultat], voices)[0, criterii.index('voices')], 2 / 3)
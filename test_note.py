@@ -0,0 +1,39 @@
+from music21 import corpus, converter, instrument, note, stream
+from note import extrage_note_muzicale, incarca_note, nume_voci
+
+def test_o_voce_pentru_fiecare_parte(tmp_path):
+    """
+    Un coral are câte o voce pentru fiecare parte, cu notele acelei părți (fără voci comasate).
+    """
+    partitura = corpus.parse('bach/bwv66.6')
+    csv_file, _ = extrage_note_muzicale(partitura, 'bwv66.6', str(tmp_path), format_binar=False)
+    note_piesa = incarca_note(csv_file)
+
+    asteptat = {part.partName: len(part.flatten().notes) for part in partitura.parts}
+    assert list(note_piesa['part'].cat.categories) == ['Soprano', 'Alto', 'Tenor', 'Bass']
+    assert note_piesa['part'].value_counts().to_dict() == asteptat
+
+def test_parti_cu_acelasi_nume(tmp_path):
+    """
+    Portativele unui pian au același nume; fiecare rămâne o voce separată, cu propriul fișier.
+    """
+    partitura = stream.Score()
+    for pitch in ['C5', 'C3']:
+        portativ = stream.PartStaff()
+        portativ.insert(0, instrument.Piano())
+        portativ.append(note.Note(pitch))
+        partitura.insert(0, portativ)
+    partitura = converter.parse(partitura.write('musicxml', tmp_path / 'pian.xml'))
+
+    csv_file, _ = extrage_note_muzicale(partitura, 'pian', str(tmp_path), format_binar=False)
+    note_piesa = incarca_note(csv_file)
+    assert list(note_piesa['part'].cat.categories) == ['Piano', 'Piano 2']
+    assert note_piesa['pitch'].tolist() == ['C5', 'C3']
+    assert (tmp_path / 'note' / 'Piano 2' / 'Piano 2_note.csv').is_file()
+
+def test_nume_voci_unice():
+    class Parte:
+        def __init__(self, partName):
+            self.partName = partName
+    parts = [Parte(nume) for nume in ['Piano', None, 'Piano 2', 'Piano', None]]
+    assert nume_voci(parts) == ['Piano', 'Unknown', 'Piano 2', 'Piano 3', 'Unknown 2']
@@ -0,0 +1,155 @@
+import os
+import random
+import subprocess
+import sys
+import numpy as np
+import pytest
+from pattern import (VoiceIndex, NGramIndex, PatternRun, similarity_function, similarity_function_dp,
+                     triplets_to_intervals, intervals_to_arrays, quantize_durations, score_pattern,
+                     unique_candidates, maximal_candidates, min_length, max_length)
+
+def voce_aleatoare(r, numar_note):
+    """
+    Triplete (pitch, onset, duration) cu pași mici și puține durate, ca să existe potriviri.
+    """
+    triplets = []
+    pitch, onset = 60, 0.0
+    for _ in range(numar_note):
+        pitch += r.choice([-2, -1, 0, 1, 2])
+        duration = r.choice([0.5, 1.0, 1.5])
+        triplets.append((pitch, onset, duration))
+        onset += duration
+    return triplets
+
+def pattern_aleator(r, voice, numar_intervale):
+    """
+    Un tipar luat din voce (cu ultimul interval eventual modificat) sau generat independent.
+    """
+    if len(voice) >= numar_intervale and r.random() < 0.7:
+        start = r.randrange(len(voice) - numar_intervale + 1)
+        pattern = list(voice[start:start + numar_intervale])
+        if pattern and r.random() < 0.5:
+            delta_p, onset, duration = pattern[-1]
+            pattern[-1] = (delta_p + r.choice([-2, -1, 1, 2]), onset, r.choice([0.5, 1.0, 1.5]))
+        return pattern
+    return triplets_to_intervals(voce_aleatoare(r, numar_intervale + 1))
+
+@pytest.mark.parametrize('seed', range(20))
+def test_similarity_function_ca_dp(seed):
+    """
+    Varianta vectorizată dă aceleași potriviri ca programarea dinamică de referință, pentru toate
+    lungimile de tipar dintre min_length și max_length și pentru voci goale sau scurte.
+    """
+    r = random.Random(seed)
+    for numar_note in [0, 1, 2, min_length - 1, min_length, max_length, r.randint(10, 60)]:
+        voice = triplets_to_intervals(voce_aleatoare(r, numar_note))
+        for length in range(min_length, max_length + 1):
+            for _ in range(5):
+                pattern = pattern_aleator(r, voice, length - 1)
+                assert similarity_function(pattern, voice) == similarity_function_dp(pattern, voice)
+
+@pytest.mark.parametrize('seed', range(10))
+def test_ngram_index_ca_dp(seed):
+    """
+    Căutarea prin indexul de n-grame dă aceleași poziții ca programarea dinamică.
+    """
+    r = random.Random(seed)
+    voices = {f'V{v}': voce_aleatoare(r, r.choice([0, 1, min_length, r.randint(10, 60)])) for v in range(3)}
+    index = VoiceIndex.from_triplets(voices)
+    ngrams = NGramIndex(index, min_length - 1)
+    intervale = {voice_name: triplets_to_intervals(triplets) for voice_name, triplets in voices.items()}
+    toate = [interval for voice in intervale.values() for interval in voice]
+    for length in range(min_length, max_length + 1):
+        for _ in range(5):
+            pattern = pattern_aleator(r, toate, length - 1)
+            pattern_dp, pattern_dur = intervals_to_arrays(pattern)
+            for voice_name, voice in intervale.items():
+                asteptat = [b for b, _ in similarity_function_dp(pattern, voice)]
+                assert ngrams.match_ends(index, voice_name, pattern_dp, pattern_dur).tolist() == asteptat
+
+def ruleaza_pattern(piesa, output_dir):
+    """
+    Extrage notele unei piese din corpus și rulează pattern(), fără grafice.
+
+    Return:
+        bytes: conținutul patterns.json
+    """
+    from music21 import corpus
+    from note import extrage_note_muzicale
+    from pattern import pattern
+    from randare import randare_amanata
+    partitura = corpus.parse(piesa)
+    with randare_amanata(activ=False):
+        csv_file, _ = extrage_note_muzicale(partitura, piesa.replace('/', '_'), str(output_dir))
+        rezultat = pattern(csv_file, str(output_dir), partitura)
+    with open(os.path.join(rezultat, 'patterns.json'), 'rb') as f:
+        return f.read()
+
+def test_doua_partituri_in_acelasi_proces(tmp_path):
+    """
+    A doua partitură analizată în același proces dă același rezultat ca o rulare într-un proces nou:
+    tiparele verificate la prima partitură nu le elimină pe cele ale celei de-a doua.
+    """
+    cod = "import sys; sys.path.insert(0, sys.argv[1]); import test_pattern; test_pattern.ruleaza_pattern('bach/bwv66.6', sys.argv[2])"
+    subprocess.run([sys.executable, '-c', cod, os.path.dirname(os.path.abspath(__file__)), str(tmp_path / 'proaspat')],
+                   capture_output=True, check=True)
+    proaspat = (tmp_path / 'proaspat' / 'analiza_pattern' / 'patterns.json').read_bytes()
+
+    ruleaza_pattern('bach/bwv1.6', tmp_path / 'prima')
+    assert ruleaza_pattern('bach/bwv66.6', tmp_path / 'a_doua') == proaspat
+    assert proaspat != b'[]'
+
+def clasa_exacta(index, voice_name, start, length):
+    """
+    Tiparul de la poziția dată, așa cum îl compară potrivirea când intervalele sunt identice:
+    toate intervalele melodice și duratele, fără durata ultimului interval.
+    """
+    delta_p = tuple(index.delta_p[voice_name][start:start + length - 1].tolist())
+    durate = tuple(quantize_durations(index.interval_durations(voice_name)[start:start + length - 2]).tolist())
+    return delta_p, durate
+
+def contine(index, maximal, tipar):
+    """
+    Verifică dacă tiparul (delta_p, durate) apare în interiorul unui tipar maximal (source_voice, length, start_pos).
+    """
+    voice_name, length, start = maximal
+    delta_p, durate = clasa_exacta(index, voice_name, start, length)
+    tipar_dp, tipar_durate = tipar
+    for offset in range(len(delta_p) - len(tipar_dp) + 1):
+        if (delta_p[offset:offset + len(tipar_dp)] == tipar_dp
+                and durate[offset:offset + len(tipar_durate)] == tipar_durate):
+            return True
+    return False
+
+@pytest.mark.parametrize('seed', range(10))
+def test_maximal_acopera_repetitiile_exacte(seed):
+    """
+    Modul maximal caută repetițiile exacte (intervale melodice identice), nu pe cele cu toleranța de ±1
+    semiton: un pattern din modul obișnuit este inclus într-un tipar maximal exact atunci când sursa lui
+    apare identic de cel puțin două ori. Celelalte (găsite doar prin toleranță) sunt pierderile așteptate.
+    """
+    r = random.Random(seed)
+    voices = {}
+    for v in range(3):
+        triplets = voce_aleatoare(r, r.randint(0, 40))
+        voices[f'V{v}'] = tuple(np.array(coloana) for coloana in zip(*triplets)) if triplets else (
+            np.empty(0, dtype=np.int64), np.empty(0), np.empty(0))
+    voice_order = list(voices)
+    normal = PatternRun(voices, voice_order)
+    rezultate = [score_pattern(normal.index, *candidat[:2], voice_order, candidat[2], normal.ngrams)
+                 for candidat in unique_candidates(normal)]
+    maximale = maximal_candidates(PatternRun(voices, voice_order))
+
+    aparitii = {}
+    for voice_name in voice_order:
+        for length in range(min_length, max_length + 1):
+            for start in range(normal.index.voice_length(voice_name) - length + 1):
+                tipar = clasa_exacta(normal.index, voice_name, start, length)
+                aparitii[tipar] = aparitii.get(tipar, 0) + 1
+
+    for rezultat in rezultate:
+        if rezultat is None or rezultat['total_matches'] <= 1:
+            continue
+        tipar = clasa_exacta(normal.index, rezultat['source_voice'], rezultat['start_pos'], rezultat['length'])
+        acoperit = any(contine(normal.index, maximal, tipar) for maximal in maximale)
+        assert acoperit == (aparitii[tipar] >= 2), (rezultat['source_voice'], rezultat['start_pos'], rezultat['length'])
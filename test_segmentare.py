@@ -0,0 +1,20 @@
+import pytest
+from music21 import corpus
+from segmentare import analizare_tonalitate
+
+@pytest.mark.parametrize('piesa', ['bach/bwv66.6', 'bach/bwv1.6', 'bach/bwv10.7', 'bach/bwv101.7'])
+def test_tonalitate_ca_music21(piesa):
+    """
+    Cu fereastra=1 și doar prima parte, tonalitatea fiecărei măsuri este cea dată de analyze('key').
+    """
+    partitura = corpus.parse(piesa)
+    masuri = list(partitura.parts[0].getElementsByClass('Measure'))
+    segmente = analizare_tonalitate(partitura, fereastra=1, parti=[partitura.parts[0]])
+
+    tonalitati = []
+    for tonalitate, start, end in segmente:
+        tonalitati += [tonalitate for masura in masuri if start <= masura.offset < end]
+    assert len(tonalitati) == len(masuri)
+    for masura, tonalitate in zip(masuri, tonalitati):
+        if masura.flatten().notes:
+            assert str(tonalitate) == str(masura.analyze('key')), f"măsura {masura.number}"
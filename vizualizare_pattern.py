@@ -1,129 +1,75 @@
-import json
 import os
 import matplotlib.pyplot as plt
 import numpy as np
+from randare import programeaza_grafic, grafice_active
+from rezultate_pattern import incarca_rezultate
 
-def extract_source_pattern(patterns):
+def alege_patternuri(rezultate):
     """
-    Extrage pattern-ul care are cele mai multe match-uri egale cu sursa (intervale melodice identice).
-    
+    Alege, într-o singură trecere, pattern-ul pentru fiecare criteriu din grafice:
+    'onset' (cel mai mic onset), 'matches' (cele mai multe potriviri) și 'sources'
+    (cele mai multe potriviri cu intervale melodice identice cu sursa).
+
     Args:
-        patterns (list): Lista de patterns extrase din fișierul JSON.
-        
+        rezultate (list): obiectele RezultatPattern
+
     Returns:
-        dict: Pattern-ul cu cele mai multe match-uri egale cu sursa.
+        dict: {criteriu: RezultatPattern}; 'sources' este None dacă nicio potrivire nu este egală cu sursa
     """
+    alese = {'onset': None, 'matches': None, 'sources': None}
     max_equal_matches = 0
-    best_pattern = None
-
-    for pattern in patterns:
-        source_intervals_str = pattern['pattern']['intervals (p2 - p1, duration)']
-        source_intervals = [int(interval.split(',')[0].strip('(')) for interval in source_intervals_str.split(') ') if interval.strip()]
-        s_num_notes = pattern['pattern']['num_notes']
-        
-        equal_matches_count = 0
-        for _, matches in pattern['matches'].items():
-            for match in matches:
-                match_intervals_str = match['intervals (p2 - p1, duration)']
-                match_intervals = [int(interval.split(',')[0].strip('(')) for interval in match_intervals_str.split(') ') if interval.strip()]
-                if match['num_notes'] == s_num_notes and match_intervals == source_intervals:
-                    equal_matches_count += 1
-        
+    for rezultat in rezultate:
+        onset = rezultat.source.onset
+        ales = alese['onset']
+        if ales is None or (onset, -rezultat.total_matches) < (ales.source.onset, -ales.total_matches):
+            alese['onset'] = rezultat
+        ales = alese['matches']
+        if ales is None or (rezultat.total_matches, -onset) > (ales.total_matches, -ales.source.onset):
+            alese['matches'] = rezultat
+        equal_matches_count = rezultat.potriviri_exacte()
         if equal_matches_count > max_equal_matches:
             max_equal_matches = equal_matches_count
-            best_pattern = pattern
-
-    if best_pattern is None:
-        raise ValueError("Nu s-au găsit match-uri egale cu sursa în niciun pattern.")
-
-    return best_pattern
+            alese['sources'] = rezultat
+    return alese
 
-
-def extract_chousen_pattern(patterns, criterion):
-    """
-    Alege un pattern din lista de patterns pe baza unui criteriu specificat.
-    Criteriul poate fi 'onset' pentru cel mai mic onset sau 'matches' pentru cel mai mare număr de potriviri.
-    Dacă criteriul este 'sources', se extrage pattern-ul sursă cu cele mai multe potriviri.
-    Args:
-        patterns (list): Lista de patterns extrase din fișierul JSON.
-        criterion (str): Criteriul de selecție ('onset', 'matches' sau 'sources').
-        
-    Returns:
-        dict: Pattern-ul ales pe baza criteriului specificat.
+def date_grafic(rezultat):
     """
-
-    if criterion == 'onset':
-        chosen_pattern = min(patterns, key=lambda p: (p['pattern']['onset'], -p['total_matches']))
-    elif criterion == 'matches':
-        chosen_pattern = max(patterns, key=lambda p: (p['total_matches'], -p['pattern']['onset']))
-    elif criterion == 'sources':
-        chosen_pattern = extract_source_pattern(patterns)
-    else:
-        raise ValueError("Criteriul trebuie să fie 'onset' sau 'matches'.")
-
-    return chosen_pattern
-
-def extract_pattern(json_file, criterion):
-    """
-    Extrage un pattern sursă din patterns.json și organizează potrivirile ca Soursa, Match pe voci.
+    Organizează aparițiile unui pattern ca Sursa, Match pe voci.
     S include potrivirile cu intervale melodice (p2 - p1) exact ca sursa, ignorând durata.
     Păstrează toate potrivirile, inclusiv cele suprapuse în aceeași voce.
-    
+
     Args:
-        json_file (str): Calea către fișierul patterns.json.
-        criterion (str): Criteriul de selecție ('onset' sau 'matches').
-    
+        rezultat (RezultatPattern): pattern-ul ales
+
     Returns:
         tuple: (s_data, all_matches), unde fiecare este o listă de tupluri (onset, end, voice).
     """
-    with open(json_file, 'r') as f:
-        patterns = json.load(f)
-
-    if not patterns:
-        raise ValueError("Fișierul patterns.json este gol.")
-
-    chosen_pattern = extract_chousen_pattern(patterns, criterion)
-
-    source_intervals_str = chosen_pattern['pattern']['intervals (p2 - p1, duration)']
-    source_intervals = [int(interval.split(',')[0].strip('(')) for interval in source_intervals_str.split(') ') if interval.strip()]
-    
-    s_data = []
-    s_onset = chosen_pattern['pattern']['onset']
-    s_num_notes = chosen_pattern['pattern']['num_notes']
-    s_end = s_onset + (s_num_notes - 1)
-    s_voice = chosen_pattern['pattern']['source_voice']
-    s_data.append((s_onset, s_end, s_voice))
+    source = rezultat.source
+    s_data = [(source.onset, source.end, source.voice)]
 
     all_matches0 = []
     all_matches1 = []
     all_matches_1 = []
     all_matches2 = []
     all_matches_2 = []
-    for voice, matches in chosen_pattern['matches'].items():
-        for match in matches:
-            onset = match['onset']
-            num_notes = match['num_notes']
-            end = onset + (num_notes - 1)
-            match_intervals_str = match['intervals (p2 - p1, duration)']
-            match_intervals = [int(interval.split(',')[0].strip('(')) for interval in match_intervals_str.split(') ') if interval.strip()]
-            
-            if num_notes == s_num_notes and match_intervals == source_intervals:
-                s_data.append((onset, end, voice))
-            else:
-                dif_list = [x for x in match_intervals if x not in source_intervals]
-                dif = sum(dif_list)
-                dif /= (num_notes - 1)
-                if dif == 0:
-                    all_matches0.append((onset, end, voice))
-                elif dif in [0, 0.5]:
-                    all_matches1.append((onset, end, voice))
-                elif dif > 0.5:
-                    all_matches2.append((onset, end, voice))
-                elif dif >= -0.5:
-                    all_matches_1.append((onset, end, voice))
-                elif dif < -0.5:
-                    all_matches_2.append((onset, end, voice))
-
+    for match in rezultat.matches:
+        item = (match.onset, match.end, match.voice)
+        if match.num_notes == source.num_notes and match.intervals == source.intervals:
+            s_data.append(item)
+        else:
+            dif_list = [x for x in match.intervals if x not in source.intervals]
+            dif = sum(dif_list)
+            dif /= (match.num_notes - 1)
+            if dif == 0:
+                all_matches0.append(item)
+            elif dif in [0, 0.5]:
+                all_matches1.append(item)
+            elif dif > 0.5:
+                all_matches2.append(item)
+            elif dif >= -0.5:
+                all_matches_1.append(item)
+            elif dif < -0.5:
+                all_matches_2.append(item)
 
     s_data.sort(key=lambda x: x[0])
     all_matches0.sort(key=lambda x: x[0])
@@ -143,6 +89,32 @@ def extract_pattern(json_file, criterion):
 
     return s_data, all_matches_dict
 
+def extract_pattern(json_file, criterion, rezultate=None):
+    """
+    Extrage un pattern sursă din patterns.json și organizează potrivirile ca Soursa, Match pe voci
+    (vezi `date_grafic`).
+    
+    Args:
+        json_file (str): Calea către fișierul patterns.json (sau .jsonl, .gz).
+        criterion (str): Criteriul de selecție ('onset', 'matches' sau 'sources').
+        rezultate (list): rezultatele deja încărcate (RezultatPattern); dacă lipsesc, se citește fișierul
+    
+    Returns:
+        tuple: (s_data, all_matches), unde fiecare este o listă de tupluri (onset, end, voice).
+    """
+    if rezultate is None:
+        rezultate = incarca_rezultate(json_file)
+
+    if not rezultate:
+        raise ValueError("Fișierul patterns.json este gol.")
+    if criterion not in ('onset', 'matches', 'sources'):
+        raise ValueError("Criteriul trebuie să fie 'onset' sau 'matches'.")
+
+    chosen_pattern = alege_patternuri(rezultate)[criterion]
+    if chosen_pattern is None:
+        raise ValueError("Nu s-au găsit match-uri egale cu sursa în niciun pattern.")
+    return date_grafic(chosen_pattern)
+
 def generate_graphic(json_file, total_duration, output_dir, s_data, matches, name):
     """
     Generează graficul bazat pe datele din patterns.json, cu etichetele structurale sub grafic.
@@ -155,18 +127,23 @@ def generate_graphic(json_file, total_duration, output_dir, s_data, matches, nam
         matches (list): Lista de potriviri pentru pattern-ul sursă.
     """
 
+    # Vocile SATB păstrează pozițiile obișnuite; alte voci sunt adăugate dedesubt
+    voice_names = ['Soprano', 'Alto', 'Tenor', 'Bass']
+    for _, _, voice in s_data + [item for group in matches.values() for item in group]:
+        if voice not in voice_names:
+            voice_names.append(voice)
+    voice_to_y = {voice: -1.2 * i for i, voice in enumerate(voice_names)}
+
     fig, ax = plt.subplots(figsize=(12, 5))  # Creștem înălțimea figurii
     ax.set_title('Analiza pattern', fontsize=12, pad=10)
-    ax.set_yticks([-3.6, -2.4, -1.2, 0])
-    ax.set_yticklabels(['Bass', 'Tenor', 'Alto', 'Soprano'], fontsize=10)
+    ax.set_yticks([voice_to_y[voice] for voice in reversed(voice_names)])
+    ax.set_yticklabels(list(reversed(voice_names)), fontsize=10)
     ax.set_ylabel('', fontsize=10)
     ax.set_xlabel('Timp (quarterLength)', fontsize=10)
     ax.set_xticks(np.arange(0, total_duration, 1))
     ax.set_xticklabels([str(i) for i in range(0, total_duration)], fontsize=8)
     ax.grid(True, axis='x', linestyle='--', alpha=0.3, linewidth=0.5)
 
-    voice_to_y = {'Soprano': 0, 'Alto': -1.2, 'Tenor': -2.4, 'Bass': -3.6}
-
     for onset, end, voice in s_data:
         y_pos = voice_to_y[voice]
         ax.barh(y_pos, end - onset, left=onset, height=0.8, color='gray', edgecolor='black', linewidth=1)
@@ -221,27 +198,37 @@ def generate_graphic(json_file, total_duration, output_dir, s_data, matches, nam
     ax.legend(handles=legend_elements, loc='upper center', bbox_to_anchor=(0.5, -0.25), ncol=5, fontsize=8)
 
     ax.set_xlim(0, total_duration)
-    ax.set_ylim(-4.3, 0.5)  # Extindem y pentru a include etichetele
+    ax.set_ylim(min(voice_to_y.values()) - 0.7, 0.5)  # Extindem y pentru a include etichetele
     fig.tight_layout(rect=[0, 0.3, 1, 1])  # Creștem spațiul inferior
     os.makedirs(output_dir, exist_ok=True)
     fig.savefig(os.path.join(output_dir, name))
     plt.close(fig)
 
-def generate_all_graphics(json_file, total_duration, output_dir):
+def generate_all_graphics(json_file, total_duration, output_dir, rezultate=None):
     """
     Generează toate graficele necesare pentru analiza pattern-urilor.
+    Pattern-urile pentru cele trei criterii sunt alese într-o singură trecere.
 
     Args:
         json_file (str): Calea către fișierul patterns.json.
         total_duration (float): Durata totală a piesei (în bătăi).
         output_dir (str): Directorul de ieșire pentru grafice.
+        rezultate (list): rezultatele în memorie (RezultatPattern), date de `pattern()`;
+            dacă lipsesc, sunt încărcate din json_file
     """
-    # Generează graficul pentru analiza pattern-urilor
-    s_data, matches = extract_pattern(json_file, 'onset')
-    generate_graphic(json_file, total_duration, output_dir, s_data, matches, 'pattern_min_onset.png')
+    if not grafice_active():
+        return
 
-    s_data, matches = extract_pattern(json_file, 'matches')
-    generate_graphic(json_file, total_duration, output_dir, s_data, matches, 'pattern_max_matches.png')
+    if rezultate is None:
+        rezultate = incarca_rezultate(json_file)
+    if not rezultate:
+        raise ValueError("Fișierul patterns.json este gol.")
+    alese = alege_patternuri(rezultate)
 
-    s_data, matches = extract_pattern(json_file, 'sources')
-    generate_graphic(json_file, total_duration, output_dir, s_data, matches, 'pattern_max_sources.png')
+    # Generează graficul pentru analiza pattern-urilor
+    for criterion, name in (('onset', 'pattern_min_onset.png'), ('matches', 'pattern_max_matches.png'),
+                            ('sources', 'pattern_max_sources.png')):
+        if alese[criterion] is None:
+            raise ValueError("Nu s-au găsit match-uri egale cu sursa în niciun pattern.")
+        s_data, matches = date_grafic(alese[criterion])
+        programeaza_grafic(generate_graphic, json_file, total_duration, output_dir, s_data, matches, name)